@@ -0,0 +1,173 @@
+"""
+Mixed ingest + insight load against one SQLite database.
+
+Runs writer threads posting single events and reader threads polling
+insight endpoints at the same time, then reports throughput, latency
+percentiles and 'database is locked' failures. By default it runs the
+legacy storage setup (rollback journal, one engine) and the tuned one
+(WAL, pragmas, separate read-only pool) in separate processes.
+
+Usage:
+    python -m benchmarks.concurrency [--storage legacy|tuned|both]
+        [--seed-events N] [--writers N] [--readers N] [--duration S]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.synthetic import seed_database
+
+
+READ_ROUTES = [
+    "/insights/trends",
+    "/insights/trends?hours=1&windows=24",
+    "/insights/repetition",
+    "/insights/draft-outcomes",
+    "/insights/weekly-summary",
+    "/insights/governance",
+    "/insights/calibrations",
+]
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * pct))] * 1000, 2)
+
+
+def run_once(args):
+    tmpdir = tempfile.mkdtemp(prefix="ralph-bench-")
+    os.environ["RALPH_DATABASE_URL"] = "sqlite:///" + os.path.join(tmpdir, "bench.db")
+    os.environ["RALPH_SQLITE_WAL"] = "1" if args.storage == "tuned" else "0"
+    os.environ["RALPH_INSIGHTS_CACHE_MAX_ENTRIES"] = "0"
+
+    import logging
+
+    from ralph.app import create_app
+
+    app = create_app()
+    app.logger.setLevel(logging.CRITICAL)
+    seed_database(app, args.seed_events)
+
+    stop = threading.Event()
+    stats = {
+        "writes": [],
+        "reads": [],
+        "write_errors": 0,
+        "read_errors": 0,
+        "locked_errors": 0,
+    }
+    lock = threading.Lock()
+
+    def writer(index):
+        client = app.test_client()
+        i = 0
+        while not stop.is_set():
+            started = time.perf_counter()
+            response = client.post(
+                "/events/ingest",
+                json={
+                    "event_type": "draft_generated",
+                    "source_system": "freshdesk",
+                    "intent": f"intent_{(index * 7919 + i) % 200}",
+                    "confidence_score": 0.9,
+                    "outcome": "resolved",
+                },
+            )
+            elapsed = time.perf_counter() - started
+            i += 1
+            with lock:
+                if response.status_code == 201:
+                    stats["writes"].append(elapsed)
+                else:
+                    stats["write_errors"] += 1
+                    if "locked" in response.get_data(as_text=True):
+                        stats["locked_errors"] += 1
+
+    def reader(index):
+        client = app.test_client()
+        i = index
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                response = client.get(READ_ROUTES[i % len(READ_ROUTES)])
+                ok = response.status_code == 200
+                locked = "locked" in response.get_data(as_text=True)
+            except Exception as exc:
+                ok, locked = False, "locked" in str(exc)
+            elapsed = time.perf_counter() - started
+            i += 1
+            with lock:
+                if ok:
+                    stats["reads"].append(elapsed)
+                else:
+                    stats["read_errors"] += 1
+                    stats["locked_errors"] += locked
+
+    threads = [
+        threading.Thread(target=writer, args=(n,)) for n in range(args.writers)
+    ] + [
+        threading.Thread(target=reader, args=(n,)) for n in range(args.readers)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    return {
+        "storage": args.storage,
+        "writes_per_s": round(len(stats["writes"]) / args.duration, 1),
+        "reads_per_s": round(len(stats["reads"]) / args.duration, 1),
+        "write_p50_ms": _percentile(stats["writes"], 0.50),
+        "write_p99_ms": _percentile(stats["writes"], 0.99),
+        "read_p50_ms": _percentile(stats["reads"], 0.50),
+        "read_p99_ms": _percentile(stats["reads"], 0.99),
+        "write_errors": stats["write_errors"],
+        "read_errors": stats["read_errors"],
+        "locked_errors": stats["locked_errors"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--storage", choices=["legacy", "tuned", "both"], default="both")
+    parser.add_argument("--seed-events", type=int, default=200000)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    if args.storage != "both":
+        print(json.dumps(run_once(args)))
+        return
+
+    # One process per mode: Config is read from the environment at import
+    for storage in ("legacy", "tuned"):
+        output = subprocess.run(
+            [
+                sys.executable, "-m", "benchmarks.concurrency",
+                "--storage", storage,
+                "--seed-events", str(args.seed_events),
+                "--writers", str(args.writers),
+                "--readers", str(args.readers),
+                "--duration", str(args.duration),
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(" ".join(f"{key}={value}" for key, value in result.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Cost of idempotency-key deduplication at ingest.
+
+Seeds a throwaway database with keyed events, then reports:
+
+- filter_load_ms / filter_kib: building the in-memory filter from the
+  unique index (in the background, on first use), and its size,
+- check_filter_us / check_index_us: per-key cost of ruling out a new key
+  with the filter vs. looking it up on the unique index,
+- false_positive_rate: share of new keys the filter sent to the index,
+- ingest_event p50/p99 for events without a key, with a new key, and
+  with an already-stored key (a retry).
+
+Usage:
+    python -m benchmarks.idempotency [--seed-events N] [--samples N]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import seed_database
+
+
+def _us(seconds):
+    return round(seconds * 1_000_000, 2)
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def _payload(key=None):
+    payload = {
+        "event_type": "draft_generated",
+        "source_system": "freshdesk",
+        "intent": "intent_0001",
+        "confidence_score": 0.9,
+        "outcome": "resolved",
+    }
+    if key is not None:
+        payload["idempotency_key"] = key
+    return payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seed-events", type=int, default=1_000_000)
+    parser.add_argument("--samples", type=int, default=2000)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="ralph-bench-")
+    os.environ["RALPH_DATABASE_URL"] = "sqlite:///" + os.path.join(tmpdir, "bench.db")
+    os.environ["RALPH_METRICS_ENABLED"] = "0"
+
+    from ralph.app import create_app
+    from ralph.events.dedup import idempotency_filter, stored_event_ids
+    from ralph.events.intake import DuplicateEvent, ingest_event
+
+    app = create_app()
+    seed_database(app, args.seed_events, idempotency_keys=True)
+
+    metrics = {"seed_events": args.seed_events}
+    with app.app_context():
+        started = time.perf_counter()
+        bloom = idempotency_filter()
+        while bloom is None:
+            time.sleep(0.01)
+            bloom = idempotency_filter()
+        metrics["filter_load_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        metrics["filter_kib"] = round(len(bloom.bits) / 1024, 1)
+
+        new_keys = [f"new-{n}" for n in range(args.samples)]
+
+        started = time.perf_counter()
+        maybe = sum(1 for key in new_keys if key in bloom)
+        metrics["check_filter_us"] = _us((time.perf_counter() - started) / args.samples)
+        metrics["false_positive_rate"] = round(maybe / args.samples, 5)
+
+        started = time.perf_counter()
+        for key in new_keys:
+            stored_event_ids([key])
+        metrics["check_index_us"] = _us((time.perf_counter() - started) / args.samples)
+
+        def timed(payloads):
+            samples = []
+            for payload in payloads:
+                started = time.perf_counter()
+                try:
+                    ingest_event(payload)
+                except DuplicateEvent:
+                    pass
+                samples.append(time.perf_counter() - started)
+            return samples
+
+        cases = {
+            "no_key": [_payload() for _ in range(args.samples)],
+            "new_key": [_payload(key) for key in new_keys],
+            "duplicate": [_payload(f"seed-0-{n}") for n in range(args.samples)],
+        }
+        for name, payloads in cases.items():
+            samples = timed(payloads)
+            metrics[f"ingest_{name}.p50_us"] = _us(_percentile(samples, 0.50))
+            metrics[f"ingest_{name}.p99_us"] = _us(_percentile(samples, 0.99))
+
+    print(json.dumps(metrics, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Single-event ingest from many producers: direct vs write-behind buffer.
+
+Producer threads post single events to /events/ingest for a fixed time
+and the benchmark reports throughput and per-request latency. Modes, each
+in its own process against its own database:
+
+- direct: every request commits its own transaction,
+- buffered: the write-behind buffer answers 202 and group-commits,
+- sync: the buffer with ?durability=sync, so every request waits for
+  the group commit holding its event.
+
+After the run the buffer is stopped and the stored row count is checked
+against the accepted requests, so a lossy shutdown shows up as an error.
+
+Usage:
+    python -m benchmarks.ingest_buffer [--mode direct|buffered|sync|all]
+        [--producers N] [--duration S] [--synchronous NORMAL|FULL]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * pct))] * 1000, 2)
+
+
+def run_once(args):
+    tmpdir = tempfile.mkdtemp(prefix="ralph-bench-")
+    os.environ["RALPH_DATABASE_URL"] = "sqlite:///" + os.path.join(tmpdir, "bench.db")
+    os.environ["RALPH_SQLITE_SYNCHRONOUS"] = args.synchronous
+    os.environ["RALPH_INGEST_BUFFER_ENABLED"] = "0" if args.mode == "direct" else "1"
+
+    import logging
+
+    from sqlalchemy import func, select
+
+    from ralph.app import create_app
+    from ralph.models import db, Event
+
+    app = create_app()
+    app.logger.setLevel(logging.CRITICAL)
+    url = "/events/ingest?durability=sync" if args.mode == "sync" else "/events/ingest"
+
+    stop = threading.Event()
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def producer(index):
+        client = app.test_client()
+        i = 0
+        while not stop.is_set():
+            started = time.perf_counter()
+            response = client.post(
+                url,
+                json={
+                    "event_type": "draft_generated",
+                    "source_system": "freshdesk",
+                    "intent": f"intent_{(index * 7919 + i) % 200}",
+                    "confidence_score": 0.9,
+                    "outcome": "resolved",
+                },
+            )
+            elapsed = time.perf_counter() - started
+            i += 1
+            with lock:
+                if response.status_code in (201, 202):
+                    latencies.append(elapsed)
+                else:
+                    errors.append(response.status_code)
+
+    threads = [threading.Thread(target=producer, args=(n,)) for n in range(args.producers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    started = time.perf_counter()
+    buffer = app.extensions.get("ralph_ingest_buffer")
+    if buffer is not None:
+        buffer.stop()
+    drain_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    with app.app_context():
+        stored = db.session.scalar(select(func.count()).select_from(Event))
+
+    return {
+        "mode": args.mode,
+        "events_per_s": round(len(latencies) / args.duration, 1),
+        "p50_ms": _percentile(latencies, 0.50),
+        "p99_ms": _percentile(latencies, 0.99),
+        "errors": len(errors),
+        "throttled": errors.count(503),
+        "accepted": len(latencies),
+        "stored": stored,
+        "shutdown_flush_ms": drain_ms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--mode", choices=["direct", "buffered", "sync", "all"], default="all")
+    parser.add_argument("--producers", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--synchronous", default="FULL")
+    args = parser.parse_args()
+
+    if args.mode != "all":
+        print(json.dumps(run_once(args)))
+        return
+
+    # One process per mode: Config is read from the environment at import
+    for mode in ("direct", "buffered", "sync"):
+        output = subprocess.run(
+            [
+                sys.executable, "-m", "benchmarks.ingest_buffer",
+                "--mode", mode,
+                "--producers", str(args.producers),
+                "--duration", str(args.duration),
+                "--synchronous", args.synchronous,
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(" ".join(f"{key}={value}" for key, value in result.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Ingest throughput: single-event path vs batch path.
+
+Runs both paths against a throwaway SQLite database and prints
+events/second for each.
+
+Usage:
+    python -m benchmarks.ingest_throughput [--events N] [--batch-size N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+
+def _payload(i):
+    return {
+        "event_type": "draft_generated",
+        "source_system": "freshdesk",
+        "intent": f"intent_{i % 50}",
+        "confidence_score": 0.5 + (i % 50) / 100,
+        "outcome": "resolved" if i % 4 else "escalated",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="ralph-bench-")
+    os.environ["RALPH_DATABASE_URL"] = "sqlite:///" + os.path.join(tmpdir, "bench.db")
+
+    from ralph.app import create_app
+
+    client = create_app().test_client()
+
+    started = time.perf_counter()
+    for i in range(args.events):
+        client.post("/events/ingest", json=_payload(i))
+    single_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for offset in range(0, args.events, args.batch_size):
+        batch = [
+            _payload(i)
+            for i in range(offset, min(offset + args.batch_size, args.events))
+        ]
+        client.post("/events/ingest/batch", json=batch)
+    batch_elapsed = time.perf_counter() - started
+
+    single_rate = args.events / single_elapsed
+    batch_rate = args.events / batch_elapsed
+
+    print(f"events:        {args.events}")
+    print(f"single-event:  {single_rate:,.0f} events/s ({single_elapsed:.2f}s)")
+    print(
+        f"batch ({args.batch_size}):   {batch_rate:,.0f} events/s "
+        f"({batch_elapsed:.2f}s)"
+    )
+    print(f"speedup:       {batch_rate / single_rate:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Import-time and cold-start benchmark.
+
+Every sample is a fresh interpreter against an already-migrated
+database, like a worker restart or a CLI invocation. It measures:
+
+- framework_import_ms: importing Flask and Flask-SQLAlchemy (not ours,
+  reported so the rest can be read against it),
+- import_ms: `import ralph.app` on top of that,
+- app_ready_ms: `import ralph.app` through a usable `ralph.app.app`,
+- first_health_ms / first_insight_ms: the first GET /health and the
+  first GET /insights/trends (which loads its analytics modules),
+- cold_start_ms: interpreter-side start through the first /health
+  response, framework imports included,
+- cold_start_during_write_ms: the same while another connection holds
+  the database write lock for --write-hold-ms,
+- process_ms: wall time of the whole child process, interpreter
+  start-up and exit included.
+
+Reports the median of --repeats runs as a flat JSON metrics file that
+`python -m benchmarks.suite compare` accepts.
+
+Usage:
+    python -m benchmarks.startup [--repeats N] [--seed-events N]
+        [--write-hold-ms N] [--output FILE] [--compare BASELINE]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.synthetic import seed_database
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+def probe():
+    started = time.perf_counter()
+
+    import flask  # noqa: F401
+    import flask_sqlalchemy  # noqa: F401
+
+    frameworks = time.perf_counter()
+
+    import importlib
+
+    module = importlib.import_module("ralph.app")
+    imported = time.perf_counter()
+
+    app = module.app
+    ready = time.perf_counter()
+
+    client = app.test_client()
+    client.get("/health")
+    healthy = time.perf_counter()
+
+    client.get("/insights/trends")
+    answered = time.perf_counter()
+
+    print(
+        json.dumps(
+            {
+                "framework_import_ms": _ms(frameworks - started),
+                "import_ms": _ms(imported - frameworks),
+                "app_ready_ms": _ms(ready - frameworks),
+                "first_health_ms": _ms(healthy - ready),
+                "first_insight_ms": _ms(answered - healthy),
+                "cold_start_ms": _ms(healthy - started),
+            }
+        )
+    )
+
+
+def _run_probe():
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--probe"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    sample = json.loads(output.strip().splitlines()[-1])
+    sample["process_ms"] = _ms(time.perf_counter() - started)
+    return sample
+
+
+def _hold_write_lock(path, seconds):
+    # Stand-in for a long ingest transaction in another worker
+    acquired = threading.Event()
+
+    def release():
+        connection = sqlite3.connect(path, isolation_level=None)
+        connection.execute("BEGIN IMMEDIATE")
+        acquired.set()
+        time.sleep(seconds)
+        connection.execute("ROLLBACK")
+        connection.close()
+
+    thread = threading.Thread(target=release)
+    thread.start()
+    acquired.wait()
+    return thread
+
+
+def run(args):
+    tmpdir = tempfile.mkdtemp(prefix="ralph-bench-")
+    path = os.path.join(tmpdir, "bench.db")
+    os.environ["RALPH_DATABASE_URL"] = "sqlite:///" + path
+    os.environ["RALPH_INSIGHTS_CACHE_MAX_ENTRIES"] = "0"
+    os.environ["RALPH_JOBS_ENABLED"] = "0"
+
+    # Seed and migrate in a child so this process stays import-free
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--seed", str(args.seed_events)],
+        check=True,
+    )
+
+    samples = [_run_probe() for _ in range(args.repeats)]
+    metrics = {
+        f"startup.{name}": round(statistics.median(s[name] for s in samples), 3)
+        for name in samples[0]
+    }
+
+    busy = []
+    for _ in range(args.busy_repeats):
+        holder = _hold_write_lock(path, args.write_hold_ms / 1000)
+        busy.append(_run_probe()["cold_start_ms"])
+        holder.join()
+    metrics["startup.cold_start_during_write_ms"] = round(statistics.median(busy), 3)
+
+    return {
+        "meta": {
+            "repeats": args.repeats,
+            "busy_repeats": args.busy_repeats,
+            "seed_events": args.seed_events,
+            "write_hold_ms": args.write_hold_ms,
+            "python": sys.version.split()[0],
+            "sqlite": sqlite3.sqlite_version,
+        },
+        "metrics": metrics,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeats", type=int, default=9)
+    parser.add_argument("--busy-repeats", type=int, default=3)
+    parser.add_argument("--seed-events", type=int, default=20000)
+    parser.add_argument("--write-hold-ms", type=int, default=1000)
+    parser.add_argument("--output", help="Write the result JSON here.")
+    parser.add_argument("--compare", help="Baseline JSON to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--probe", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--seed", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.probe:
+        probe()
+        return
+
+    if args.seed is not None:
+        from ralph.app import create_app
+
+        seed_database(create_app(), args.seed)
+        return
+
+    result = run(args)
+    text = json.dumps(result, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        from benchmarks.suite import compare, _print_comparison
+
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows, regressions = compare(baseline, result, args.threshold)
+        _print_comparison(rows)
+        if regressions:
+            sys.exit(f"{len(regressions)} metrics regressed by more than {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Synthetic-load benchmark suite with JSON baselines.
+
+`run` seeds a throwaway SQLite database with a deterministic synthetic
+load (see benchmarks.synthetic) and measures:
+
+- ingest_event and /events/ingest/batch throughput,
+- latency of every GET /insights/* route (response cache disabled),
+- runtime and peak traced memory of run_confidence_calibration and
+  generate_weekly_executive_summary.
+
+Results are written as a flat JSON metrics file. `compare` checks a
+result against a baseline and exits non-zero on regressions beyond the
+threshold. Metric names end in their unit, which also gives the
+direction: *_per_s is better when higher, *_ms / *_kib when lower.
+
+Usage:
+    python -m benchmarks.suite run [--scale 100k|1m|10m] [--output FILE]
+        [--repeats N] [--ingest-events N] [--batch-ingest-events N]
+        [--compare BASELINE]
+    python -m benchmarks.suite compare BASELINE CURRENT [--threshold 0.25]
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmarks.synthetic import SCALES, generate_events, seed_database
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def _timed(func, *args, **kwargs):
+    started = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - started
+
+
+def _traced_peak(func, *args, **kwargs):
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_ingest(app, events, batch_events, seed):
+    from ralph.events.intake import ingest_event
+
+    # Fresh payloads after the seeded history, without created_at
+    payloads = [
+        {key: value for key, value in row.items() if key != "created_at"}
+        for row in generate_events(events + batch_events, seed=seed + 1, days=1)
+    ]
+    single, batch = payloads[:events], payloads[events:]
+
+    with app.app_context():
+        elapsed = _timed(lambda: [ingest_event(dict(p)) for p in single])
+
+    client = app.test_client()
+    started = time.perf_counter()
+    for offset in range(0, len(batch), 500):
+        client.post("/events/ingest/batch", json=batch[offset:offset + 500])
+    batch_elapsed = time.perf_counter() - started
+
+    return {
+        "ingest.ingest_event.events_per_s": round(events / elapsed, 1),
+        "ingest.batch_500.events_per_s": round(len(batch) / batch_elapsed, 1),
+    }
+
+
+def bench_routes(app, repeats):
+    client = app.test_client()
+    routes = sorted(
+        rule.rule
+        for rule in app.url_map.iter_rules()
+        if rule.rule.startswith("/insights/")
+        and "GET" in rule.methods
+        and not rule.arguments
+    )
+
+    metrics = {}
+    for route in routes:
+        client.get(route)  # warm-up: imports, pools, page cache
+        samples = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            response = client.get(route)
+            samples.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise RuntimeError(f"{route} returned {response.status_code}")
+
+        name = route.replace("/insights/", "")
+        metrics[f"route.{name}.p50_ms"] = _ms(_percentile(samples, 0.50))
+        metrics[f"route.{name}.p95_ms"] = _ms(_percentile(samples, 0.95))
+
+    return metrics
+
+
+def bench_analytics(app):
+    from ralph.analytics.confidence import run_confidence_calibration
+    from ralph.analytics.weekly_executive_summary import (
+        generate_weekly_executive_summary,
+    )
+
+    metrics = {}
+    with app.app_context():
+        for name, func in (
+            ("calibration", run_confidence_calibration),
+            ("weekly_summary", generate_weekly_executive_summary),
+        ):
+            # Runtime and peak memory in separate runs: tracing slows
+            # allocation-heavy code down several times
+            metrics[f"{name}.runtime_ms"] = _ms(_timed(func))
+            metrics[f"{name}.peak_kib"] = round(_traced_peak(func) / 1024, 1)
+
+    return metrics
+
+
+def run(args):
+    events, intents = SCALES[args.scale]
+
+    tmpdir = tempfile.mkdtemp(prefix="ralph-bench-")
+    os.environ["RALPH_DATABASE_URL"] = "sqlite:///" + os.path.join(tmpdir, "bench.db")
+    os.environ["RALPH_INSIGHTS_CACHE_MAX_ENTRIES"] = "0"
+    os.environ["RALPH_JOBS_ENABLED"] = "0"
+
+    from ralph.app import create_app
+
+    app = create_app()
+
+    started = time.perf_counter()
+    seed_database(app, events, seed=args.seed, intents=intents)
+    print(f"seeded {events:,} events in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    metrics = {}
+    metrics.update(bench_analytics(app))
+    metrics.update(bench_routes(app, args.repeats))
+    metrics.update(
+        bench_ingest(app, args.ingest_events, args.batch_ingest_events, args.seed)
+    )
+
+    return {
+        "meta": {
+            "scale": args.scale,
+            "events": events,
+            "intents": intents,
+            "seed": args.seed,
+            "repeats": args.repeats,
+            "ingest_events": args.ingest_events,
+            "batch_ingest_events": args.batch_ingest_events,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "recorded_at": datetime.utcnow().isoformat(timespec="seconds"),
+        },
+        "metrics": metrics,
+    }
+
+
+def _higher_is_better(name):
+    return name.endswith("_per_s")
+
+
+def compare(baseline, current, threshold):
+    """
+    Per-metric change of `current` against `baseline`.
+
+    Returns (rows, regressions); a regression is a change worse than
+    `threshold` (a fraction) in the metric's bad direction.
+    """
+
+    rows = []
+    regressions = []
+    for name, before in sorted(baseline["metrics"].items()):
+        after = current["metrics"].get(name)
+        if after is None or not before:
+            continue
+
+        change = (after - before) / before
+        worse = -change if _higher_is_better(name) else change
+        status = "REGRESSION" if worse > threshold else "ok"
+        if worse > threshold:
+            regressions.append(name)
+        rows.append((name, before, after, change, status))
+
+    return rows, regressions
+
+
+def _print_comparison(rows):
+    for name, before, after, change, status in rows:
+        print(f"{status:<10} {name:<48} {before:>12} -> {after:>12} ({change:+.1%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the suite.")
+    run_parser.add_argument("--scale", choices=SCALES, default="100k")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--repeats", type=int, default=5)
+    run_parser.add_argument("--ingest-events", type=int, default=1000)
+    run_parser.add_argument("--batch-ingest-events", type=int, default=20000)
+    run_parser.add_argument("--output", help="Write the result JSON here.")
+    run_parser.add_argument("--compare", help="Baseline JSON to compare against.")
+    run_parser.add_argument("--threshold", type=float, default=0.25)
+
+    compare_parser = commands.add_parser("compare", help="Compare two result files.")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.25)
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        result = run(args)
+        text = json.dumps(result, indent=2, sort_keys=True)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+        else:
+            print(text)
+        baseline_path = args.compare
+    else:
+        with open(args.current, "r", encoding="utf-8") as f:
+            result = json.load(f)
+        baseline_path = args.baseline
+
+    if baseline_path:
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows, regressions = compare(baseline, result, args.threshold)
+        _print_comparison(rows)
+        if regressions:
+            sys.exit(f"{len(regressions)} metrics regressed by more than {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Deterministic synthetic event generator for benchmarks.
+
+The same (count, seed, intents, days, end) always yields the same
+events. The shape is loosely modelled on support-desk traffic:
+
+- intents follow a Zipf-like popularity curve (a few dominate, a long
+  tail is rare),
+- every intent has its own resolution rate and confidence level, and
+  resolved drafts score higher than escalated ones,
+- traffic peaks in business hours and drops at weekends,
+- events come out in time order, as live ingest would produce them.
+"""
+
+import bisect
+import math
+import random
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+
+SCALES = {
+    # name: (events, intent cardinality)
+    "100k": (100_000, 250),
+    "1m": (1_000_000, 500),
+    "10m": (10_000_000, 1_000),
+}
+
+SOURCES = ["freshdesk", "zendesk", "intercom", "email"]
+SOURCE_WEIGHTS = [5, 3, 2, 1]
+
+EVENT_TYPES = ["draft_generated", "draft_sent", "draft_edited"]
+EVENT_TYPE_WEIGHTS = [6, 3, 1]
+
+# Relative traffic per hour of day (UTC)
+HOUR_WEIGHTS = [
+    1, 1, 1, 1, 1, 2, 3, 5, 8, 10, 10, 10,
+    9, 10, 10, 9, 8, 6, 4, 3, 2, 2, 1, 1,
+]
+WEEKEND_FACTOR = 0.4
+
+
+def _hour_weight(ts):
+    weight = HOUR_WEIGHTS[ts.hour]
+    return weight * WEEKEND_FACTOR if ts.weekday() >= 5 else weight
+
+
+def _beta_score(rnd, mean, concentration=20.0):
+    mean = min(max(mean, 0.02), 0.98)
+    return round(rnd.betavariate(mean * concentration, (1 - mean) * concentration), 4)
+
+
+def generate_events(count, seed=0, intents=250, days=90, end=None):
+    """
+    Yield `count` event rows (dicts ready for insert(Event)) spread over
+    the `days` before `end` (default: the current hour), oldest first.
+    """
+
+    rnd = random.Random(seed)
+    end = end or datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    start = end - timedelta(days=days)
+
+    names = [f"intent_{rank:04d}" for rank in range(intents)]
+    popularity = list(accumulate(1 / (rank + 1) ** 1.1 for rank in range(intents)))
+    traits = [
+        # (resolution rate, mean confidence)
+        (rnd.uniform(0.6, 0.97), rnd.uniform(0.55, 0.9))
+        for _ in range(intents)
+    ]
+    sources = list(accumulate(SOURCE_WEIGHTS))
+    event_types = list(accumulate(EVENT_TYPE_WEIGHTS))
+
+    hours = [start + timedelta(hours=h) for h in range(days * 24)]
+    weights = list(accumulate(_hour_weight(ts) for ts in hours))
+    total_weight = weights[-1]
+
+    emitted = 0
+    for hour, cumulative in zip(hours, weights):
+        # Exact total: each hour gets its share of the running target
+        target = math.floor(count * cumulative / total_weight + 0.5)
+        seconds = sorted(rnd.random() * 3600 for _ in range(target - emitted))
+        emitted = target
+
+        for second in seconds:
+            index = bisect.bisect(popularity, rnd.random() * popularity[-1])
+            rate, confidence = traits[index]
+
+            roll = rnd.random()
+            if roll < rate:
+                outcome = "resolved"
+                follow_ups = int(rnd.expovariate(2.5))
+                score_mean = confidence + 0.05
+            elif roll < rate + (1 - rate) * 0.8:
+                outcome = "escalated"
+                follow_ups = int(rnd.expovariate(0.8))
+                score_mean = confidence - 0.12
+            else:
+                outcome = "abandoned"
+                follow_ups = 0
+                score_mean = confidence - 0.2
+
+            yield {
+                "event_type": EVENT_TYPES[
+                    bisect.bisect(event_types, rnd.random() * event_types[-1])
+                ],
+                "source_system": SOURCES[
+                    bisect.bisect(sources, rnd.random() * sources[-1])
+                ],
+                "intent": names[index],
+                "confidence_score": (
+                    None if rnd.random() < 0.03 else _beta_score(rnd, score_mean)
+                ),
+                "outcome": outcome,
+                "follow_up_count": min(follow_ups, 10),
+                "created_at": hour + timedelta(seconds=second),
+            }
+
+
+def seed_database(
+    app, count, seed=0, intents=250, days=90, batch_size=20000, idempotency_keys=False
+):
+    """
+    Bulk-load synthetic events into the app's database, then rebuild the
+    hourly rollups, intent registry, intent sketches and confidence
+    histograms from them.
+
+    With `idempotency_keys`, event n gets the key "seed-<seed>-<n>".
+    """
+
+    from sqlalchemy import insert
+
+    from ralph.models import db, Event
+    from ralph.analytics.rollups import rebuild_rollups
+    from ralph.analytics.intent_registry import rebuild_intent_registry
+    from ralph.analytics.sketches import rebuild_sketches
+    from ralph.analytics.confidence_histograms import rebuild_confidence_histograms
+
+    with app.app_context():
+        batch = []
+        rows = generate_events(count, seed=seed, intents=intents, days=days)
+        for n, row in enumerate(rows):
+            if idempotency_keys:
+                row["idempotency_key"] = f"seed-{seed}-{n}"
+            batch.append(row)
+            if len(batch) == batch_size:
+                db.session.execute(insert(Event), batch)
+                db.session.commit()
+                batch = []
+        if batch:
+            db.session.execute(insert(Event), batch)
+            db.session.commit()
+
+        with db.engine.begin() as connection:
+            rebuild_rollups(connection)
+            rebuild_intent_registry(connection)
+            rebuild_sketches(connection)
+            rebuild_confidence_histograms(connection)
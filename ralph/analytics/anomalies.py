@@ -0,0 +1,217 @@
+import math
+import struct
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from ralph.models import db, EventRollup, IntentAnomalyState
+from ralph.analytics.rollups import hour_floor
+from ralph.storage import read_session
+
+
+# One (mean, variance) pair per UTC hour of day
+SLOTS = 24
+_baseline = struct.Struct(f"<{2 * SLOTS}d")
+_EMPTY_BASELINE = [math.nan, 0.0] * SLOTS
+
+# An hour is closed this long after it ends, so events still in flight
+# (e.g. in the ingest buffer) reach its rollup before it is scored
+CLOSE_GRACE = timedelta(minutes=1)
+
+
+def _fold(state, count, hour, alpha, min_hours):
+    """
+    Score `count` for `hour` against the intent's baseline for that hour
+    of day, then fold it into the baseline (incremental EWMA mean and
+    variance).
+    """
+
+    values = state["values"]
+    slot = 2 * hour.hour
+    mean, variance = values[slot], values[slot + 1]
+
+    if math.isnan(mean):
+        values[slot], values[slot + 1] = float(count), 0.0
+        expected = z_score = None
+    else:
+        expected = mean
+        z_score = None
+        if state["observed_hours"] >= min_hours:
+            # Floored at the expected count (Poisson noise) and at one
+            # event, so flat or sparse series do not score every change
+            z_score = (count - mean) / math.sqrt(max(variance, mean, 1.0))
+
+        diff = count - mean
+        increment = alpha * diff
+        values[slot] = mean + increment
+        values[slot + 1] = (1 - alpha) * (variance + diff * increment)
+
+    state["observed_hours"] += 1
+    state["last_bucket"] = hour
+    state["last_count"] = count
+    state["expected_count"] = expected
+    state["z_score"] = z_score
+
+
+def advance_anomaly_state(now=None) -> int:
+    """
+    Analytics-only loop:
+    Fold every hourly rollup bucket closed since the last run into the
+    per-intent baselines, scoring each hour before it is folded in.
+
+    Each run reads only the new hours and writes one row per intent, so
+    cost is O(#intents * new hours) whatever the history length. The
+    first run (or one after a gap longer than ANOMALY_BOOTSTRAP_DAYS)
+    starts ANOMALY_BOOTSTRAP_DAYS back. Events arriving for an hour
+    after it was folded in are not counted. Returns the hours folded.
+    """
+
+    config = current_app.config
+    closed_end = hour_floor((now or datetime.utcnow()) - CLOSE_GRACE)
+    earliest = closed_end - timedelta(days=config["ANOMALY_BOOTSTRAP_DAYS"])
+    # Per-slot decay: each hour-of-day slot is updated once a day
+    alpha = 1 - 0.5 ** (1 / config["ANOMALY_HALFLIFE_DAYS"])
+    min_hours = config["ANOMALY_MIN_HISTORY_DAYS"] * SLOTS
+
+    reader = read_session()
+    states = {
+        row.intent: {
+            "intent": row.intent,
+            "values": list(_baseline.unpack(row.baseline)),
+            "observed_hours": row.observed_hours,
+            "last_bucket": row.last_bucket,
+        }
+        for row in reader.execute(select(IntentAnomalyState.__table__))
+    }
+
+    last_bucket = max((state["last_bucket"] for state in states.values()), default=None)
+    start = earliest
+    if last_bucket is not None:
+        start = max(start, last_bucket + timedelta(hours=1))
+    if start >= closed_end:
+        return 0
+
+    counts = {}
+    for bucket, intent, count in reader.execute(
+        select(EventRollup.bucket_start, EventRollup.intent, func.sum(EventRollup.event_count))
+        .where(EventRollup.bucket_start >= start, EventRollup.bucket_start < closed_end)
+        .group_by(EventRollup.bucket_start, EventRollup.intent)
+    ):
+        counts.setdefault(bucket, {})[intent] = count
+
+    hours = 0
+    hour = start
+    while hour < closed_end:
+        observed = counts.get(hour, {})
+        for intent in observed:
+            if intent not in states:
+                states[intent] = {
+                    "intent": intent,
+                    "values": list(_EMPTY_BASELINE),
+                    "observed_hours": 0,
+                }
+
+        for intent, state in states.items():
+            _fold(state, observed.get(intent, 0), hour, alpha, min_hours)
+
+        hour += timedelta(hours=1)
+        hours += 1
+
+    # Another run may have advanced the state while this one computed
+    stored_last = db.session.scalar(select(func.max(IntentAnomalyState.last_bucket)))
+    if stored_last != last_bucket:
+        db.session.rollback()
+        return 0
+
+    if states:
+        stmt = sqlite_insert(IntentAnomalyState)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["intent"],
+            set_={
+                name: stmt.excluded[name]
+                for name in (
+                    "baseline",
+                    "observed_hours",
+                    "last_bucket",
+                    "last_count",
+                    "expected_count",
+                    "z_score",
+                )
+            },
+        )
+        db.session.execute(
+            stmt,
+            [
+                {
+                    "intent": state["intent"],
+                    "baseline": _baseline.pack(*state["values"]),
+                    "observed_hours": state["observed_hours"],
+                    "last_bucket": state["last_bucket"],
+                    "last_count": state["last_count"],
+                    "expected_count": state["expected_count"],
+                    "z_score": state["z_score"],
+                }
+                for state in states.values()
+            ],
+        )
+
+    db.session.commit()
+    return hours
+
+
+def list_anomalies(threshold=None, intent=None):
+    """
+    Analytics insight:
+    Intents whose latest closed hour deviates from their seasonal
+    baseline (same hour of day, EWMA) by at least `threshold` standard
+    deviations (default ANOMALY_Z_THRESHOLD), strongest first.
+
+    Reads the stored state only: O(#intents). Intents with less than
+    ANOMALY_MIN_HISTORY_DAYS of history are not scored.
+    Descriptive only. Non-actionable.
+    """
+
+    if threshold is None:
+        threshold = current_app.config["ANOMALY_Z_THRESHOLD"]
+
+    stmt = select(
+        IntentAnomalyState.intent,
+        IntentAnomalyState.last_bucket,
+        IntentAnomalyState.last_count,
+        IntentAnomalyState.expected_count,
+        IntentAnomalyState.z_score,
+    ).where(func.abs(IntentAnomalyState.z_score) >= threshold)
+    if intent is not None:
+        stmt = stmt.where(IntentAnomalyState.intent == intent)
+
+    rows = sorted(
+        read_session().execute(stmt),
+        key=lambda row: (-abs(row.z_score), row.intent),
+    )
+
+    insights = []
+    for row in rows:
+        direction = "spike" if row.z_score > 0 else "drop"
+        insights.append(
+            {
+                "insight_type": "intent_anomaly",
+                "intent": row.intent,
+                "bucket_start": row.last_bucket.isoformat(),
+                "event_count": row.last_count,
+                "expected_count": round(row.expected_count, 2),
+                "z_score": round(row.z_score, 2),
+                "direction": direction,
+                "message": (
+                    f"Intent '{row.intent}' had {row.last_count} events in "
+                    f"the hour from {row.last_bucket:%Y-%m-%d %H:00} UTC, "
+                    f"a {direction} against about {row.expected_count:.1f} "
+                    f"expected (z = {row.z_score:+.1f})."
+                ),
+                "actionable": False,
+                "requires_approval": False,
+            }
+        )
+
+    return insights
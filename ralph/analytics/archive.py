@@ -0,0 +1,324 @@
+import heapq
+import json
+import os
+from contextlib import ExitStack
+from itertools import islice
+
+import numpy as np
+from sqlalchemy import select
+
+from ralph.models import Event
+from ralph.partitions import detached_partitions, partition_engine
+from ralph.storage import read_session
+
+
+# Fixed-width columns, one raw little-endian file each (<name>.bin)
+COLUMNS = {
+    "id": "<i8",
+    "created_at": "<i8",  # microseconds since the Unix epoch (naive UTC)
+    "confidence_score": "<f8",  # NaN when the event had no score
+    "follow_up_count": "<i4",
+    "intent": "<i4",
+    "outcome": "<i4",
+    "source_system": "<i4",
+    "event_type": "<i4",
+}
+
+# Columns stored as codes into a per-archive dictionary
+DICTIONARY_COLUMNS = ("intent", "outcome", "source_system", "event_type")
+
+META_FILE = "meta.json"
+EPOCH = np.datetime64(0, "us")
+
+
+def _to_micros(ts):
+    return int((np.datetime64(ts, "us") - EPOCH).astype(np.int64))
+
+
+def _empty_meta():
+    return {
+        "version": 1,
+        "row_count": 0,
+        "last_event_id": 0,
+        "max_created_at": None,
+        "time_sorted": True,
+        "dictionaries": {name: [] for name in DICTIONARY_COLUMNS},
+    }
+
+
+def read_meta(path) -> dict:
+    meta_path = os.path.join(path, META_FILE)
+    if not os.path.exists(meta_path):
+        return _empty_meta()
+    with open(meta_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_meta(path, meta):
+    # Atomic replace: meta.json is the commit point for appended rows
+    tmp_path = os.path.join(path, META_FILE + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(path, META_FILE))
+
+
+def _read_rows(executor, after, batch_size):
+    while True:
+        rows = executor.execute(
+            select(
+                Event.id,
+                Event.created_at,
+                Event.confidence_score,
+                Event.follow_up_count,
+                Event.intent,
+                Event.outcome,
+                Event.source_system,
+                Event.event_type,
+            )
+            .where(Event.id > after)
+            .order_by(Event.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return
+        yield from rows
+        after = rows[-1].id
+
+
+def _event_batches(after, batch_size):
+    # Merge the main table and every detached partition holding newer
+    # ids by id: partitions split by time, so their id ranges can overlap
+    with ExitStack() as stack:
+        sources = [_read_rows(read_session(), after, batch_size)]
+        for partition in detached_partitions():
+            if (partition.last_event_id or 0) > after:
+                connection = stack.enter_context(partition_engine(partition).connect())
+                sources.append(_read_rows(connection, after, batch_size))
+
+        merged = heapq.merge(*sources, key=lambda row: row.id)
+        while True:
+            batch = list(islice(merged, batch_size))
+            if not batch:
+                return
+            yield batch
+
+
+def export_events(path, batch_size=50000) -> dict:
+    """
+    Append events newer than the archive's last_event_id to `path`.
+
+    Events are read in id order, a batch at a time, from the read-only
+    session and the detached partitions, dictionary-encoded and
+    appended to the column files. meta.json is rewritten after every
+    batch; bytes past its row_count (left by an interrupted export) are
+    truncated before appending, so a rerun picks up where the last
+    committed batch ended.
+
+    Returns {"exported": n, "row_count": total, "last_event_id": id}.
+    """
+
+    os.makedirs(path, exist_ok=True)
+    meta = read_meta(path)
+
+    for name, dtype in COLUMNS.items():
+        column_path = os.path.join(path, f"{name}.bin")
+        with open(column_path, "ab") as f:
+            f.truncate(meta["row_count"] * np.dtype(dtype).itemsize)
+
+    codes = {
+        name: {value: code for code, value in enumerate(values)}
+        for name, values in meta["dictionaries"].items()
+    }
+
+    exported = 0
+
+    for rows in _event_batches(meta["last_event_id"], batch_size):
+        ids, created_at, scores, follow_ups, *labels = zip(*rows)
+
+        columns = {
+            "id": np.array(ids, dtype=COLUMNS["id"]),
+            "created_at": (
+                np.array(created_at, dtype="datetime64[us]") - EPOCH
+            ).astype(COLUMNS["created_at"]),
+            "confidence_score": np.array(
+                [np.nan if s is None else s for s in scores],
+                dtype=COLUMNS["confidence_score"],
+            ),
+            "follow_up_count": np.array(follow_ups, dtype=COLUMNS["follow_up_count"]),
+        }
+        for name, values in zip(DICTIONARY_COLUMNS, labels):
+            lookup = codes[name]
+            for value in set(values) - lookup.keys():
+                lookup[value] = len(meta["dictionaries"][name])
+                meta["dictionaries"][name].append(value)
+            columns[name] = np.array(
+                [lookup[value] for value in values], dtype=COLUMNS[name]
+            )
+
+        for name, values in columns.items():
+            with open(os.path.join(path, f"{name}.bin"), "ab") as f:
+                values.tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+
+        ts = columns["created_at"]
+        if meta["time_sorted"]:
+            previous = meta["max_created_at"]
+            meta["time_sorted"] = bool(
+                (previous is None or previous <= ts[0]) and np.all(ts[1:] >= ts[:-1])
+            )
+        batch_max = int(ts.max())
+        if meta["max_created_at"] is None or batch_max > meta["max_created_at"]:
+            meta["max_created_at"] = batch_max
+
+        meta["row_count"] += len(rows)
+        meta["last_event_id"] = int(ids[-1])
+        _write_meta(path, meta)
+
+        exported += len(rows)
+
+    return {
+        "exported": exported,
+        "row_count": meta["row_count"],
+        "last_event_id": meta["last_event_id"],
+    }
+
+
+class EventArchive:
+    """
+    Read-only, memory-mapped view of an exported event archive.
+
+    Column files are mapped, not read: only the pages a scan touches are
+    paged in, and slices of a time-sorted archive are zero-copy views.
+    aggregate_windows / window_totals mirror ralph.analytics.windows so
+    the window-based analytics can take an archive as their `source`.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.meta = read_meta(path)
+        self.row_count = self.meta["row_count"]
+        self.dictionaries = self.meta["dictionaries"]
+
+        self.columns = {}
+        for name, dtype in COLUMNS.items():
+            column_path = os.path.join(path, f"{name}.bin")
+            if self.row_count:
+                self.columns[name] = np.memmap(
+                    column_path, dtype=dtype, mode="r", shape=(self.row_count,)
+                )
+            else:
+                self.columns[name] = np.empty(0, dtype=dtype)
+
+    def __len__(self):
+        return self.row_count
+
+    def _select(self, start, end):
+        # Slice (zero-copy) when rows are in time order, else a mask
+        lo, hi = _to_micros(start), _to_micros(end)
+        created_at = self.columns["created_at"]
+        if self.meta["time_sorted"]:
+            return slice(
+                int(np.searchsorted(created_at, lo, side="left")),
+                int(np.searchsorted(created_at, hi, side="left")),
+            )
+        return np.flatnonzero((created_at >= lo) & (created_at < hi))
+
+    def aggregate_windows(self, windows, dimensions=("intent",)) -> dict:
+        """
+        Aggregate archived events for every [start, end) window.
+
+        Dimension codes are packed into one integer key per row; each
+        window is then a unique + bincount pass over its rows.
+
+        Returns {dimension values tuple: [totals dict per window]}, the
+        same shape as ralph.analytics.windows.aggregate_windows.
+        """
+
+        if not self.row_count:
+            return {}
+
+        sizes = [len(self.dictionaries[name]) for name in dimensions]
+
+        partials = []
+        for start, end in windows:
+            rows = self._select(start, end)
+
+            if dimensions:
+                keys = np.ravel_multi_index(
+                    [self.columns[name][rows] for name in dimensions], sizes
+                )
+            else:
+                keys = np.zeros(len(self.columns["id"][rows]), dtype=np.int64)
+
+            unique, inverse = np.unique(keys, return_inverse=True)
+            scores = self.columns["confidence_score"][rows]
+            scored = ~np.isnan(scores)
+
+            partials.append(
+                (
+                    unique,
+                    {
+                        "event_count": np.bincount(inverse, minlength=len(unique)),
+                        "follow_up_sum": np.bincount(
+                            inverse,
+                            weights=self.columns["follow_up_count"][rows],
+                            minlength=len(unique),
+                        ),
+                        "confidence_sum": np.bincount(
+                            inverse[scored],
+                            weights=scores[scored],
+                            minlength=len(unique),
+                        ),
+                        "confidence_count": np.bincount(
+                            inverse[scored], minlength=len(unique)
+                        ),
+                    },
+                )
+            )
+
+        results = {}
+        for index, (unique, metrics) in enumerate(partials):
+            if dimensions:
+                decoded = zip(
+                    *(
+                        [self.dictionaries[name][code] for code in codes]
+                        for name, codes in zip(
+                            dimensions, np.unravel_index(unique, sizes)
+                        )
+                    )
+                )
+            else:
+                decoded = [()] * len(unique)
+
+            for position, key in enumerate(decoded):
+                per_window = results.get(key)
+                if per_window is None:
+                    per_window = results[key] = [
+                        {
+                            "event_count": 0,
+                            "follow_up_sum": 0,
+                            "confidence_sum": 0.0,
+                            "confidence_count": 0,
+                        }
+                        for _ in windows
+                    ]
+                totals = per_window[index]
+                totals["event_count"] = int(metrics["event_count"][position])
+                totals["follow_up_sum"] = int(metrics["follow_up_sum"][position])
+                totals["confidence_sum"] = float(metrics["confidence_sum"][position])
+                totals["confidence_count"] = int(
+                    metrics["confidence_count"][position]
+                )
+
+        return results
+
+    def window_totals(self, start, end, dimensions=("intent",)) -> dict:
+        return {
+            key: per_window[0]
+            for key, per_window in self.aggregate_windows(
+                [(start, end)], dimensions
+            ).items()
+        }
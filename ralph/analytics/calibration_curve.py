@@ -0,0 +1,183 @@
+import numpy as np
+from sqlalchemy import select
+
+from ralph.config import Config
+from ralph.models import Event
+from ralph.partitions import detached_partitions, execute_on_partitions
+from ralph.storage import read_session
+
+
+# Candidate confidence thresholds: 0.50, 0.51, ... 0.99
+THRESHOLDS = np.round(np.arange(0.50, 1.00, 0.01), 2)
+
+
+def sweep_thresholds(intent_codes, scores, resolved, intent_count):
+    """
+    Coverage and resolution counts for every intent at every threshold.
+
+    Each score is bucketed once against THRESHOLDS (searchsorted), the
+    buckets are counted per intent with one bincount over a packed
+    (intent, bucket) index, and a reverse cumulative sum turns bucket
+    counts into "score >= threshold" counts for all thresholds at once.
+
+    Returns (covered, resolved_covered), both shaped
+    (intent_count, len(THRESHOLDS)).
+    """
+
+    buckets = len(THRESHOLDS) + 1
+    # Bucket k holds scores in [THRESHOLDS[k-1], THRESHOLDS[k])
+    bucket = np.searchsorted(THRESHOLDS, scores, side="right")
+    packed = intent_codes * buckets + bucket
+
+    size = intent_count * buckets
+    counts = np.bincount(packed, minlength=size).reshape(intent_count, buckets)
+    wins = np.bincount(packed[resolved], minlength=size).reshape(intent_count, buckets)
+
+    # at_least[:, k] = observations in bucket k or above
+    at_least = np.cumsum(counts[:, ::-1], axis=1)[:, ::-1]
+    wins_at_least = np.cumsum(wins[:, ::-1], axis=1)[:, ::-1]
+
+    # Threshold i admits buckets i + 1 and above
+    return at_least[:, 1:], wins_at_least[:, 1:]
+
+
+def _load_archive_scores(source, filters, group_by):
+    scores = np.asarray(source.columns["confidence_score"])
+    keep = ~np.isnan(scores)
+    for name, value in filters.items():
+        dictionary = source.dictionaries[name]
+        code = dictionary.index(value) if value in dictionary else -1
+        keep &= np.asarray(source.columns[name]) == code
+
+    outcomes = source.dictionaries["outcome"]
+    resolved_code = outcomes.index("resolved") if "resolved" in outcomes else -1
+    intents = source.dictionaries["intent"]
+    intent_codes = np.asarray(source.columns["intent"])[keep].astype(np.int64)
+
+    labels = intents
+    if group_by:
+        groups = source.dictionaries[group_by]
+        pairs = intent_codes * len(groups) + np.asarray(source.columns[group_by])[keep]
+        unique, intent_codes = np.unique(pairs, return_inverse=True)
+        labels = [
+            (intents[pair // len(groups)], groups[pair % len(groups)])
+            for pair in unique.tolist()
+        ]
+
+    return (
+        labels,
+        intent_codes.reshape(-1),
+        scores[keep],
+        np.asarray(source.columns["outcome"])[keep] == resolved_code,
+    )
+
+
+def _load_scores(source=None, filters=None, group_by=None):
+    # (labels, label code per row, scores, resolved mask); labels are
+    # intents, or (intent, group_by value) pairs when grouping
+    if source is not None:
+        return _load_archive_scores(source, filters or {}, group_by)
+
+    dims = [Event.intent] + ([getattr(Event, group_by)] if group_by else [])
+    stmt = (
+        select(*dims, Event.confidence_score, Event.outcome == "resolved")
+        .where(Event.confidence_score.isnot(None))
+    )
+    for name, value in (filters or {}).items():
+        stmt = stmt.where(getattr(Event, name) == value)
+
+    rows = read_session().execute(stmt).all()
+    rows.extend(execute_on_partitions(stmt, detached_partitions()))
+
+    width = len(dims)
+    codes = {}
+    intent_codes = [
+        codes.setdefault(tuple(row[:width]) if group_by else row[0], len(codes))
+        for row in rows
+    ]
+
+    return (
+        list(codes),
+        np.array(intent_codes, dtype=np.int64),
+        np.array([row[width] for row in rows], dtype=np.float64),
+        np.array([bool(row[width + 1]) for row in rows], dtype=bool),
+    )
+
+
+def compute_calibration_curves(
+    target_rate=None, intent=None, source=None, filters=None, group_by=None
+):
+    """
+    Analytics insight:
+    Per-intent resolution rate and coverage at every confidence
+    threshold from 0.50 to 0.99.
+
+    Each curve point says: if drafts were only sent at or above this
+    threshold, this share of the intent's events would be covered and
+    this share of those would resolve. `recommended_threshold` is the
+    lowest threshold whose resolution rate meets `target_rate`.
+
+    All thresholds come from one vectorized pass (sweep_thresholds).
+    Scores come from raw events, so compacted partitions are not
+    included.
+    `source` reads scores from an event archive instead of the database.
+    `filters` keeps one source_system / event_type slice and `group_by`
+    (one of those dimensions) gives one curve per intent and value.
+    Advisory only. Never applied automatically.
+    """
+
+    if target_rate is None:
+        target_rate = Config.CALIBRATION_TARGET_RESOLUTION_RATE
+
+    labels, intent_codes, scores, resolved = _load_scores(source, filters, group_by)
+    if not len(scores):
+        return []
+
+    covered, wins = sweep_thresholds(intent_codes, scores, resolved, len(labels))
+    observations = np.bincount(intent_codes, minlength=len(labels))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rates = wins / covered
+    coverage = covered / np.maximum(observations, 1)[:, None]
+    meets_target = (covered > 0) & (rates >= target_rate)
+
+    insights = []
+    for code in sorted(range(len(labels)), key=lambda c: labels[c]):
+        label = labels[code]
+        label_intent = label[0] if group_by else label
+        if intent is not None and label_intent != intent:
+            continue
+        if observations[code] < Config.MIN_SAMPLE_SIZE:
+            continue
+
+        hits = np.flatnonzero(meets_target[code])
+        recommended = float(THRESHOLDS[hits[0]]) if len(hits) else None
+
+        insight = {
+            "insight_type": "calibration_curve",
+            "intent": label_intent,
+            "observation_count": int(observations[code]),
+            "target_resolution_rate": target_rate,
+            "recommended_threshold": recommended,
+            "recommended_coverage": (
+                float(coverage[code, hits[0]]) if len(hits) else None
+            ),
+            "curve": [
+                {
+                    "threshold": float(threshold),
+                    "covered_count": int(count),
+                    "coverage": float(share),
+                    "resolution_rate": float(rate) if count else None,
+                }
+                for threshold, count, share, rate in zip(
+                    THRESHOLDS, covered[code], coverage[code], rates[code]
+                )
+            ],
+            "actionable": False,
+            "requires_approval": True,
+        }
+        if group_by:
+            insight[group_by] = label[1]
+        insights.append(insight)
+
+    return insights
@@ -1,10 +1,46 @@
-from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from ralph.config import Config
-from ralph.models import db, Event, ConfidenceCalibration
+from ralph.models import (
+    db,
+    Event,
+    EventRollup,
+    ConfidenceCalibration,
+    CalibrationTally,
+    AnalyticsWatermark,
+)
+from ralph.partitions import hot_boundary
+from ralph.storage import read_session
+
 
+WATERMARK_NAME = "confidence_calibration"
 
-def run_confidence_calibration():
+
+def recommend_threshold(success_rate: float) -> float:
+    """
+    Simple, conservative adjustment rules around the configured baseline.
+    """
+
+    recommended_threshold = Config.CONFIDENCE_BASELINE
+
+    if success_rate >= 0.95:
+        recommended_threshold = max(
+            0.75,
+            Config.CONFIDENCE_BASELINE - 0.02
+        )
+    elif success_rate < 0.80:
+        recommended_threshold = min(
+            0.95,
+            Config.CONFIDENCE_BASELINE + 0.05
+        )
+
+    return recommended_threshold
+
+
+def run_confidence_calibration(incremental: bool = False):
     """
     Analyze historical events and produce advisory confidence calibrations.
 
@@ -13,80 +49,187 @@ def run_confidence_calibration():
     - Computes success rates per intent
     - Writes advisory ConfidenceCalibration records
     - NEVER applies changes automatically
-    """
 
-    # Pull all events with a confidence score
-    events = (
-        Event.query
-        .filter(Event.confidence_score.isnot(None))
-        .all()
-    )
-
-    if not events:
-        return []
-
-    # Group events by intent
-    by_intent = defaultdict(list)
-    for e in events:
-        by_intent[e.intent].append(e)
-
-    results = []
-
-    for intent, intent_events in by_intent.items():
-        observation_count = len(intent_events)
-
-        # Enforce minimum sample size
-        if observation_count < Config.MIN_SAMPLE_SIZE:
-            continue
+    Counting runs as one aggregate query and results are written with
+    one bulk upsert. With incremental=True only events above the stored
+    high-water mark are folded into the running per-intent tallies.
+    A full run takes partitioned history from the hourly rollups.
+    """
 
-        successes = [
-            e for e in intent_events
-            if e.outcome == "resolved"
+    # Read phase runs on the read-only engine so the (possibly long)
+    # aggregate scan never holds the write lock.
+    reader = read_session()
+
+    high_water = reader.scalar(select(func.max(Event.id))) or 0
+
+    last_event_id = 0
+    if incremental:
+        last_event_id = reader.scalar(
+            select(AnalyticsWatermark.last_event_id)
+            .where(AnalyticsWatermark.name == WATERMARK_NAME)
+        ) or 0
+
+    # Per-intent counts for the events not yet folded in
+    new_counts = reader.execute(
+        select(
+            Event.intent,
+            func.count(Event.id),
+            func.sum(case((Event.outcome == "resolved", 1), else_=0)),
+        )
+        .where(
+            Event.confidence_score.isnot(None),
+            Event.id > last_event_id,
+            Event.id <= high_water,
+        )
+        .group_by(Event.intent)
+    ).all()
+
+    boundary = None if incremental else hot_boundary()
+    if boundary is not None:
+        # Months moved out of the events table are immutable
+        history = reader.execute(
+            select(
+                EventRollup.intent,
+                func.sum(EventRollup.confidence_count),
+                func.sum(
+                    case(
+                        (EventRollup.outcome == "resolved", EventRollup.confidence_count),
+                        else_=0,
+                    )
+                ),
+            )
+            .where(EventRollup.bucket_start < boundary)
+            .group_by(EventRollup.intent)
+        ).all()
+
+        merged = {}
+        for intent, observations, resolved in list(new_counts) + history:
+            totals = merged.setdefault(intent, [0, 0])
+            totals[0] += observations
+            totals[1] += resolved
+        new_counts = [
+            (intent, observations, resolved)
+            for intent, (observations, resolved) in merged.items()
+            if observations
         ]
 
-        success_rate = len(successes) / observation_count
+    if not incremental:
+        db.session.execute(delete(CalibrationTally))
+
+    if new_counts:
+        stmt = sqlite_insert(CalibrationTally)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["intent"],
+            set_={
+                "observation_count": (
+                    CalibrationTally.observation_count
+                    + stmt.excluded.observation_count
+                ),
+                "resolved_count": (
+                    CalibrationTally.resolved_count
+                    + stmt.excluded.resolved_count
+                ),
+            },
+        )
+        db.session.execute(
+            stmt,
+            [
+                {
+                    "intent": intent,
+                    "observation_count": observations,
+                    "resolved_count": resolved,
+                }
+                for intent, observations, resolved in new_counts
+            ],
+        )
 
-        # Start from baseline
-        recommended_threshold = Config.CONFIDENCE_BASELINE
+    stmt = sqlite_insert(AnalyticsWatermark).values(
+        name=WATERMARK_NAME,
+        last_event_id=high_water,
+        updated_at=datetime.utcnow(),
+    )
+    db.session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["name"],
+            set_={
+                "last_event_id": stmt.excluded.last_event_id,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+    )
 
-        # Simple, conservative adjustment rules
-        if success_rate >= 0.95:
-            recommended_threshold = max(
-                0.75,
-                Config.CONFIDENCE_BASELINE - 0.02
-            )
-        elif success_rate < 0.80:
-            recommended_threshold = min(
-                0.95,
-                Config.CONFIDENCE_BASELINE + 0.05
-            )
+    # Enforce minimum sample size
+    tallies = (
+        CalibrationTally.query
+        .filter(CalibrationTally.observation_count >= Config.MIN_SAMPLE_SIZE)
+        .order_by(CalibrationTally.intent)
+        .all()
+    )
 
-        # Upsert calibration (advisory only)
-        calibration = ConfidenceCalibration.query.filter_by(
-            intent=intent
-        ).first()
-
-        if calibration:
-            calibration.recommended_threshold = recommended_threshold
-            calibration.success_rate = success_rate
-            calibration.observation_count = observation_count
-        else:
-            calibration = ConfidenceCalibration(
-                intent=intent,
-                recommended_threshold=recommended_threshold,
-                success_rate=success_rate,
-                observation_count=observation_count,
-            )
-            db.session.add(calibration)
+    results = []
+    for tally in tallies:
+        success_rate = tally.resolved_count / tally.observation_count
 
         results.append(
             {
-                "intent": intent,
-                "recommended_threshold": recommended_threshold,
+                "intent": tally.intent,
+                "recommended_threshold": recommend_threshold(success_rate),
                 "success_rate": success_rate,
-                "observation_count": observation_count,
+                "observation_count": tally.observation_count,
             }
         )
 
+    # Upsert calibrations (advisory only)
+    if results:
+        stmt = sqlite_insert(ConfidenceCalibration)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["intent"],
+            set_={
+                "recommended_threshold": stmt.excluded.recommended_threshold,
+                "success_rate": stmt.excluded.success_rate,
+                "observation_count": stmt.excluded.observation_count,
+            },
+        )
+        db.session.execute(stmt, results)
+
     db.session.commit()
     return results
+
+
+def list_calibrations(intent_range=None):
+    """
+    Read-only view of the advisory confidence calibrations.
+
+    `intent_range` (first, last) limits it to one keyset page, sorted
+    by intent.
+    """
+
+    stmt = select(ConfidenceCalibration)
+    if intent_range is not None:
+        stmt = (
+            stmt.where(ConfidenceCalibration.intent.between(*intent_range))
+            .order_by(ConfidenceCalibration.intent)
+        )
+
+    return [
+        {
+            "intent": c.intent,
+            "recommended_threshold": c.recommended_threshold,
+            "success_rate": c.success_rate,
+            "observation_count": c.observation_count,
+            "actionable": False,
+            "requires_approval": True,
+        }
+        for c in read_session().scalars(stmt)
+    ]
+
+
+def calibrated_intents(intent_range=None) -> set:
+    """
+    Intents that have an advisory confidence calibration.
+    """
+
+    stmt = select(ConfidenceCalibration.intent)
+    if intent_range is not None:
+        stmt = stmt.where(ConfidenceCalibration.intent.between(*intent_range))
+    return set(read_session().scalars(stmt))
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+
+from ralph.config import Config
+from ralph.analytics.confidence_histograms import (
+    BUCKET_WIDTH,
+    histogram_quantile,
+    ks_distance,
+    window_histograms,
+)
+from ralph.analytics.sketches import day_floor
+
+
+QUANTILES = (("p10", 0.10), ("p50", 0.50), ("p90", 0.90))
+
+
+def compute_confidence_distributions(days=7, intent=None):
+    """
+    Analytics insight:
+    Per-intent confidence score distribution (p10/p50/p90) over the last
+    `days` whole UTC days plus today so far, and its drift against the
+    `days` whole days before those.
+
+    Answered from the per-day histograms kept at ingest, never from raw
+    events, so quantiles are accurate to one bucket width (0.01). Drift
+    is the change in p50 and the largest gap between the two windows'
+    score distributions (ks_distance, 0..1); it is None when the
+    previous window has fewer than MIN_SAMPLE_SIZE scored events.
+    Descriptive only. Non-actionable.
+    """
+
+    now = datetime.utcnow()
+    # Both windows are anchored on today's UTC midnight
+    boundary = day_floor(now) - timedelta(days=days)
+    windows = [(boundary - timedelta(days=days), boundary), (boundary, now)]
+
+    insights = []
+    for name, (previous, current) in sorted(
+        window_histograms(windows, intent=intent).items()
+    ):
+        observations = sum(current)
+        if observations < Config.MIN_SAMPLE_SIZE:
+            continue
+
+        quantiles = {
+            label: histogram_quantile(current, q) for label, q in QUANTILES
+        }
+        filled = [index for index, count in enumerate(current) if count]
+
+        insight = {
+            "insight_type": "confidence_distribution",
+            "intent": name,
+            "observation_count": observations,
+            "time_window_days": days,
+            **quantiles,
+            "histogram": {
+                "bucket_width": BUCKET_WIDTH,
+                "first_bucket": filled[0],
+                "counts": current[filled[0]:filled[-1] + 1],
+            },
+            "previous_observation_count": sum(previous),
+            "p50_delta": None,
+            "ks_distance": None,
+            "message": (
+                f"Intent '{name}' confidence p10/p50/p90 was "
+                f"{quantiles['p10']}/{quantiles['p50']}/{quantiles['p90']} "
+                f"over the last {days} days."
+            ),
+            "actionable": False,
+            "requires_approval": False,
+        }
+
+        if sum(previous) >= Config.MIN_SAMPLE_SIZE:
+            insight["p50_delta"] = round(
+                quantiles["p50"] - histogram_quantile(previous, 0.50), 4
+            )
+            insight["ks_distance"] = ks_distance(previous, current)
+
+        insights.append(insight)
+
+    return insights
@@ -0,0 +1,267 @@
+import struct
+
+from sqlalchemy import (
+    bindparam,
+    cast,
+    delete,
+    func,
+    insert,
+    Integer,
+    select,
+    type_coerce,
+    update,
+)
+
+from ralph.models import db, ConfidenceHistogram, Event
+from ralph.analytics.sketches import DAY_BUCKET_FORMAT, day_floor
+from ralph.partitions import hot_boundary
+from ralph.storage import read_session
+
+
+CONFIDENCE_BUCKETS = 100
+BUCKET_WIDTH = 1.0 / CONFIDENCE_BUCKETS
+# Keeps scores such as 0.29 (28.999... * 100 in binary) in their own bucket
+BUCKET_EPSILON = 1e-9
+
+_histograms = ConfidenceHistogram.__table__
+
+# Built once: ingest runs these on every commit (see ralph.analytics.sketches).
+# Days and intents are matched separately: SQLite answers a row-value
+# (bucket_start, intent) IN (...) with a full table scan.
+_select_keys = select(_histograms).where(
+    _histograms.c.bucket_start.in_(bindparam("days", expanding=True)),
+    _histograms.c.intent.in_(bindparam("intents", expanding=True)),
+)
+_update_key = update(_histograms).where(
+    _histograms.c.bucket_start == bindparam("day"),
+    _histograms.c.intent == bindparam("key_intent"),
+)
+
+
+def score_bucket(score) -> int:
+    """
+    Histogram bucket for a confidence score. Scores outside [0, 1] land
+    in the first or last bucket.
+    """
+    bucket = int(score * CONFIDENCE_BUCKETS + BUCKET_EPSILON)
+    return min(CONFIDENCE_BUCKETS - 1, max(0, bucket))
+
+
+def pack_counts(counts):
+    """
+    (first_bucket, packed bytes) for a full CONFIDENCE_BUCKETS list,
+    keeping only the span between the first and last non-empty bucket.
+    """
+
+    filled = [index for index, count in enumerate(counts) if count]
+    if not filled:
+        return 0, b""
+
+    span = counts[filled[0]:filled[-1] + 1]
+    return filled[0], struct.pack(f"<{len(span)}I", *span)
+
+
+def unpack_counts(first_bucket, packed, into=None):
+    """
+    Add packed bucket counts into `into` (a CONFIDENCE_BUCKETS list,
+    created when omitted) and return it.
+    """
+
+    counts = into if into is not None else [0] * CONFIDENCE_BUCKETS
+    for offset, count in enumerate(struct.unpack(f"<{len(packed) // 4}I", packed)):
+        counts[first_bucket + offset] += count
+    return counts
+
+
+def apply_to_histograms(rows):
+    """
+    Fold newly inserted event rows into the per-day confidence histograms.
+
+    Runs inside the caller's ingest transaction: scored rows are bucketed
+    per (day, intent), then each touched histogram is read, updated and
+    written back. Rows without a confidence score are skipped.
+    """
+
+    deltas = {}
+    for row in rows:
+        score = row.get("confidence_score")
+        if score is None:
+            continue
+
+        key = (day_floor(row["created_at"]), row["intent"])
+        counts = deltas.get(key)
+        if counts is None:
+            counts = deltas[key] = [0] * CONFIDENCE_BUCKETS
+        counts[score_bucket(score)] += 1
+
+    if not deltas:
+        return
+
+    stored = {
+        (row.bucket_start, row.intent): row
+        for row in db.session.execute(
+            _select_keys,
+            {
+                "days": list({day for day, _ in deltas}),
+                "intents": list({intent for _, intent in deltas}),
+            },
+        )
+    }
+
+    inserts, updates = [], []
+    for (day, intent), counts in deltas.items():
+        row = stored.get((day, intent))
+        if row is not None:
+            unpack_counts(row.first_bucket, row.counts, into=counts)
+
+        first_bucket, packed = pack_counts(counts)
+        values = {
+            "observation_count": sum(counts),
+            "first_bucket": first_bucket,
+            "counts": packed,
+        }
+        if row is not None:
+            updates.append({"day": day, "key_intent": intent, **values})
+        else:
+            inserts.append({"bucket_start": day, "intent": intent, **values})
+
+    if inserts:
+        db.session.execute(insert(_histograms), inserts)
+    if updates:
+        db.session.execute(_update_key, updates)
+
+
+def rebuild_confidence_histograms(connection):
+    """
+    Recompute the confidence histograms from the raw events table.
+
+    Like the hourly rollups, histograms before the partition boundary
+    are kept: their raw rows live in partition files or were compacted
+    away (see ralph.partitions). Runs on the given connection/transaction.
+    """
+
+    stale = delete(_histograms)
+    boundary = hot_boundary(connection)
+    if boundary is not None:
+        stale = stale.where(_histograms.c.bucket_start >= boundary)
+    connection.execute(stale)
+
+    day = type_coerce(func.strftime(DAY_BUCKET_FORMAT, Event.created_at), db.DateTime)
+    # SQL twin of score_bucket()
+    bucket = func.max(
+        0,
+        func.min(
+            CONFIDENCE_BUCKETS - 1,
+            cast(Event.confidence_score * CONFIDENCE_BUCKETS + BUCKET_EPSILON, Integer),
+        ),
+    )
+
+    rows = connection.execute(
+        select(day, Event.intent, bucket, func.count())
+        .where(Event.confidence_score.isnot(None))
+        .group_by(day, Event.intent, bucket)
+        .order_by(day, Event.intent)
+    )
+
+    def flush(key, counts):
+        first_bucket, packed = pack_counts(counts)
+        connection.execute(
+            insert(_histograms),
+            {
+                "bucket_start": key[0],
+                "intent": key[1],
+                "observation_count": sum(counts),
+                "first_bucket": first_bucket,
+                "counts": packed,
+            },
+        )
+
+    current, counts = None, None
+    for bucket_start, intent, index, count in rows:
+        if (bucket_start, intent) != current:
+            if current is not None:
+                flush(current, counts)
+            current, counts = (bucket_start, intent), [0] * CONFIDENCE_BUCKETS
+        counts[index] = count
+
+    if current is not None:
+        flush(current, counts)
+
+
+def window_histograms(windows, intent=None) -> dict:
+    """
+    Merge the day histograms for each [start, end) window in one scan.
+
+    Window starts are widened to whole UTC days; windows must not
+    overlap once widened.
+    Returns {intent: [counts per window]}, each a CONFIDENCE_BUCKETS
+    list, oldest window first; intents with no scored events in any
+    window are absent.
+    """
+
+    bounds = [(day_floor(start), end) for start, end in windows]
+
+    stmt = select(
+        _histograms.c.bucket_start,
+        _histograms.c.intent,
+        _histograms.c.first_bucket,
+        _histograms.c.counts,
+    ).where(
+        _histograms.c.bucket_start >= min(start for start, _ in bounds),
+        _histograms.c.bucket_start < max(end for _, end in bounds),
+    )
+    if intent is not None:
+        stmt = stmt.where(_histograms.c.intent == intent)
+
+    merged = {}
+    for bucket_start, name, first_bucket, packed in read_session().execute(stmt):
+        for index, (start, end) in enumerate(bounds):
+            if start <= bucket_start < end:
+                break
+        else:
+            continue
+
+        per_window = merged.get(name)
+        if per_window is None:
+            per_window = merged[name] = [[0] * CONFIDENCE_BUCKETS for _ in bounds]
+        unpack_counts(first_bucket, packed, into=per_window[index])
+
+    return merged
+
+
+def histogram_quantile(counts, q):
+    """
+    Score at quantile `q` of a bucketed histogram, interpolated linearly
+    within the bucket it falls in. Accurate to one bucket width.
+    Returns None for an empty histogram.
+    """
+
+    total = sum(counts)
+    if not total:
+        return None
+
+    rank = q * total
+    seen = 0
+    for index, count in enumerate(counts):
+        if count and seen + count >= rank:
+            return round((index + (rank - seen) / count) * BUCKET_WIDTH, 4)
+        seen += count
+    return 1.0
+
+
+def ks_distance(counts_a, counts_b):
+    """
+    Largest gap between two histograms' cumulative distributions
+    (Kolmogorov-Smirnov statistic at bucket resolution), 0..1.
+    """
+
+    total_a, total_b = sum(counts_a), sum(counts_b)
+    if not total_a or not total_b:
+        return None
+
+    gap = seen_a = seen_b = 0
+    for count_a, count_b in zip(counts_a, counts_b):
+        seen_a += count_a
+        seen_b += count_b
+        gap = max(gap, abs(seen_a / total_a - seen_b / total_b))
+    return round(gap, 4)
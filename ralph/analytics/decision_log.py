@@ -0,0 +1,172 @@
+import json
+import os
+import threading
+from pathlib import Path
+
+from ralph.config import Config
+
+
+ENTRIES_KEY = "approved_intents"
+APPROVED = "approved"
+
+
+def iter_decision_entries(f, chunk_size=64 * 1024):
+    """
+    Stream-parse the decision entries array from an open text file.
+
+    Yields one entry dict at a time, holding at most one chunk plus one
+    entry in memory, so very large logs never need a full json.load.
+    """
+
+    decoder = json.JSONDecoder()
+    marker = f'"{ENTRIES_KEY}"'
+    buffer = ""
+    eof = False
+
+    def fill():
+        nonlocal buffer, eof
+        chunk = f.read(chunk_size)
+        if chunk:
+            buffer += chunk
+        else:
+            eof = True
+
+    # Seek to the opening bracket of the entries array
+    while True:
+        found = buffer.find(marker)
+        if found >= 0:
+            bracket = buffer.find("[", found + len(marker))
+            if bracket >= 0:
+                buffer = buffer[bracket + 1:]
+                break
+        elif eof:
+            return
+        else:
+            # Keep a tail in case the marker straddles two chunks
+            buffer = buffer[-len(marker):]
+        if eof:
+            raise ValueError(f"Malformed decision log: no array after {marker}")
+        fill()
+
+    pos = 0
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+
+        try:
+            if pos == len(buffer):
+                raise json.JSONDecodeError("need more input", buffer, pos)
+            entry, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise ValueError("Malformed decision log entry") from None
+            buffer = buffer[pos:]
+            pos = 0
+            fill()
+            continue
+
+        yield entry
+
+
+class DecisionLogStore:
+    """
+    Parsed, indexed view of the decision log.
+
+    The file is parsed once into {intent: latest entry}; later calls
+    only stat() it and re-parse when its mtime or size changes. Logs
+    above `stream_threshold` bytes are stream-parsed.
+
+    An entry may carry "decision" (default "approved"); the latest entry
+    per intent (by "date", then file order) wins.
+    """
+
+    def __init__(self, path, stream_threshold):
+        self.path = Path(path)
+        self.stream_threshold = stream_threshold
+
+        self._lock = threading.Lock()
+        self._signature = None
+        self._latest = {}
+        self._approved = frozenset()
+
+    def signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def refresh(self):
+        signature = self.signature()
+        if signature == self._signature:
+            return
+
+        with self._lock:
+            if signature == self._signature:
+                return
+
+            latest = {}
+            if signature is not None:
+                for entry in self._read_entries(signature[1]):
+                    intent = entry.get("intent")
+                    if intent is None:
+                        continue
+                    current = latest.get(intent)
+                    if current is None or entry.get("date", "") >= current.get("date", ""):
+                        latest[intent] = entry
+
+            self._latest = latest
+            self._approved = frozenset(
+                intent
+                for intent, entry in latest.items()
+                if entry.get("decision", APPROVED) == APPROVED
+            )
+            self._signature = signature
+
+    def _read_entries(self, size):
+        with open(self.path, "r", encoding="utf-8") as f:
+            if size > self.stream_threshold:
+                yield from iter_decision_entries(f)
+            else:
+                yield from json.load(f).get(ENTRIES_KEY, [])
+
+    def latest(self, intent):
+        """
+        Latest decision entry for `intent`, or None.
+        """
+        self.refresh()
+        return self._latest.get(intent)
+
+    def approved_intents(self) -> frozenset:
+        """
+        Intents whose latest decision is an approval.
+        """
+        self.refresh()
+        return self._approved
+
+    def __len__(self):
+        self.refresh()
+        return len(self._latest)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_decision_log() -> DecisionLogStore:
+    """
+    Process-wide store for the configured decision log path.
+    """
+
+    path = str(Config.DECISION_LOG_PATH)
+    store = _stores.get(path)
+    if store is None:
+        with _stores_lock:
+            store = _stores.setdefault(
+                path,
+                DecisionLogStore(path, Config.DECISION_LOG_STREAM_THRESHOLD_BYTES),
+            )
+    return store
@@ -1,43 +1,31 @@
-import json
-from pathlib import Path
-from sqlalchemy import distinct
-from pathlib import Path
+from ralph.analytics.decision_log import get_decision_log
+from ralph.analytics.intent_registry import registered_intents
 
 
-from ralph.models import db, Event
-
-
-REPO_ROOT = Path(__file__).resolve().parents[2]
-DECISION_LOG_PATH = REPO_ROOT / "data" / "decision_log.json"
+def load_approved_intents() -> set:
+    """
+    Intents with a recorded approval in the decision log.
+    """
 
+    return set(get_decision_log().approved_intents())
 
 
-def detect_missing_decisions():
+def detect_missing_decisions(filters=None):
     """
     Governance loop:
     Detect intents that appear in events but have no recorded decision approval.
 
+    `filters` limits the check to intents with events from one
+    source_system / event_type.
     Advisory only. Read-only.
     """
 
-    # Load decision log
-    if not DECISION_LOG_PATH.exists():
-        approved_intents = set()
-    else:
-        with open(DECISION_LOG_PATH, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            approved_intents = {
-                item["intent"] for item in data.get("approved_intents", [])
-            }
+    return missing_decision_insights(
+        registered_intents(filters=filters), load_approved_intents()
+    )
 
-    # Intents seen in events
-    event_intents = {
-        row[0]
-        for row in db.session.query(distinct(Event.intent))
-        .filter(Event.intent.isnot(None))
-        .all()
-    }
 
+def missing_decision_insights(event_intents, approved_intents):
     missing = sorted(event_intents - approved_intents)
 
     insights = []
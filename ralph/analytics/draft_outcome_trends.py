@@ -1,71 +1,98 @@
-from datetime import datetime, timedelta
+from datetime import timedelta
 
-from sqlalchemy import func, case
+from ralph.analytics.windows import aggregate_windows, window_series
 
-from ralph.models import db, Event
 
-
-def analyze_draft_outcome_trends(days=7):
+def analyze_draft_outcome_trends(
+    days=7,
+    windows=2,
+    window_hours=None,
+    step_hours=None,
+    source=None,
+    intent_range=None,
+    filters=None,
+    group_by=None,
+):
     """
     Analytics insight:
     Draft outcome quality trends (follow-ups & resolutions).
     Trend-only. Advisory. Non-actionable.
+
+    Current vs previous window by default; windows > 2 (or hourly /
+    sliding windows) add per-window event counts from the same scan.
+    `source` runs the scan against an event archive instead of the
+    database; `intent_range` (first, last) computes one keyset page of
+    intents. `filters` restricts the counts to one source_system /
+    event_type slice and `group_by` (one of those dimensions) emits one
+    insight per intent and value.
     """
 
-    now = datetime.utcnow()
-    current_start = now - timedelta(days=days)
-    previous_start = current_start - timedelta(days=days)
+    size = timedelta(hours=window_hours) if window_hours else timedelta(days=days)
+    step = timedelta(hours=step_hours) if step_hours else None
 
-    def aggregate(start, end):
-        return (
-            db.session.query(
-                Event.intent.label("intent"),
-                func.avg(Event.follow_up_count).label("avg_followups"),
-                func.sum(
-                    case(
-                        (Event.outcome == "resolved", 1),
-                        else_=0,
-                    )
-                ).label("resolved_count"),
-                func.sum(
-                    case(
-                        (Event.outcome == "escalated", 1),
-                        else_=0,
-                    )
-                ).label("escalated_count"),
-                func.count(Event.id).label("event_count"),
-            )
-            .filter(Event.created_at >= start, Event.created_at < end)
-            .group_by(Event.intent)
-            .all()
+    dimensions = ("intent", "outcome") + ((group_by,) if group_by else ())
+    per_intent = {}
+    for key, per_window in aggregate_windows(
+        window_series(size, windows, step),
+        dimensions=dimensions,
+        source=source,
+        intent_range=intent_range,
+        filters=filters,
+    ).items():
+        outcome = key[1]
+        rows = per_intent.setdefault(
+            (key[0],) + key[2:],
+            [
+                {
+                    "event_count": 0,
+                    "follow_up_sum": 0,
+                    "resolved_count": 0,
+                    "escalated_count": 0,
+                }
+                for _ in range(windows)
+            ],
         )
-
-    current = {row.intent: row for row in aggregate(current_start, now)}
-    previous = {row.intent: row for row in aggregate(previous_start, current_start)}
+        for row, totals in zip(rows, per_window):
+            row["event_count"] += totals["event_count"]
+            row["follow_up_sum"] += totals["follow_up_sum"]
+            if outcome == "resolved":
+                row["resolved_count"] += totals["event_count"]
+            elif outcome == "escalated":
+                row["escalated_count"] += totals["event_count"]
 
     insights = []
 
-    for intent in sorted(set(current) | set(previous)):
-        cur = current.get(intent)
-        prev = previous.get(intent)
+    for key in sorted(per_intent):
+        intent = key[0]
+        rows = per_intent[key]
+        cur, prev = rows[-1], rows[-2]
 
-        cur_count = cur.event_count if cur else 0
-        prev_count = prev.event_count if prev else 0
+        cur_count = cur["event_count"]
+        prev_count = prev["event_count"]
+        if not cur_count and not prev_count:
+            continue
 
-        insights.append(
-            {
-                "insight_type": "draft_outcome_trend",
-                "intent": intent,
-                "current_event_count": cur_count,
-                "previous_event_count": prev_count,
-                "delta": cur_count - prev_count,
-                "avg_followups": round(cur.avg_followups, 2) if cur and cur.avg_followups is not None else 0,
-                "resolved_count": cur.resolved_count if cur else 0,
-                "escalated_count": cur.escalated_count if cur else 0,
-                "actionable": False,
-                "requires_approval": False,
-                "time_window_days": days,
-            }
-        )
+        insight = {
+            "insight_type": "draft_outcome_trend",
+            "intent": intent,
+            "current_event_count": cur_count,
+            "previous_event_count": prev_count,
+            "delta": cur_count - prev_count,
+            "avg_followups": round(cur["follow_up_sum"] / cur_count, 2) if cur_count else 0,
+            "resolved_count": cur["resolved_count"],
+            "escalated_count": cur["escalated_count"],
+            "actionable": False,
+            "requires_approval": False,
+            "time_window_days": window_hours / 24 if window_hours else days,
+        }
+
+        if group_by:
+            insight[group_by] = key[1]
+        if window_hours:
+            insight["time_window_hours"] = window_hours
+        if windows > 2 or step_hours:
+            insight["window_counts"] = [row["event_count"] for row in rows]
+
+        insights.append(insight)
 
     return insights
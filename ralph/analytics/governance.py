@@ -0,0 +1,31 @@
+from ralph.analytics.confidence import calibrated_intents
+from ralph.analytics.decision_log_validation import (
+    load_approved_intents,
+    missing_decision_insights,
+)
+from ralph.analytics.guardrail_validation import missing_guardrail_insights
+from ralph.analytics.intent_coverage import uncovered_intent_insights
+from ralph.analytics.intent_registry import registered_intents
+
+
+def evaluate_governance(filters=None):
+    """
+    Governance loop:
+    Run the coverage, guardrail and decision-log checks in one pass.
+
+    Reads the intent registry, calibrations and decision log once each,
+    so the cost is O(#intents) regardless of event volume. `filters`
+    limits the checks to intents with events from one source_system /
+    event_type.
+    Advisory only. Read-only.
+    """
+
+    event_intents = registered_intents(filters=filters)
+    calibrated = calibrated_intents()
+    approved = load_approved_intents()
+
+    return {
+        "intent_coverage": uncovered_intent_insights(event_intents, calibrated),
+        "guardrails": missing_guardrail_insights(event_intents, calibrated),
+        "decision_log": missing_decision_insights(event_intents, approved),
+    }
@@ -1,8 +1,8 @@
-from ralph.models import db, Event, ConfidenceCalibration
-from sqlalchemy import distinct
+from ralph.analytics.confidence import calibrated_intents
+from ralph.analytics.intent_registry import registered_intents
 
 
-def detect_missing_guardrails():
+def detect_missing_guardrails(filters=None):
     """
     Governance loop:
     Detect intents that appear in events but are missing required guardrails.
@@ -10,24 +10,18 @@ def detect_missing_guardrails():
     Guardrails checked (v1):
     - Confidence calibration exists
 
+    `filters` limits the check to intents with events from one
+    source_system / event_type.
     Advisory only. Read-only.
     """
 
-    # Intents seen in events
-    event_intents = {
-        row[0]
-        for row in db.session.query(distinct(Event.intent))
-        .filter(Event.intent.isnot(None))
-        .all()
-    }
-
-    # Intents with confidence calibration
-    calibrated_intents = {
-        row[0]
-        for row in db.session.query(distinct(ConfidenceCalibration.intent)).all()
-    }
-
-    missing = sorted(event_intents - calibrated_intents)
+    return missing_guardrail_insights(
+        registered_intents(filters=filters), calibrated_intents()
+    )
+
+
+def missing_guardrail_insights(event_intents, calibrated):
+    missing = sorted(event_intents - calibrated)
 
     insights = []
     for intent in missing:
@@ -1,30 +1,24 @@
-from ralph.models import db, Event, ConfidenceCalibration
-from sqlalchemy import distinct
+from ralph.analytics.confidence import calibrated_intents
+from ralph.analytics.intent_registry import registered_intents
 
 
-def detect_uncovered_intents():
+def detect_uncovered_intents(intent_range=None, filters=None):
     """
     Governance loop:
     Detect intents that appear in events but have no confidence calibration.
     Advisory only. Read-only.
+
+    `intent_range` (first, last) limits the check to one keyset page;
+    `filters` to intents with events from one source_system / event_type.
     """
 
-    # All intents seen in events
-    event_intents = {
-        row[0]
-        for row in db.session.query(distinct(Event.intent))
-        .filter(Event.intent.isnot(None))
-        .all()
-    }
-
-    # All intents with confidence calibration
-    calibrated_intents = {
-        row[0]
-        for row in db.session.query(distinct(ConfidenceCalibration.intent))
-        .all()
-    }
-
-    uncovered = sorted(event_intents - calibrated_intents)
+    return uncovered_intent_insights(
+        registered_intents(intent_range, filters), calibrated_intents(intent_range)
+    )
+
+
+def uncovered_intent_insights(event_intents, calibrated):
+    uncovered = sorted(event_intents - calibrated)
 
     insights = []
     for intent in uncovered:
@@ -0,0 +1,184 @@
+from sqlalchemy import delete, func, insert, select, union_all
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from ralph.models import db, Event, EventRollup, IntentRegistry, IntentSlice
+from ralph.partitions import hot_boundary
+from ralph.storage import read_session
+
+
+def apply_to_registry(rows):
+    """
+    Fold newly inserted event rows into the intent registry.
+
+    Runs inside the caller's ingest transaction with one upsert per batch
+    for the registry and one for its (source_system, event_type) slices.
+    """
+
+    seen = {}
+    slices = {}
+    for row in rows:
+        key = (row["intent"], row["source_system"], row["event_type"])
+        slices[key] = slices.get(key, 0) + 1
+
+        entry = seen.get(row["intent"])
+        if entry is None:
+            seen[row["intent"]] = {
+                "intent": row["intent"],
+                "first_seen_at": row["created_at"],
+                "last_seen_at": row["created_at"],
+                "event_count": 1,
+            }
+        else:
+            entry["first_seen_at"] = min(entry["first_seen_at"], row["created_at"])
+            entry["last_seen_at"] = max(entry["last_seen_at"], row["created_at"])
+            entry["event_count"] += 1
+
+    if not seen:
+        return
+
+    stmt = sqlite_insert(IntentRegistry)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["intent"],
+        set_={
+            "first_seen_at": func.min(
+                IntentRegistry.first_seen_at, stmt.excluded.first_seen_at
+            ),
+            "last_seen_at": func.max(
+                IntentRegistry.last_seen_at, stmt.excluded.last_seen_at
+            ),
+            "event_count": IntentRegistry.event_count + stmt.excluded.event_count,
+        },
+    )
+    db.session.execute(stmt, list(seen.values()))
+
+    stmt = sqlite_insert(IntentSlice)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["intent", "source_system", "event_type"],
+        set_={"event_count": IntentSlice.event_count + stmt.excluded.event_count},
+    )
+    db.session.execute(
+        stmt,
+        [
+            {
+                "intent": intent,
+                "source_system": source_system,
+                "event_type": event_type,
+                "event_count": count,
+            }
+            for (intent, source_system, event_type), count in slices.items()
+        ],
+    )
+
+
+def rebuild_intent_registry(connection):
+    """
+    Recompute the intent registry and its slices from the raw events
+    table.
+
+    History before the partition boundary is taken from the hourly
+    rollups, so partitioned intents keep their counts; their first/last
+    seen times are rounded down to the hour.
+    """
+
+    sources = [
+        select(
+            Event.intent.label("intent"),
+            func.min(Event.created_at).label("first_seen_at"),
+            func.max(Event.created_at).label("last_seen_at"),
+            func.count(Event.id).label("event_count"),
+        ).group_by(Event.intent)
+    ]
+
+    boundary = hot_boundary(connection)
+    if boundary is not None:
+        sources.append(
+            select(
+                EventRollup.intent,
+                func.min(EventRollup.bucket_start),
+                func.max(EventRollup.bucket_start),
+                func.sum(EventRollup.event_count),
+            )
+            .where(EventRollup.bucket_start < boundary)
+            .group_by(EventRollup.intent)
+        )
+
+    seen = union_all(*sources).subquery()
+
+    connection.execute(delete(IntentRegistry))
+    connection.execute(
+        insert(IntentRegistry).from_select(
+            ["intent", "first_seen_at", "last_seen_at", "event_count"],
+            select(
+                seen.c.intent,
+                func.min(seen.c.first_seen_at),
+                func.max(seen.c.last_seen_at),
+                func.sum(seen.c.event_count),
+            ).group_by(seen.c.intent),
+        )
+    )
+
+    slice_sources = [
+        select(
+            Event.intent.label("intent"),
+            Event.source_system.label("source_system"),
+            Event.event_type.label("event_type"),
+            func.count(Event.id).label("event_count"),
+        ).group_by(Event.intent, Event.source_system, Event.event_type)
+    ]
+    if boundary is not None:
+        slice_sources.append(
+            select(
+                EventRollup.intent,
+                EventRollup.source_system,
+                EventRollup.event_type,
+                func.sum(EventRollup.event_count),
+            )
+            .where(EventRollup.bucket_start < boundary)
+            .group_by(EventRollup.intent, EventRollup.source_system, EventRollup.event_type)
+        )
+
+    seen = union_all(*slice_sources).subquery()
+    dims = [seen.c.intent, seen.c.source_system, seen.c.event_type]
+
+    connection.execute(delete(IntentSlice))
+    connection.execute(
+        insert(IntentSlice).from_select(
+            ["intent", "source_system", "event_type", "event_count"],
+            select(*dims, func.sum(seen.c.event_count)).group_by(*dims),
+        )
+    )
+
+
+def registered_intents(intent_range=None, filters=None) -> set:
+    """
+    Every intent that has at least one event. O(#intents).
+
+    `intent_range` (first, last) limits it to one keyset page.
+    `filters` ({"source_system": ..., "event_type": ...}) keeps intents
+    with at least one event in that slice, from the intent slices.
+    """
+
+    if filters:
+        stmt = select(IntentSlice.intent).distinct()
+        for name, value in filters.items():
+            stmt = stmt.where(getattr(IntentSlice, name) == value)
+        if intent_range is not None:
+            stmt = stmt.where(IntentSlice.intent.between(*intent_range))
+        return set(read_session().scalars(stmt))
+
+    stmt = select(IntentRegistry.intent)
+    if intent_range is not None:
+        stmt = stmt.where(IntentRegistry.intent.between(*intent_range))
+    return set(read_session().scalars(stmt))
+
+
+def intent_page(after=None, limit=100) -> list:
+    """
+    Keyset page of registered intents: the first `limit` intents sorted
+    after `after`. Walks the unique intent index, never an OFFSET.
+    """
+
+    stmt = select(IntentRegistry.intent).order_by(IntentRegistry.intent).limit(limit)
+    if after is not None:
+        stmt = stmt.where(IntentRegistry.intent > after)
+    return list(read_session().scalars(stmt))
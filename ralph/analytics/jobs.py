@@ -0,0 +1,277 @@
+import atexit
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from ralph.metrics import JOB_DURATION
+from ralph.models import db, InsightSnapshot
+from ralph.storage import read_session
+
+
+def save_snapshot(name, payload, duration_ms=0.0):
+    """
+    Store `payload` as the newest version of snapshot `name`.
+    """
+
+    stmt = sqlite_insert(InsightSnapshot).values(
+        name=name,
+        version=1,
+        payload=current_app.json.dumps(payload),
+        duration_ms=duration_ms,
+        generated_at=datetime.utcnow(),
+    )
+    db.session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["name"],
+            set_={
+                "version": InsightSnapshot.version + 1,
+                "payload": stmt.excluded.payload,
+                "duration_ms": stmt.excluded.duration_ms,
+                "generated_at": stmt.excluded.generated_at,
+            },
+        )
+    )
+    db.session.commit()
+
+
+def load_snapshot(name):
+    """
+    Latest snapshot for `name` (unique index lookup), or None.
+    """
+
+    return read_session().scalars(
+        select(InsightSnapshot).where(InsightSnapshot.name == name)
+    ).first()
+
+
+def _materialize(snapshots):
+    """
+    Compute each (name, func) pair and store the result as a snapshot.
+    """
+
+    for name, func in snapshots:
+        started = time.perf_counter()
+        payload = func()
+        save_snapshot(name, payload, (time.perf_counter() - started) * 1000)
+
+
+def calibration_job():
+    from ralph.analytics.confidence import (
+        run_confidence_calibration,
+        list_calibrations,
+    )
+
+    run_confidence_calibration(incremental=True)
+    _materialize([("calibrations", list_calibrations)])
+
+
+def governance_job():
+    from ralph.analytics.governance import evaluate_governance
+
+    started = time.perf_counter()
+    results = evaluate_governance()
+    duration_ms = (time.perf_counter() - started) * 1000
+
+    for name, key in (
+        ("intent-coverage", "intent_coverage"),
+        ("guardrails", "guardrails"),
+        ("decision-log", "decision_log"),
+    ):
+        save_snapshot(name, results[key], duration_ms)
+
+
+def trends_job():
+    from ralph.analytics.trend_deltas import compute_intent_trend_deltas
+    from ralph.analytics.repetition_analysis import analyze_intent_frequency
+    from ralph.analytics.draft_outcome_trends import analyze_draft_outcome_trends
+    from ralph.analytics.weekly_executive_summary import (
+        generate_weekly_executive_summary,
+    )
+
+    _materialize(
+        [
+            ("trends", compute_intent_trend_deltas),
+            ("repetition", analyze_intent_frequency),
+            ("draft-outcomes", analyze_draft_outcome_trends),
+            ("weekly-summary", generate_weekly_executive_summary),
+        ]
+    )
+
+
+def anomalies_job():
+    from ralph.analytics.anomalies import advance_anomaly_state, list_anomalies
+
+    # A no-op until the next hourly bucket closes
+    if advance_anomaly_state():
+        _materialize([("anomalies", list_anomalies)])
+
+
+DEFAULT_JOBS = {
+    "calibration": calibration_job,
+    "governance": governance_job,
+    "trends": trends_job,
+    "anomalies": anomalies_job,
+}
+
+
+class Job:
+    """
+    A named analytics task run on a fixed interval.
+
+    The lock gives overlap protection: a run is skipped (not queued)
+    while the previous one is still in flight.
+    """
+
+    def __init__(self, name, func, interval):
+        self.name = name
+        self.func = func
+        self.interval = interval
+
+        self.lock = threading.Lock()
+        self.next_run_at = 0.0
+
+        self.runs = 0
+        self.skipped = 0
+        self.last_status = "never_run"
+        self.last_error = None
+        self.last_started_at = None
+        self.last_duration_ms = None
+
+    def status(self) -> dict:
+        return {
+            "name": self.name,
+            "interval_seconds": self.interval,
+            "running": self.lock.locked(),
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "last_status": self.last_status,
+            "last_error": self.last_error,
+            "last_started_at": (
+                self.last_started_at.isoformat() if self.last_started_at else None
+            ),
+            "last_duration_ms": self.last_duration_ms,
+        }
+
+
+class JobRunner:
+    """
+    Runs insight jobs on a schedule in a thread pool.
+
+    One scheduler thread wakes every `tick` seconds and submits due jobs.
+    Each job runs inside its own app context, so it gets its own session.
+    Run the scheduler in a single process per database.
+    """
+
+    def __init__(self, app, jobs, max_workers=2, tick=1.0):
+        self.app = app
+        self.jobs = {job.name: job for job in jobs}
+        self.tick = tick
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="ralph-job",
+        )
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+
+        self._thread = threading.Thread(
+            target=self._loop,
+            name="ralph-job-scheduler",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self, wait=True):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def run_now(self, name) -> bool:
+        """
+        Submit job `name` immediately. False if it is already running.
+        """
+        return self._submit(self.jobs[name])
+
+    def status(self) -> list:
+        return [job.status() for job in self.jobs.values()]
+
+    def _loop(self):
+        while not self._stop.is_set():
+            now = time.monotonic()
+            for job in self.jobs.values():
+                if now >= job.next_run_at:
+                    job.next_run_at = now + job.interval
+                    self._submit(job)
+            self._stop.wait(self.tick)
+
+    def _submit(self, job) -> bool:
+        if not job.lock.acquire(blocking=False):
+            job.skipped += 1
+            return False
+
+        try:
+            future = self._executor.submit(self._execute, job)
+        except RuntimeError:
+            # Executor already shut down
+            job.lock.release()
+            return False
+
+        # A run cancelled before it started (shutdown with cancel_futures)
+        # never reaches _execute, so its lock is released here instead
+        future.add_done_callback(
+            lambda future: future.cancelled() and job.lock.release()
+        )
+        return True
+
+    def _execute(self, job):
+        job.last_started_at = datetime.utcnow()
+        started = time.perf_counter()
+
+        try:
+            with self.app.app_context():
+                job.func()
+            job.last_status = "ok"
+            job.last_error = None
+        except Exception as exc:
+            job.last_status = "error"
+            # Served on /insights/jobs: the exception class only, since
+            # messages can carry SQL and bound values; details go to the log
+            job.last_error = type(exc).__name__
+            self.app.logger.exception("job %s failed", job.name)
+        finally:
+            elapsed = time.perf_counter() - started
+            job.last_duration_ms = elapsed * 1000
+            JOB_DURATION.observe(elapsed, job.name, job.last_status)
+            job.runs += 1
+            job.lock.release()
+
+
+def start_job_runner(app):
+    """
+    Build the runner from app config, start it and register it on the app.
+    """
+
+    intervals = app.config["JOB_INTERVALS"]
+    runner = JobRunner(
+        app,
+        [
+            Job(name, func, intervals[name])
+            for name, func in DEFAULT_JOBS.items()
+        ],
+        max_workers=app.config["JOB_WORKERS"],
+    )
+    runner.start()
+    atexit.register(runner.stop, wait=False)
+
+    app.extensions["ralph_jobs"] = runner
+    return runner
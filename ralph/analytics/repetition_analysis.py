@@ -1,43 +1,117 @@
 from datetime import datetime, timedelta
-from sqlalchemy import func
 
-from ralph.models import db, Event
+from ralph.analytics.sketches import HLL_STANDARD_ERROR, window_sketch
+from ralph.analytics.windows import window_totals
 
 
-def analyze_intent_frequency(days=7):
+def analyze_intent_frequency(
+    days=7, source=None, approximate=False, filters=None, group_by=None
+):
     """
     Analytics-only loop:
     Count how often each intent appears within a time window.
     Descriptive only. Read-only.
+    `source` counts from an event archive instead of the database.
+    `approximate` answers from the ingest-time sketches instead (see
+    approximate_intent_frequency); the sketches span every source system
+    and event type, so they cannot be combined with `filters` (one
+    source_system / event_type slice) or `group_by` (one count per
+    intent and value of that dimension).
     """
 
-    since = datetime.utcnow() - timedelta(days=days)
+    if approximate:
+        if filters or group_by:
+            raise ValueError("approximate counts cannot be filtered or grouped")
+        return approximate_intent_frequency(days=days)
 
-    results = (
-        db.session.query(
-            Event.intent,
-            func.count(Event.id).label("event_count"),
-        )
-        .filter(
-            Event.intent.isnot(None),
-            Event.created_at >= since,
-        )
-        .group_by(Event.intent)
-        .order_by(func.count(Event.id).desc())
-        .all()
+    now = datetime.utcnow()
+    since = now - timedelta(days=days)
+
+    dimensions = ("intent", group_by) if group_by else ("intent",)
+    totals = window_totals(since, now, dimensions, source=source, filters=filters)
+
+    results = sorted(
+        (
+            (key, window["event_count"])
+            for key, window in totals.items()
+            if key[0] is not None
+        ),
+        key=lambda item: (-item[1], item[0]),
     )
 
     insights = []
-    for intent, count in results:
+    for key, count in results:
+        intent = key[0]
+        subject = f"Intent '{intent}'"
+        if group_by:
+            subject += f" ({group_by} '{key[1]}')"
+        insight = {
+            "insight_type": "intent_frequency",
+            "intent": intent,
+            "event_count": count,
+            "time_window_days": days,
+            "message": (
+                f"{subject} appeared {count} times "
+                f"in the last {days} days."
+            ),
+            "actionable": False,
+            "requires_approval": False,
+        }
+        if group_by:
+            insight[group_by] = key[1]
+        insights.append(insight)
+
+    return insights
+
+
+def approximate_intent_frequency(days=7):
+    """
+    Analytics-only loop:
+    Estimate intent frequency from the per-day sketches, in memory
+    bounded by days * SKETCH_TOPK whatever the number of intents.
+    Descriptive only. Read-only.
+
+    The window is widened to whole UTC days. Error bounds:
+    - each reported event_count over-counts by at most count_error, so
+      the true count is in [event_count - count_error, event_count];
+      count_error is at most the sum of each day's smallest counter;
+    - intents not reported appeared at most unmonitored_max_count times;
+    - distinct_intents has a relative standard error of about 1.6%.
+    """
+
+    now = datetime.utcnow()
+    sketch = window_sketch(now - timedelta(days=days), now)
+
+    insights = [
+        {
+            "insight_type": "distinct_intents",
+            "distinct_intents": sketch["distinct_intents"],
+            "relative_standard_error": round(HLL_STANDARD_ERROR, 4),
+            "event_count": sketch["event_count"],
+            "unmonitored_max_count": sketch["unmonitored_max"],
+            "time_window_days": days,
+            "approximate": True,
+            "message": (
+                f"About {sketch['distinct_intents']} distinct intents "
+                f"in the last {days} days."
+            ),
+            "actionable": False,
+            "requires_approval": False,
+        }
+    ]
+
+    for intent, count, error in sketch["top"]:
         insights.append(
             {
                 "insight_type": "intent_frequency",
                 "intent": intent,
                 "event_count": count,
+                "count_error": error,
                 "time_window_days": days,
+                "approximate": True,
                 "message": (
-                    f"Intent '{intent}' appeared {count} times "
-                    f"in the last {days} days."
+                    f"Intent '{intent}' appeared about {count} times "
+                    f"(at least {count - error}) in the last {days} days."
                 ),
                 "actionable": False,
                 "requires_approval": False,
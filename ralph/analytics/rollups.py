@@ -0,0 +1,128 @@
+from datetime import timedelta
+
+from sqlalchemy import delete, func, insert, select, type_coerce
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from ralph.models import db, Event, EventRollup
+from ralph.partitions import hot_boundary
+
+
+ROLLUP_KEY = ("bucket_start", "intent", "source_system", "event_type", "outcome")
+ROLLUP_COLUMNS = ROLLUP_KEY + (
+    "event_count",
+    "follow_up_sum",
+    "confidence_sum",
+    "confidence_count",
+)
+
+# Matches SQLAlchemy's SQLite DateTime storage format, truncated to the hour
+HOUR_BUCKET_FORMAT = "%Y-%m-%d %H:00:00.000000"
+
+
+def hour_floor(ts):
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def hour_ceil(ts):
+    floor = hour_floor(ts)
+    return floor if floor == ts else floor + timedelta(hours=1)
+
+
+def apply_to_rollups(rows):
+    """
+    Fold newly inserted event rows into the hourly rollups.
+
+    Runs inside the caller's ingest transaction: rows are pre-aggregated
+    per bucket key, then upserted with one INSERT ... ON CONFLICT.
+    """
+
+    deltas = {}
+    for row in rows:
+        key = (
+            hour_floor(row["created_at"]),
+            row["intent"],
+            row["source_system"],
+            row["event_type"],
+            row["outcome"],
+        )
+        delta = deltas.get(key)
+        if delta is None:
+            delta = deltas[key] = {
+                "event_count": 0,
+                "follow_up_sum": 0,
+                "confidence_sum": 0.0,
+                "confidence_count": 0,
+            }
+
+        delta["event_count"] += 1
+        delta["follow_up_sum"] += row.get("follow_up_count") or 0
+        if row.get("confidence_score") is not None:
+            delta["confidence_sum"] += row["confidence_score"]
+            delta["confidence_count"] += 1
+
+    if not deltas:
+        return
+
+    stmt = sqlite_insert(EventRollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(ROLLUP_KEY),
+        set_={
+            name: getattr(EventRollup, name) + stmt.excluded[name]
+            for name in (
+                "event_count",
+                "follow_up_sum",
+                "confidence_sum",
+                "confidence_count",
+            )
+        },
+    )
+
+    db.session.execute(
+        stmt,
+        [dict(zip(ROLLUP_KEY, key), **delta) for key, delta in deltas.items()],
+    )
+
+
+def rollup_select():
+    """
+    Hourly rollup rows (ROLLUP_COLUMNS order) computed from raw events.
+    """
+
+    bucket = type_coerce(
+        func.strftime(HOUR_BUCKET_FORMAT, Event.created_at), db.DateTime
+    )
+
+    return select(
+        bucket,
+        Event.intent,
+        Event.source_system,
+        Event.event_type,
+        Event.outcome,
+        func.count(Event.id),
+        func.coalesce(func.sum(Event.follow_up_count), 0),
+        func.total(Event.confidence_score),
+        func.count(Event.confidence_score),
+    ).group_by(
+        bucket, Event.intent, Event.source_system, Event.event_type, Event.outcome
+    )
+
+
+def rebuild_rollups(connection):
+    """
+    Recompute the hourly rollups from the raw events table.
+
+    Used to backfill databases that predate the rollup table, or to
+    repair drift. Runs on the given connection/transaction. Rollups
+    before the partition boundary are kept: their raw rows live in
+    partition files or were compacted away (see ralph.partitions).
+    """
+
+    stale = delete(EventRollup)
+    boundary = hot_boundary(connection)
+    if boundary is not None:
+        stale = stale.where(EventRollup.bucket_start >= boundary)
+
+    connection.execute(stale)
+    connection.execute(
+        insert(EventRollup).from_select(list(ROLLUP_COLUMNS), rollup_select())
+    )
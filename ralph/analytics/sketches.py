@@ -0,0 +1,292 @@
+import hashlib
+import heapq
+import json
+import math
+from collections import Counter
+
+from flask import current_app
+from sqlalchemy import (
+    bindparam,
+    DateTime,
+    delete,
+    func,
+    insert,
+    select,
+    type_coerce,
+    update,
+)
+
+from ralph.models import db, EventRollup, IntentSketch
+from ralph.storage import read_session
+
+
+HLL_PRECISION = 12
+HLL_REGISTERS = 1 << HLL_PRECISION
+# Relative standard error of a distinct-count estimate: 1.04 / sqrt(m)
+HLL_STANDARD_ERROR = 1.04 / math.sqrt(HLL_REGISTERS)
+
+# Matches SQLAlchemy's SQLite DateTime storage format, truncated to the day
+DAY_BUCKET_FORMAT = "%Y-%m-%d 00:00:00.000000"
+
+_sketches = IntentSketch.__table__
+
+# Built once: ingest runs these on every commit. Plain INSERT/UPDATE
+# rather than an upsert, which SQLAlchemy recompiles on every execute;
+# the ingest transaction already holds the write lock, so the rows read
+# by _select_days cannot change underneath it.
+_select_days = select(_sketches).where(
+    _sketches.c.bucket_start.in_(bindparam("days", expanding=True))
+)
+_update_day = update(_sketches).where(_sketches.c.bucket_start == bindparam("day"))
+
+
+def day_floor(ts):
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class HyperLogLog:
+    """
+    Distinct-count sketch: 2^HLL_PRECISION one-byte registers.
+
+    Merging is a register-wise max, so per-day sketches combine into a
+    window estimate with the same error as one sketch over the window.
+    """
+
+    def __init__(self, registers=None):
+        self.registers = bytearray(registers or HLL_REGISTERS)
+
+    def add(self, value):
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest()
+        hashed = int.from_bytes(digest, "big")
+
+        index = hashed >> (64 - HLL_PRECISION)
+        rest = hashed & ((1 << (64 - HLL_PRECISION)) - 1)
+        rank = 64 - HLL_PRECISION - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def estimate(self) -> int:
+        m = HLL_REGISTERS
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+
+        # Linear counting is more accurate while many registers are empty
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitter summary over at most `capacity` intents.
+
+    Each monitored intent has [count, error] with
+    count - error <= true count <= count, and error <= floor(), the
+    smallest monitored count. Any unmonitored intent occurred at most
+    floor() times.
+    """
+
+    def __init__(self, capacity, counters=None):
+        self.capacity = capacity
+        self.counters = counters if counters is not None else {}
+
+    def floor(self) -> int:
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(count for count, _ in self.counters.values())
+
+    def update(self, counts):
+        """
+        Fold exact {intent: count} into the summary in one merge.
+
+        A newcomer may already have occurred up to floor() times unseen,
+        so it starts at floor() + count with error floor(). Only the
+        `capacity` largest counters are kept; every dropped one is no
+        larger than the new floor(), so the bounds above still hold.
+        """
+
+        floor = self.floor()
+        counters = self.counters
+        for item, count in counts.items():
+            entry = counters.get(item)
+            if entry is None:
+                counters[item] = [floor + count, floor]
+            else:
+                entry[0] += count
+
+        if len(counters) > self.capacity:
+            self.counters = dict(
+                heapq.nlargest(self.capacity, counters.items(), key=lambda item: item[1][0])
+            )
+
+
+def _load(row, capacity):
+    return (
+        HyperLogLog(row.distinct_registers),
+        SpaceSaving(capacity, json.loads(row.top_intents)),
+    )
+
+
+def apply_to_sketches(rows):
+    """
+    Fold newly inserted event rows into the per-day intent sketches.
+
+    Runs inside the caller's ingest transaction: rows are counted per day
+    and intent first, then each touched day's sketches are read, updated
+    and written back.
+    """
+
+    days = {}
+    for row in rows:
+        day = day_floor(row["created_at"])
+        days.setdefault(day, Counter())[row["intent"]] += 1
+
+    if not days:
+        return
+
+    capacity = current_app.config["SKETCH_TOPK"]
+    stored = {
+        row.bucket_start: row
+        for row in db.session.execute(_select_days, {"days": list(days)})
+    }
+
+    inserts, updates = [], []
+    for day, counts in days.items():
+        row = stored.get(day)
+        if row is not None:
+            hll, summary = _load(row, capacity)
+            event_count = row.event_count
+        else:
+            hll, summary = HyperLogLog(), SpaceSaving(capacity)
+            event_count = 0
+
+        for intent in counts:
+            hll.add(intent)
+        summary.update(counts)
+
+        values = {
+            "event_count": event_count + sum(counts.values()),
+            "distinct_registers": bytes(hll.registers),
+            "top_intents": json.dumps(summary.counters),
+        }
+        if row is not None:
+            updates.append({"day": day, **values})
+        else:
+            inserts.append({"bucket_start": day, **values})
+
+    if inserts:
+        db.session.execute(insert(_sketches), inserts)
+    if updates:
+        db.session.execute(_update_day, updates)
+
+
+def rebuild_sketches(connection, capacity=None):
+    """
+    Recompute every day's sketches from the hourly rollups.
+
+    Rollups cover partitioned and compacted months too, so no history
+    is lost. Streams one day at a time. Runs on the given
+    connection/transaction.
+    """
+
+    capacity = capacity or current_app.config["SKETCH_TOPK"]
+    day = type_coerce(func.strftime(DAY_BUCKET_FORMAT, EventRollup.bucket_start), DateTime)
+
+    connection.execute(delete(_sketches))
+
+    rows = connection.execute(
+        select(day, EventRollup.intent, func.sum(EventRollup.event_count))
+        .group_by(day, EventRollup.intent)
+        .order_by(day)
+    )
+
+    def flush(bucket, counts):
+        hll, summary = HyperLogLog(), SpaceSaving(capacity)
+        for intent in counts:
+            hll.add(intent)
+        summary.update(counts)
+
+        connection.execute(
+            insert(_sketches),
+            {
+                "bucket_start": bucket,
+                "event_count": sum(counts.values()),
+                "distinct_registers": bytes(hll.registers),
+                "top_intents": json.dumps(summary.counters),
+            },
+        )
+
+    current, counts = None, {}
+    for bucket, intent, count in rows:
+        if bucket != current:
+            if counts:
+                flush(current, counts)
+            current, counts = bucket, {}
+        counts[intent] = count
+
+    if counts:
+        flush(current, counts)
+
+
+def window_sketch(start, end, limit=None) -> dict:
+    """
+    Merge the day sketches for the days overlapping [start, end).
+
+    The window is widened to whole UTC days. Summaries are merged in one
+    k-way pass: an intent missing from a day counts that day's floor,
+    as count and as error, so every merged count keeps
+    count - error <= true <= count, and no unlisted intent occurred more
+    than unmonitored_max times. Memory grows with days * SKETCH_TOPK,
+    not with intent cardinality.
+
+    Returns {"event_count", "distinct_intents", "top": [(intent, count,
+    error)] (at most `limit`, default SKETCH_TOPK), "unmonitored_max"}.
+    """
+
+    capacity = current_app.config["SKETCH_TOPK"]
+    limit = limit or capacity
+
+    hll = HyperLogLog()
+    event_count = 0
+    total_floor = 0
+    # intent -> [sum of (count - floor), sum of (error - floor)] over days
+    # where it was monitored; total_floor is added back at the end
+    merged = {}
+
+    rows = read_session().execute(
+        select(_sketches).where(
+            _sketches.c.bucket_start >= day_floor(start),
+            _sketches.c.bucket_start < end,
+        )
+    )
+    for row in rows:
+        day_hll, summary = _load(row, capacity)
+        hll.merge(day_hll)
+        event_count += row.event_count
+
+        floor = summary.floor()
+        total_floor += floor
+        for intent, (count, error) in summary.counters.items():
+            entry = merged.setdefault(intent, [0, 0])
+            entry[0] += count - floor
+            entry[1] += error - floor
+
+    ranked = sorted(
+        (
+            (intent, delta + total_floor, error + total_floor)
+            for intent, (delta, error) in merged.items()
+        ),
+        key=lambda item: (-item[1], item[0]),
+    )
+    dropped = ranked[limit][1] if len(ranked) > limit else 0
+
+    return {
+        "event_count": event_count,
+        "distinct_intents": hll.estimate() if event_count else 0,
+        "top": ranked[:limit],
+        "unmonitored_max": max(total_floor, dropped),
+    }
@@ -1,10 +1,18 @@
-from datetime import datetime, timedelta
-from sqlalchemy import func
+from datetime import timedelta
 
-from ralph.models import db, Event
+from ralph.analytics.windows import aggregate_windows, window_series
 
 
-def compute_intent_trend_deltas(days=7):
+def compute_intent_trend_deltas(
+    days=7,
+    windows=2,
+    window_hours=None,
+    step_hours=None,
+    source=None,
+    intent_range=None,
+    filters=None,
+    group_by=None,
+):
     """
     Analytics-only loop:
     Compare intent frequency between two adjacent time windows.
@@ -12,60 +20,74 @@ def compute_intent_trend_deltas(days=7):
     Example:
     - Last 7 days vs previous 7 days
 
+    With windows > 2 (or hourly / sliding windows) each insight also
+    carries the per-window counts, oldest first; all windows come from
+    a single aggregation scan. `source` runs the scan against an event
+    archive instead of the database; `intent_range` (first, last)
+    computes one keyset page of intents. `filters` restricts the counts
+    to one source_system / event_type slice and `group_by` (one of
+    those dimensions) emits one insight per intent and value.
+
     Emits descriptive, non-actionable insights only.
     """
 
-    now = datetime.utcnow()
-    current_start = now - timedelta(days=days)
-    previous_start = now - timedelta(days=days * 2)
-
-    # Current window counts
-    current_counts = dict(
-        db.session.query(
-            Event.intent,
-            func.count(Event.id)
-        )
-        .filter(Event.created_at >= current_start)
-        .group_by(Event.intent)
-        .all()
-    )
-
-    # Previous window counts
-    previous_counts = dict(
-        db.session.query(
-            Event.intent,
-            func.count(Event.id)
-        )
-        .filter(
-            Event.created_at >= previous_start,
-            Event.created_at < current_start
-        )
-        .group_by(Event.intent)
-        .all()
-    )
+    size = timedelta(hours=window_hours) if window_hours else timedelta(days=days)
+    step = timedelta(hours=step_hours) if step_hours else None
+    if window_hours:
+        label = f"{window_hours} hour{'s' if window_hours != 1 else ''}"
+    else:
+        label = f"{days} days"
+
+    dimensions = ("intent", group_by) if group_by else ("intent",)
+    series = {
+        key: [totals["event_count"] for totals in per_window]
+        for key, per_window in aggregate_windows(
+            window_series(size, windows, step),
+            dimensions=dimensions,
+            source=source,
+            intent_range=intent_range,
+            filters=filters,
+        ).items()
+    }
 
     insights = []
 
-    for intent, current_count in current_counts.items():
-        previous_count = previous_counts.get(intent, 0)
+    for key, counts in sorted(series.items()):
+        intent = key[0]
+        current_count = counts[-1]
+        if not current_count:
+            continue
+
+        previous_count = counts[-2]
         delta = current_count - previous_count
 
-        insights.append(
-            {
-                "insight_type": "intent_trend_delta",
-                "intent": intent,
-                "current_period_count": current_count,
-                "previous_period_count": previous_count,
-                "delta": delta,
-                "time_window_days": days,
-                "message": (
-                    f"Intent '{intent}' count changed from "
-                    f"{previous_count} to {current_count} "
-                    f"over the last {days} days."
-                ),
-                "actionable": False,
-                "requires_approval": False,
-            }
-        )
+        subject = f"Intent '{intent}'"
+        if group_by:
+            subject += f" ({group_by} '{key[1]}')"
+
+        insight = {
+            "insight_type": "intent_trend_delta",
+            "intent": intent,
+            "current_period_count": current_count,
+            "previous_period_count": previous_count,
+            "delta": delta,
+            "time_window_days": window_hours / 24 if window_hours else days,
+            "message": (
+                f"{subject} count changed from "
+                f"{previous_count} to {current_count} "
+                f"over the last {label}."
+            ),
+            "actionable": False,
+            "requires_approval": False,
+        }
+
+        if group_by:
+            insight[group_by] = key[1]
+        if window_hours:
+            insight["time_window_hours"] = window_hours
+        if windows > 2 or step_hours:
+            insight["window_counts"] = counts
+
+        insights.append(insight)
 
     return insights
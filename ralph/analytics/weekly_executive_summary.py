@@ -1,21 +1,88 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
-from sqlalchemy import func
+from flask import current_app
+from sqlalchemy import select
 
-from ralph.models import Event, ConfidenceCalibration
-from ralph.models import db
+from ralph.models import ConfidenceCalibration
+from ralph.analytics.windows import aggregate_windows
+from ralph.analytics.decision_log import get_decision_log
+from ralph.storage import read_session
 
 
+_section_pool = None
+_section_pool_lock = threading.Lock()
 
-def generate_weekly_executive_summary(days: int = 7):
+
+def _pool():
+    global _section_pool
+    if _section_pool is None:
+        with _section_pool_lock:
+            if _section_pool is None:
+                _section_pool = ThreadPoolExecutor(
+                    max_workers=3,
+                    thread_name_prefix="ralph-summary",
+                )
+    return _section_pool
+
+
+def _window_counts(start, prev_start, now, filters=None):
+    # Previous and current window in one scan
+    previous_counts = {}
+    current_counts = {}
+    for key, (previous, current) in aggregate_windows(
+        [(prev_start, start), (start, now)], filters=filters
+    ).items():
+        if previous["event_count"]:
+            previous_counts[key[0]] = previous["event_count"]
+        if current["event_count"]:
+            current_counts[key[0]] = current["event_count"]
+    return current_counts, previous_counts
+
+
+def _calibrations():
+    return [
+        {
+            "intent": cal.intent,
+            "recommended_threshold": cal.recommended_threshold,
+            "success_rate": cal.success_rate,
+            "observation_count": cal.observation_count,
+        }
+        for cal in read_session().scalars(
+            select(ConfidenceCalibration).order_by(ConfidenceCalibration.intent)
+        )
+    ]
+
+
+def _approvals():
+    return get_decision_log().approved_intents()
+
+
+def generate_weekly_executive_summary(
+    days: int = 7, concurrent: bool = True, filters=None
+):
     """
     Weekly executive summary.
     Reporting-only. No judgments. No recommendations auto-applied.
     JSON-safe output.
+
+    Independent sections (window counts, calibrations, approvals) run
+    concurrently, each in its own app context and therefore its own
+    read-only session. Current-window counts are computed once and shared by the
+    top-intent, increase and approval sections. Per-section timings
+    are reported under "meta".
+
+    `filters` restricts the counts to one source_system / event_type
+    slice; calibration advisories are then limited to intents seen in
+    that slice over either window.
     """
 
     now = datetime.utcnow()
     start = now - timedelta(days=days)
+    prev_start = start - timedelta(days=days)
 
     summary = {
         "time_window_days": days,
@@ -26,52 +93,66 @@ def generate_weekly_executive_summary(days: int = 7):
         "calibration_advisories": [],
     }
 
+    timings = {}
+    started = time.perf_counter()
+
+    sections = {
+        "window_counts": (_window_counts, (start, prev_start, now, filters)),
+        "calibrations": (_calibrations, ()),
+        "approvals": (_approvals, ()),
+    }
+
+    def timed(name, func, args):
+        section_started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            timings[name] = round((time.perf_counter() - section_started) * 1000, 3)
+
+    if concurrent:
+        app = current_app._get_current_object()
+
+        def run_section(name, func, args):
+            with app.app_context():
+                return timed(name, func, args)
+
+        # Each section runs in a copy of this context, so request-scoped
+        # state (e.g. per-request SQL metrics) follows it to the pool
+        futures = {
+            name: _pool().submit(
+                contextvars.copy_context().run, run_section, name, func, args
+            )
+            for name, (func, args) in sections.items()
+        }
+        results = {name: future.result() for name, future in futures.items()}
+    else:
+        results = {
+            name: timed(name, func, args)
+            for name, (func, args) in sections.items()
+        }
+
+    current_counts, previous_counts = results["window_counts"]
+    approved_intents = results["approvals"]
+
     # -------------------------------------------------
     # Top intents by volume
     # -------------------------------------------------
-    top_intents = (
-        db.session.query(
-            Event.intent,
-            func.count(Event.id).label("event_count"),
-        )
-        .filter(Event.created_at >= start)
-        .group_by(Event.intent)
-        .order_by(func.count(Event.id).desc())
-        .limit(5)
-        .all()
-    )
-
-    for row in top_intents:
+    top_intents = sorted(
+        current_counts.items(),
+        key=lambda item: (-item[1], item[0]),
+    )[:5]
+
+    for intent, count in top_intents:
         summary["top_intents"].append(
             {
-                "intent": row.intent,
-                "event_count": row.event_count,
+                "intent": intent,
+                "event_count": count,
             }
         )
 
     # -------------------------------------------------
     # Intent increases vs previous period
     # -------------------------------------------------
-    prev_start = start - timedelta(days=days)
-
-    def counts_between(start_ts, end_ts):
-        return {
-            r.intent: r.count
-            for r in (
-                db.session.query(
-                    Event.intent,
-                    func.count(Event.id).label("count"),
-                )
-                .filter(Event.created_at >= start_ts)
-                .filter(Event.created_at < end_ts)
-                .group_by(Event.intent)
-                .all()
-            )
-        }
-
-    current_counts = counts_between(start, now)
-    previous_counts = counts_between(prev_start, start)
-
     all_intents = set(current_counts) | set(previous_counts)
 
     for intent in sorted(all_intents):
@@ -91,12 +172,7 @@ def generate_weekly_executive_summary(days: int = 7):
     # -------------------------------------------------
     # Intents missing approval (events exist, no decision log)
     # -------------------------------------------------
-    approved_intents = {
-        r.intent
-        for r in db.session.query(ConfidenceCalibration.intent).all()
-    }
-
-    for intent, count in current_counts.items():
+    for intent, count in sorted(current_counts.items()):
         if intent not in approved_intents:
             summary["intents_missing_approval"].append(
                 {
@@ -108,15 +184,16 @@ def generate_weekly_executive_summary(days: int = 7):
     # -------------------------------------------------
     # Calibration advisory snapshot (read-only)
     # -------------------------------------------------
-    calibrations = ConfidenceCalibration.query.all()
-    for cal in calibrations:
-        summary["calibration_advisories"].append(
-            {
-                "intent": cal.intent,
-                "recommended_threshold": cal.recommended_threshold,
-                "success_rate": cal.success_rate,
-                "observation_count": cal.observation_count,
-            }
-        )
+    calibrations = results["calibrations"]
+    if filters:
+        summary["filters"] = filters
+        calibrations = [cal for cal in calibrations if cal["intent"] in all_intents]
+    summary["calibration_advisories"] = calibrations
+
+    summary["meta"] = {
+        "concurrent": concurrent,
+        "section_timings_ms": timings,
+        "total_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
 
     return summary
@@ -0,0 +1,219 @@
+from datetime import datetime
+from itertools import chain
+
+from sqlalchemy import and_, case, func, literal, or_, select
+
+from ralph.models import Event, EventRollup
+from ralph.analytics.rollups import hour_ceil, hour_floor
+from ralph.partitions import execute_on_partitions, raw_event_sources
+from ralph.storage import read_session
+
+
+METRICS = ("event_count", "follow_up_sum", "confidence_sum", "confidence_count")
+
+
+def window_series(size, count, step=None, end=None) -> list:
+    """
+    `count` windows of length `size` ending at `end` (default: now).
+
+    Windows are returned oldest first. `step` defaults to `size`
+    (adjacent windows); a smaller step gives sliding windows.
+    """
+
+    end = end or datetime.utcnow()
+    step = step or size
+
+    return [
+        (end - size - step * i, end - step * i)
+        for i in reversed(range(count))
+    ]
+
+
+def _merge_ranges(ranges):
+    merged = []
+    for lo, hi in sorted(r for r in ranges if r[0] < r[1]):
+        if merged and lo <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return merged
+
+
+def _in_ranges(column, ranges):
+    return or_(*(and_(column >= lo, column < hi) for lo, hi in ranges))
+
+
+def _filter_source_results(results, dimensions, filters):
+    # `results` is keyed by dimensions + the filter dimensions not in them
+    extra = [name for name in filters if name not in dimensions]
+    names = list(dimensions) + extra
+    width = len(dimensions)
+
+    filtered = {}
+    for key, per_window in results.items():
+        values = dict(zip(names, key))
+        if any(values[name] != value for name, value in filters.items()):
+            continue
+
+        merged = filtered.get(key[:width])
+        if merged is None:
+            filtered[key[:width]] = [dict(totals) for totals in per_window]
+            continue
+        for into, totals in zip(merged, per_window):
+            for name in METRICS:
+                into[name] += totals[name]
+    return filtered
+
+
+def aggregate_windows(
+    windows, dimensions=("intent",), source=None, intent_range=None, filters=None
+) -> dict:
+    """
+    Aggregate events for every [start, end) window in one statement.
+
+    Whole hours are read from the hourly rollups and the partial hours
+    at each window edge from raw events; both halves use conditional
+    aggregation (one SUM(CASE ...) column per window and metric) and are
+    combined with UNION ALL, so N windows cost one round trip and one
+    range scan per table instead of one query per window. Raw edge
+    hours older than the partition boundary are read from the detached
+    partitions that overlap them (see ralph.partitions).
+
+    `source` (e.g. an EventArchive) answers the same call from another
+    store instead of the database. `intent_range` (first, last) keeps
+    only those intents, for keyset-paged insights. `filters`
+    ({"source_system": ..., "event_type": ...}) keeps one slice; it is
+    a plain WHERE on the same range scans, so a slice costs no more
+    than the whole.
+
+    Returns {dimension values tuple: [totals dict per window]}.
+    """
+
+    if source is not None:
+        if filters:
+            extra = tuple(name for name in filters if name not in dimensions)
+            results = _filter_source_results(
+                source.aggregate_windows(windows, tuple(dimensions) + extra),
+                dimensions,
+                filters,
+            )
+        else:
+            results = source.aggregate_windows(windows, dimensions)
+        if intent_range is not None:
+            position = dimensions.index("intent")
+            results = {
+                key: per_window
+                for key, per_window in results.items()
+                if intent_range[0] <= key[position] <= intent_range[1]
+            }
+        return results
+
+    rollup_ranges = []
+    raw_ranges = []
+    for start, end in windows:
+        first_full, last_full = hour_ceil(start), hour_floor(end)
+        if first_full < last_full:
+            rollup_ranges.append([(first_full, last_full)])
+            raw_ranges.append(_merge_ranges([(start, first_full), (last_full, end)]))
+        else:
+            rollup_ranges.append([])
+            raw_ranges.append([(start, end)])
+
+    selects = []
+
+    scan = _merge_ranges(r for ranges in rollup_ranges for r in ranges)
+    if scan:
+        bucket = EventRollup.bucket_start
+        columns = []
+        for ranges in rollup_ranges:
+            if not ranges:
+                columns.extend(literal(0) for _ in METRICS)
+                continue
+            inside = _in_ranges(bucket, ranges)
+            columns.extend(
+                func.sum(case((inside, getattr(EventRollup, name)), else_=0))
+                for name in METRICS
+            )
+        dims = [getattr(EventRollup, name) for name in dimensions]
+        stmt = select(*dims, *columns).where(_in_ranges(bucket, scan))
+        if intent_range is not None:
+            stmt = stmt.where(EventRollup.intent.between(*intent_range))
+        for name, value in (filters or {}).items():
+            stmt = stmt.where(getattr(EventRollup, name) == value)
+        selects.append(stmt.group_by(*dims))
+
+    raw_select = None
+    partitions = []
+
+    scan = _merge_ranges(r for ranges in raw_ranges for r in ranges)
+    if scan:
+        created_at = Event.created_at
+        columns = []
+        for ranges in raw_ranges:
+            if not ranges:
+                columns.extend(literal(0) for _ in METRICS)
+                continue
+            inside = _in_ranges(created_at, ranges)
+            columns.extend(
+                [
+                    func.count(case((inside, 1))),
+                    func.sum(case((inside, Event.follow_up_count), else_=0)),
+                    func.total(case((inside, Event.confidence_score))),
+                    func.count(case((inside, Event.confidence_score))),
+                ]
+            )
+        dims = [getattr(Event, name) for name in dimensions]
+        raw_select = select(*dims, *columns).where(_in_ranges(created_at, scan))
+        if intent_range is not None:
+            raw_select = raw_select.where(Event.intent.between(*intent_range))
+        for name, value in (filters or {}).items():
+            raw_select = raw_select.where(getattr(Event, name) == value)
+        raw_select = raw_select.group_by(*dims)
+
+        hot, partitions = raw_event_sources(scan)
+        if hot:
+            selects.append(raw_select)
+
+    if not selects and not partitions:
+        return {}
+
+    rows = []
+    if selects:
+        stmt = selects[0] if len(selects) == 1 else selects[0].union_all(*selects[1:])
+        rows = read_session().execute(stmt)
+
+    width = len(dimensions)
+    results = {}
+    for row in chain(rows, execute_on_partitions(raw_select, partitions)):
+        key = tuple(row[:width])
+        per_window = results.get(key)
+        if per_window is None:
+            per_window = results[key] = [
+                dict.fromkeys(METRICS, 0) for _ in windows
+            ]
+
+        values = row[width:]
+        for index, totals in enumerate(per_window):
+            offset = index * len(METRICS)
+            for position, name in enumerate(METRICS):
+                totals[name] += values[offset + position] or 0
+
+    return results
+
+
+def window_totals(
+    start, end, dimensions=("intent",), source=None, filters=None
+) -> dict:
+    """
+    Aggregate events in [start, end) grouped by `dimensions`, optionally
+    restricted to one slice (see aggregate_windows).
+
+    Returns {dimension values tuple: totals dict}.
+    """
+
+    return {
+        key: per_window[0]
+        for key, per_window in aggregate_windows(
+            [(start, end)], dimensions, source, filters=filters
+        ).items()
+    }
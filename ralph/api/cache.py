@@ -0,0 +1,163 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, current_app, make_response, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from ralph.models import db
+from ralph.analytics.decision_log import get_decision_log
+
+
+# Bumped on every commit made by this process (ingest, calibration,
+# snapshots). Writes from other processes are caught by the file
+# headers read in data_watermark().
+_commit_generation = 0
+
+
+@event.listens_for(Engine, "commit")
+def _bump_commit_generation(connection):
+    global _commit_generation
+    _commit_generation += 1
+
+
+def _read_head(path, size):
+    try:
+        with open(path, "rb") as f:
+            return f.read(size)
+    except OSError:
+        return None
+
+
+def data_watermark():
+    """
+    Cheap token that changes whenever insight inputs may have changed.
+
+    Never touches the database connection: it combines the in-process
+    commit generation with SQLite's on-disk change markers, i.e. the
+    file change counter in the database header (rollback-journal mode)
+    and the WAL index header, which moves on every WAL commit. The
+    decision log signature is included because governance reads it.
+    """
+
+    parts = [_commit_generation, get_decision_log().signature()]
+
+    database = db.engine.url.database
+    if database and database != ":memory:":
+        parts.append(_read_head(database, 100))
+        parts.append(_read_head(database + "-shm", 48))
+
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+class ResponseCache:
+    """
+    Bounded LRU of rendered insight responses with a per-entry TTL.
+
+    The TTL only guards against time sliding windows forward while no
+    data changes; data changes are handled by the watermark in the key.
+    """
+
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry["expires_at"] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        entry["expires_at"] = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Negotiable insight formats; part of the cache key so a JSON entry is
+# never served to a client asking for NDJSON
+RESPONSE_MIMETYPES = ("application/json", "application/x-ndjson")
+
+
+def init_response_cache(app):
+    max_entries = app.config["INSIGHTS_CACHE_MAX_ENTRIES"]
+    if max_entries > 0:
+        app.extensions["ralph_response_cache"] = ResponseCache(
+            max_entries,
+            app.config["INSIGHTS_CACHE_TTL_SECONDS"],
+        )
+
+
+def cached_insight(view):
+    """
+    Cache a GET insight view by (endpoint, query string, data watermark).
+
+    Sets a content-hash ETag and answers If-None-Match with 304. A hit
+    never reaches the view, so it does no database work. Streamed
+    responses are passed through uncached.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        cache = current_app.extensions.get("ralph_response_cache")
+        if cache is None:
+            return view(*args, **kwargs)
+
+        key = (
+            request.endpoint,
+            tuple(sorted(request.args.items(multi=True))),
+            request.accept_mimetypes.best_match(RESPONSE_MIMETYPES),
+            data_watermark(),
+        )
+
+        entry = cache.get(key)
+        if entry is None:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+
+            body = response.get_data()
+            entry = {
+                "body": body,
+                "etag": hashlib.sha1(body).hexdigest(),
+                "mimetype": response.mimetype,
+                "headers": [
+                    (name, value)
+                    for name, value in response.headers.items()
+                    if name.startswith("X-Ralph-")
+                ],
+            }
+            cache.put(key, entry)
+
+        if request.if_none_match.contains(entry["etag"]):
+            response = Response(status=304)
+        else:
+            response = Response(entry["body"], mimetype=entry["mimetype"])
+            response.headers.extend(entry["headers"])
+
+        response.set_etag(entry["etag"])
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+
+    return wrapper
@@ -1,100 +1,516 @@
-from flask import Blueprint, jsonify
+import base64
+import binascii
 
-from ralph.models import ConfidenceCalibration
-from ralph.analytics.intent_coverage import detect_uncovered_intents
-from ralph.analytics.guardrail_validation import detect_missing_guardrails
-from ralph.analytics.decision_log_validation import detect_missing_decisions
-from ralph.analytics.trend_deltas import compute_intent_trend_deltas
-from ralph.analytics.repetition_analysis import analyze_intent_frequency
-from ralph.analytics.draft_outcome_trends import analyze_draft_outcome_trends
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    jsonify,
+    request,
+    stream_with_context,
+)
+
+from ralph.config import Config
+
+from ralph.analytics.jobs import load_snapshot
+from ralph.api.cache import RESPONSE_MIMETYPES, cached_insight
+from ralph.analytics.intent_registry import intent_page
+
+# Analytics modules are imported inside their routes, on first use
 
 
 insights_bp = Blueprint("insights", __name__, url_prefix="/insights")
 
+# Event columns every insight can be sliced by (see slice_args)
+SLICE_DIMENSIONS = ("source_system", "event_type")
+
+
+def snapshot_or_compute(name, compute):
+    """
+    Serve the latest background-job snapshot for `name` when jobs are
+    enabled, falling back to computing the insight inline.
+
+    Snapshots are computed with default parameters, so requests with a
+    query string are always computed inline.
+    """
+    if current_app.config["JOBS_ENABLED"] and not request.args:
+        snapshot = load_snapshot(name)
+        if snapshot is not None:
+            return Response(
+                snapshot.payload,
+                status=200,
+                mimetype="application/json",
+                headers={
+                    "X-Ralph-Snapshot-Version": str(snapshot.version),
+                    "X-Ralph-Snapshot-Generated-At": snapshot.generated_at.isoformat(),
+                },
+            )
+
+    return jsonify(compute()), 200
+
+
+def bad_request(exc):
+    return jsonify({"status": "error", "error": str(exc)}), 400
+
+
+def int_arg(name, default=None, minimum=1, maximum=None):
+    value = request.args.get(name)
+    if value is None:
+        return default
+
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer") from None
+
+    if value < minimum or (maximum is not None and value > maximum):
+        raise ValueError(f"{name} must be between {minimum} and {maximum}")
+    return value
+
+
+def bool_arg(name, default=False):
+    value = request.args.get(name)
+    if value is None:
+        return default
+
+    if value.lower() in ("true", "1"):
+        return True
+    if value.lower() in ("false", "0"):
+        return False
+    raise ValueError(f"{name} must be true or false")
+
+
+def float_arg(name, default=None, minimum=0.0, maximum=1.0):
+    value = request.args.get(name)
+    if value is None:
+        return default
+
+    try:
+        value = float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number") from None
+
+    if not minimum <= value <= maximum:
+        raise ValueError(f"{name} must be between {minimum} and {maximum}")
+    return value
+
+
+def encode_cursor(intent):
+    return base64.urlsafe_b64encode(intent.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    try:
+        return base64.b64decode(cursor, altchars=b"-_", validate=True).decode("utf-8")
+    except (binascii.Error, ValueError):
+        raise ValueError("cursor is invalid") from None
+
+
+def wants_ndjson():
+    return (
+        request.args.get("format") == "ndjson"
+        or request.accept_mimetypes.best_match(RESPONSE_MIMETYPES)
+        == "application/x-ndjson"
+    )
+
+
+def paged_insight(name, compute):
+    """
+    Serve an intent-keyed insight list in one of three shapes:
+
+    - whole (default, snapshot-backed like snapshot_or_compute),
+    - one keyset page with ?limit=N[&cursor=C]; the next page's cursor is
+      returned in X-Ralph-Next-Cursor while more intents remain,
+    - NDJSON (?format=ndjson or Accept: application/x-ndjson), one insight
+      per line, computed and streamed a page at a time.
+
+    Pages walk the intent registry; `compute(intent_range)` returns the
+    insights for intents in the inclusive (first, last) range. Pages can
+    hold fewer than N insights (intents without a result are skipped),
+    so clients page until the cursor header is absent.
+    """
+    try:
+        limit = int_arg("limit", maximum=Config.INSIGHTS_PAGE_MAX_LIMIT)
+        cursor = request.args.get("cursor")
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as exc:
+        return bad_request(exc)
+
+    if wants_ndjson():
+        page_size = limit or current_app.config["INSIGHTS_STREAM_PAGE_SIZE"]
+
+        def generate(after):
+            while True:
+                page = intent_page(after, page_size)
+                if not page:
+                    return
+                for insight in compute((page[0], page[-1])):
+                    yield current_app.json.dumps(insight) + "\n"
+                if len(page) < page_size:
+                    return
+                after = page[-1]
+
+        return Response(
+            stream_with_context(generate(after)),
+            mimetype="application/x-ndjson",
+        )
+
+    if limit is None and after is None:
+        return snapshot_or_compute(name, lambda: compute(None))
+
+    limit = limit or current_app.config["INSIGHTS_STREAM_PAGE_SIZE"]
+    page = intent_page(after, limit)
+    response = jsonify(compute((page[0], page[-1])) if page else [])
+    if len(page) == limit:
+        response.headers["X-Ralph-Next-Cursor"] = encode_cursor(page[-1])
+    return response, 200
+
+
+def window_args():
+    """
+    Trend window query parameters:
+    ?days=N (default 7) or ?hours=N for the window size,
+    ?windows=N (default 2) for how many windows to compare,
+    ?step_hours=N to slide windows instead of placing them end to end.
+    """
+    return {
+        "days": int_arg("days", 7, maximum=366),
+        "window_hours": int_arg("hours", maximum=24 * 366),
+        "windows": int_arg("windows", 2, minimum=2, maximum=Config.MAX_TREND_WINDOWS),
+        "step_hours": int_arg("step_hours", maximum=24 * 366),
+    }
+
+
+def slice_args(group_by=True):
+    """
+    Slice query parameters:
+    ?source_system=NAME and / or ?event_type=NAME keep one slice,
+    ?group_by=source_system|event_type splits each insight by that
+    dimension (only where `group_by` is True).
+    Returns (filters, group_by), each None when absent.
+    """
+    filters = {
+        name: request.args[name] for name in SLICE_DIMENSIONS if name in request.args
+    }
+
+    group = request.args.get("group_by")
+    if group is not None:
+        if not group_by:
+            raise ValueError("group_by is not supported for this insight")
+        if group not in SLICE_DIMENSIONS:
+            raise ValueError(f"group_by must be one of {', '.join(SLICE_DIMENSIONS)}")
+
+    return filters or None, group
+
+
+def reject_slice(reason):
+    """
+    Refuse slice parameters on insights that cannot honour them.
+    """
+    for name in SLICE_DIMENSIONS + ("group_by",):
+        if name in request.args:
+            raise ValueError(f"{name} is not supported: {reason}")
+
 
 @insights_bp.route("/intent-coverage", methods=["GET"])
+@cached_insight
 def intent_coverage():
     """
     Governance insight:
     Detect intents that have events but no confidence calibration.
-    Advisory only.
+    Advisory only. Pageable / streamable (see paged_insight).
+    Filterable by slice (see slice_args).
     """
-    insights = detect_uncovered_intents()
-    return jsonify(insights), 200
+    from ralph.analytics.intent_coverage import detect_uncovered_intents
+
+    try:
+        filters, _ = slice_args(group_by=False)
+    except ValueError as exc:
+        return bad_request(exc)
+
+    return paged_insight(
+        "intent-coverage",
+        lambda intent_range: detect_uncovered_intents(
+            intent_range=intent_range, filters=filters
+        ),
+    )
 
 @insights_bp.route("/draft-outcomes", methods=["GET"])
+@cached_insight
 def draft_outcome_trends():
     """
     Analytics insight:
     Draft outcome quality trends (follow-ups & resolutions).
     Trend-only. Advisory. Non-actionable.
+    Pageable / streamable (see paged_insight); sliceable (see slice_args).
     """
-    insights = analyze_draft_outcome_trends()
-    return jsonify(insights), 200
+    from ralph.analytics.draft_outcome_trends import analyze_draft_outcome_trends
+
+    try:
+        params = window_args()
+        params["filters"], params["group_by"] = slice_args()
+    except ValueError as exc:
+        return bad_request(exc)
 
+    return paged_insight(
+        "draft-outcomes",
+        lambda intent_range: analyze_draft_outcome_trends(
+            **params, intent_range=intent_range
+        ),
+    )
 
-from ralph.analytics.repetition_analysis import analyze_intent_frequency
 
 @insights_bp.route("/trends", methods=["GET"])
+@cached_insight
 def intent_trend_deltas():
     """
     Analytics insight:
     Show intent frequency deltas between time windows.
-    Descriptive only.
+    Descriptive only. Pageable / streamable (see paged_insight);
+    sliceable (see slice_args).
     """
-    insights = compute_intent_trend_deltas(days=7)
-    return jsonify(insights), 200
+    from ralph.analytics.trend_deltas import compute_intent_trend_deltas
+
+    try:
+        params = window_args()
+        params["filters"], params["group_by"] = slice_args()
+    except ValueError as exc:
+        return bad_request(exc)
+
+    return paged_insight(
+        "trends",
+        lambda intent_range: compute_intent_trend_deltas(
+            **params, intent_range=intent_range
+        ),
+    )
 
 
 @insights_bp.route("/repetition", methods=["GET"])
+@cached_insight
 def repetition_analysis():
     """
     Analytics insight:
     Shows which intents appear most frequently.
     Descriptive only.
+
+    ?approximate=true answers from the per-day sketches: top intents
+    with count_error bounds and a distinct-intent estimate (see
+    approximate_intent_frequency). Exact counts are sliceable (see
+    slice_args); approximate ones are not.
     """
-    insights = analyze_intent_frequency(days=7)
-    return jsonify(insights), 200
+    from ralph.analytics.repetition_analysis import analyze_intent_frequency
+
+    try:
+        approximate = bool_arg("approximate")
+        filters, group_by = slice_args()
+        if approximate and (filters or group_by):
+            raise ValueError("approximate counts cannot be filtered or grouped")
+    except ValueError as exc:
+        return bad_request(exc)
+
+    return snapshot_or_compute(
+        "repetition",
+        lambda: analyze_intent_frequency(
+            days=7, approximate=approximate, filters=filters, group_by=group_by
+        ),
+    )
 
 @insights_bp.route("/guardrails", methods=["GET"])
+@cached_insight
 def guardrail_validation():
     """
     Governance insight:
     Detect missing guardrails for active intents.
-    Advisory only.
+    Advisory only. Filterable by slice (see slice_args).
     """
-    insights = detect_missing_guardrails()
-    return jsonify(insights), 200
+    from ralph.analytics.guardrail_validation import detect_missing_guardrails
+
+    try:
+        filters, _ = slice_args(group_by=False)
+    except ValueError as exc:
+        return bad_request(exc)
+
+    return snapshot_or_compute("guardrails", lambda: detect_missing_guardrails(filters=filters))
 
 
 @insights_bp.route("/decision-log", methods=["GET"])
+@cached_insight
 def decision_log_validation():
     """
     Governance insight:
     Detect intents missing explicit human approval decisions.
-    Advisory only.
+    Advisory only. Filterable by slice (see slice_args).
+    """
+    from ralph.analytics.decision_log_validation import detect_missing_decisions
+
+    try:
+        filters, _ = slice_args(group_by=False)
+    except ValueError as exc:
+        return bad_request(exc)
+
+    return snapshot_or_compute("decision-log", lambda: detect_missing_decisions(filters=filters))
+
+
+@insights_bp.route("/weekly-summary", methods=["GET"])
+@cached_insight
+def weekly_summary():
+    """
+    Reporting insight:
+    Weekly executive summary with per-section timings in "meta".
+    Reporting-only. Filterable by slice (see slice_args).
+    """
+    from ralph.analytics.weekly_executive_summary import (
+        generate_weekly_executive_summary,
+    )
+
+    try:
+        days = int_arg("days", 7, maximum=366)
+        filters, _ = slice_args(group_by=False)
+    except ValueError as exc:
+        return bad_request(exc)
+
+    return snapshot_or_compute(
+        "weekly-summary",
+        lambda: generate_weekly_executive_summary(days=days, filters=filters),
+    )
+
+
+@insights_bp.route("/governance", methods=["GET"])
+@cached_insight
+def governance():
     """
-    insights = detect_missing_decisions()
-    return jsonify(insights), 200
+    Governance insight:
+    Coverage, guardrail and decision-log checks evaluated in one pass.
+    Advisory only. Filterable by slice (see slice_args).
+    """
+    from ralph.analytics.governance import evaluate_governance
+
+    try:
+        filters, _ = slice_args(group_by=False)
+    except ValueError as exc:
+        return bad_request(exc)
+
+    return jsonify(evaluate_governance(filters=filters)), 200
 
 
 @insights_bp.route("/calibrations", methods=["GET"])
+@cached_insight
 def get_calibrations():
     """
     Read-only endpoint returning advisory confidence calibrations.
+    Pageable / streamable (see paged_insight). Not sliceable.
+    """
+    from ralph.analytics.confidence import list_calibrations
+
+    try:
+        reject_slice("calibrations are stored per intent only")
+    except ValueError as exc:
+        return bad_request(exc)
+
+    return paged_insight("calibrations", list_calibrations)
+
+
+@insights_bp.route("/calibration-curve", methods=["GET"])
+@cached_insight
+def calibration_curve():
+    """
+    Per-intent resolution rate and coverage for confidence thresholds
+    0.50-0.99, with ?target=R (resolution rate) and ?intent=NAME.
+    Advisory only. Sliceable (see slice_args).
+    Returns 501 when numpy (see requirements.txt) is not installed.
+    """
+    try:
+        from ralph.analytics.calibration_curve import compute_calibration_curves
+    except ImportError as exc:
+        return (
+            jsonify(
+                {
+                    "status": "error",
+                    "error": f"Calibration curves require numpy ({exc})",
+                }
+            ),
+            501,
+        )
+
+    try:
+        target = float_arg("target")
+        filters, group_by = slice_args()
+    except ValueError as exc:
+        return bad_request(exc)
+
+    return jsonify(
+        compute_calibration_curves(
+            target_rate=target,
+            intent=request.args.get("intent"),
+            filters=filters,
+            group_by=group_by,
+        )
+    ), 200
+
+
+@insights_bp.route("/confidence-distribution", methods=["GET"])
+@cached_insight
+def confidence_distribution():
+    """
+    Analytics insight:
+    Per-intent confidence p10/p50/p90 over the last ?days=N (default 7)
+    and drift against the window before, with ?intent=NAME.
+    Descriptive only. Not sliceable.
+    """
+    from ralph.analytics.confidence_distribution import (
+        compute_confidence_distributions,
+    )
+
+    try:
+        days = int_arg("days", 7, maximum=366)
+        reject_slice("the confidence histograms are kept per intent only")
+    except ValueError as exc:
+        return bad_request(exc)
+
+    return jsonify(
+        compute_confidence_distributions(
+            days=days, intent=request.args.get("intent")
+        )
+    ), 200
+
+
+@insights_bp.route("/anomalies", methods=["GET"])
+@cached_insight
+def intent_anomalies():
+    """
+    Analytics insight:
+    Intents whose latest closed hour deviates from their seasonal EWMA
+    baseline, with ?threshold=Z and ?intent=NAME. Reads stored state
+    only; the anomalies job (or `flask analytics detect-anomalies`)
+    advances it.
+    Descriptive only. Not sliceable.
+    """
+    from ralph.analytics.anomalies import list_anomalies
+
+    try:
+        threshold = float_arg("threshold", minimum=0.0, maximum=1000.0)
+        reject_slice("anomaly baselines are kept per intent only")
+    except ValueError as exc:
+        return bad_request(exc)
+
+    return snapshot_or_compute(
+        "anomalies",
+        lambda: list_anomalies(
+            threshold=threshold, intent=request.args.get("intent")
+        ),
+    )
+
+
+@insights_bp.route("/jobs", methods=["GET"])
+def job_status():
+    """
+    Status of the background insight jobs (last run, duration, errors).
     """
-    calibrations = ConfidenceCalibration.query.all()
+    runner = current_app.extensions.get("ralph_jobs")
 
     return jsonify(
-        [
-            {
-                "intent": c.intent,
-                "recommended_threshold": c.recommended_threshold,
-                "success_rate": c.success_rate,
-                "observation_count": c.observation_count,
-                "actionable": False,
-                "requires_approval": True,
-            }
-            for c in calibrations
-        ]
+        {
+            "enabled": runner is not None,
+            "jobs": runner.status() if runner else [],
+        }
     ), 200
@@ -1,22 +1,41 @@
+import os
+
 from flask import Flask, jsonify
 
 from ralph.config import Config
 from ralph.models import db
+from ralph.schema import upgrade_schema
+from ralph.storage import init_storage
+from ralph.cli import db_cli, analytics_cli
 from ralph.events.routes import events_bp
+from ralph.events.buffer import start_ingest_buffer
 from ralph.api.insights import insights_bp
+from ralph.api.cache import init_response_cache
+from ralph.analytics.jobs import start_job_runner
+from ralph.metrics import init_metrics
 
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
+    os.makedirs(app.config["INSTANCE_DIR"], exist_ok=True)
 
     # Init DB
     db.init_app(app)
+    init_storage(app)
+
+    # Before the response cache, so cache hits are timed too
+    init_metrics(app)
 
     # Register blueprints
     app.register_blueprint(events_bp)
     app.register_blueprint(insights_bp)
 
+    init_response_cache(app)
+
+    app.cli.add_command(db_cli)
+    app.cli.add_command(analytics_cli)
+
     @app.route("/health", methods=["GET"])
     def health():
         return jsonify(
@@ -26,14 +45,27 @@ def create_app():
             }
         )
 
-    # Create tables on first run (dev-safe)
+    # Create tables and apply pending migrations (a no-op when current)
     with app.app_context():
-        db.create_all()
+        upgrade_schema()
+
+    if app.config["JOBS_ENABLED"]:
+        start_job_runner(app)
+
+    if app.config["INGEST_BUFFER_ENABLED"]:
+        start_ingest_buffer(app)
 
     return app
 
 
-app = create_app()
+def __getattr__(name):
+    # `ralph.app:app` (WSGI servers, flask --app ralph.app) builds the
+    # app on first access, so importing this module stays cheap
+    if name == "app":
+        app = globals()["app"] = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    create_app().run(debug=True)
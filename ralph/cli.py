@@ -0,0 +1,179 @@
+import json
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from ralph.models import db
+from ralph.schema import (
+    upgrade_schema,
+    explain_insight_queries,
+    insight_query_checks,
+)
+from ralph.analytics.rollups import rebuild_rollups
+from ralph.analytics.intent_registry import rebuild_intent_registry
+from ralph.analytics.sketches import rebuild_sketches
+from ralph.analytics.confidence_histograms import rebuild_confidence_histograms
+
+
+db_cli = AppGroup("db", help="Ralph database maintenance.")
+analytics_cli = AppGroup("analytics", help="Run Ralph analytics loops.")
+
+
+@db_cli.command("upgrade")
+def upgrade_command():
+    """Apply pending schema migrations to the configured database."""
+    version = upgrade_schema()
+    click.echo(f"Schema is at version {version}.")
+
+
+@db_cli.command("rebuild-rollups")
+def rebuild_rollups_command():
+    """Recompute the hourly rollup table from raw events."""
+    with db.engine.begin() as connection:
+        rebuild_rollups(connection)
+    click.echo("Hourly rollups rebuilt.")
+
+
+@db_cli.command("rebuild-intent-registry")
+def rebuild_intent_registry_command():
+    """Recompute the intent registry from raw events."""
+    with db.engine.begin() as connection:
+        rebuild_intent_registry(connection)
+    click.echo("Intent registry rebuilt.")
+
+
+@db_cli.command("rebuild-sketches")
+def rebuild_sketches_command():
+    """Recompute the per-day intent sketches from the hourly rollups."""
+    with db.engine.begin() as connection:
+        rebuild_sketches(connection)
+    click.echo("Intent sketches rebuilt.")
+
+
+@db_cli.command("rebuild-confidence-histograms")
+def rebuild_confidence_histograms_command():
+    """Recompute the per-day confidence histograms from raw events."""
+    with db.engine.begin() as connection:
+        rebuild_confidence_histograms(connection)
+    click.echo("Confidence histograms rebuilt.")
+
+
+@db_cli.command("check-query-plans")
+def check_query_plans_command():
+    """
+    Fail if any window-based insight query full-scans the events table.
+    """
+    reports = explain_insight_queries(insight_query_checks())
+
+    failures = 0
+    for report in reports:
+        marker = "FULL SCAN" if report["full_scan"] else "ok"
+        click.echo(f"[{marker}] {report['check']}: {report['statement']}")
+        for step in report["plan"]:
+            click.echo(f"    {step}")
+        failures += report["full_scan"]
+
+    if failures:
+        raise click.ClickException(f"{failures} insight queries full-scan events")
+
+
+@analytics_cli.command("calibrate")
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="Only fold in events newer than the last calibration run.",
+)
+def calibrate_command(incremental):
+    """Recompute advisory confidence calibrations."""
+    from ralph.analytics.confidence import run_confidence_calibration
+
+    results = run_confidence_calibration(incremental=incremental)
+    click.echo(f"Calibrated {len(results)} intents.")
+
+
+@analytics_cli.command("detect-anomalies")
+def detect_anomalies_command():
+    """Fold newly closed hours into the intent anomaly baselines."""
+    from ralph.analytics.anomalies import advance_anomaly_state, list_anomalies
+
+    hours = advance_anomaly_state()
+    click.echo(f"Folded {hours} hours; {len(list_anomalies())} intents anomalous.")
+
+
+def _archive_path(path):
+    return path or current_app.config["EVENT_ARCHIVE_DIR"]
+
+
+@analytics_cli.command("export-archive")
+@click.option("--path", default=None, help="Archive directory (default: EVENT_ARCHIVE_DIR).")
+@click.option("--batch-size", default=50000, show_default=True)
+def export_archive_command(path, batch_size):
+    """Append new events to the columnar event archive."""
+    try:
+        from ralph.analytics.archive import export_events
+    except ImportError as exc:
+        raise click.ClickException(f"The event archive requires numpy ({exc}).")
+
+    result = export_events(_archive_path(path), batch_size=batch_size)
+    click.echo(
+        f"Exported {result['exported']} events "
+        f"({result['row_count']} archived, last id {result['last_event_id']})."
+    )
+
+
+@analytics_cli.command("archive-report")
+@click.argument("insight", type=click.Choice(["trends", "repetition", "draft-outcomes"]))
+@click.option("--path", default=None, help="Archive directory (default: EVENT_ARCHIVE_DIR).")
+@click.option("--days", default=7, show_default=True)
+@click.option("--windows", default=2, show_default=True)
+def archive_report_command(insight, path, days, windows):
+    """Run a window-based insight against the event archive."""
+    try:
+        from ralph.analytics.archive import EventArchive
+    except ImportError as exc:
+        raise click.ClickException(f"The event archive requires numpy ({exc}).")
+    from ralph.analytics.trend_deltas import compute_intent_trend_deltas
+    from ralph.analytics.repetition_analysis import analyze_intent_frequency
+    from ralph.analytics.draft_outcome_trends import analyze_draft_outcome_trends
+
+    archive = EventArchive(_archive_path(path))
+
+    if insight == "repetition":
+        insights = analyze_intent_frequency(days=days, source=archive)
+    elif insight == "trends":
+        insights = compute_intent_trend_deltas(days=days, windows=windows, source=archive)
+    else:
+        insights = analyze_draft_outcome_trends(days=days, windows=windows, source=archive)
+
+    click.echo(json.dumps(insights, indent=2))
+
+
+@db_cli.command("partition")
+@click.option(
+    "--keep-months",
+    type=int,
+    default=None,
+    help="Newest months to keep in the events table (default: EVENT_PARTITION_HOT_MONTHS).",
+)
+def partition_command(keep_months):
+    """Move closed months of events into monthly partition files."""
+    from ralph.partitions import detach_partitions
+
+    created = detach_partitions(keep_months=keep_months)
+    click.echo(f"Detached {len(created)} partitions: {', '.join(created) or '-'}.")
+
+
+@db_cli.command("compact")
+@click.option(
+    "--retention-days",
+    type=int,
+    default=None,
+    help="Keep raw events this many days (default: EVENT_RETENTION_DAYS).",
+)
+def compact_command(retention_days):
+    """Compact partitions past the retention window into rollups."""
+    from ralph.partitions import compact_partitions
+
+    compacted = compact_partitions(retention_days=retention_days)
+    click.echo(f"Compacted {len(compacted)} partitions: {', '.join(compacted) or '-'}.")
@@ -13,16 +13,45 @@ class Config:
 
     BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 
-    # Store the SQLite DB inside ralph/instance/
+    # Store the SQLite DB inside ralph/instance/ (created by create_app)
     INSTANCE_DIR = os.path.join(BASE_DIR, "instance")
-    os.makedirs(INSTANCE_DIR, exist_ok=True)
 
-    SQLALCHEMY_DATABASE_URI = (
-        "sqlite:///" + os.path.join(INSTANCE_DIR, "ralph.db")
+    SQLALCHEMY_DATABASE_URI = os.getenv(
+        "RALPH_DATABASE_URL",
+        "sqlite:///" + os.path.join(INSTANCE_DIR, "ralph.db"),
     )
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # SQLite storage tuning (see ralph/storage.py)
+    SQLITE_WAL = os.getenv("RALPH_SQLITE_WAL", "1") == "1"
+    SQLITE_SYNCHRONOUS = os.getenv("RALPH_SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_CACHE_SIZE_KIB = int(os.getenv("RALPH_SQLITE_CACHE_SIZE_KIB", "32768"))
+    SQLITE_MMAP_SIZE = int(os.getenv("RALPH_SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("RALPH_SQLITE_BUSY_TIMEOUT_MS", "10000"))
+    SQLITE_READ_POOL_SIZE = int(os.getenv("RALPH_SQLITE_READ_POOL_SIZE", "8"))
+
+    # Columnar event archive for offline analytics (needs numpy)
+    EVENT_ARCHIVE_DIR = os.getenv(
+        "RALPH_EVENT_ARCHIVE_DIR",
+        os.path.join(INSTANCE_DIR, "archive"),
+    )
+
+    # Monthly event partitions + raw-event retention (see ralph/partitions.py)
+    EVENT_PARTITION_DIR = os.getenv(
+        "RALPH_EVENT_PARTITION_DIR",
+        os.path.join(INSTANCE_DIR, "partitions"),
+    )
+    EVENT_PARTITION_HOT_MONTHS = int(os.getenv("RALPH_EVENT_PARTITION_HOT_MONTHS", "2"))
+    EVENT_RETENTION_DAYS = int(os.getenv("RALPH_EVENT_RETENTION_DAYS", "0"))
+
+    # Human approval decisions (single source of truth)
+    DECISION_LOG_PATH = os.getenv(
+        "RALPH_DECISION_LOG_PATH",
+        os.path.join(os.path.dirname(BASE_DIR), "data", "decision_log.json"),
+    )
+    DECISION_LOG_STREAM_THRESHOLD_BYTES = 8 * 1024 * 1024
+
     # Safety + identity
     SERVICE_NAME = "ralph"
     MODE = os.getenv("RALPH_MODE", "development")
@@ -30,3 +59,50 @@ class Config:
     # Analytics behavior (safe defaults)
     CONFIDENCE_BASELINE = 0.85
     MIN_SAMPLE_SIZE = 5
+    CALIBRATION_TARGET_RESOLUTION_RATE = 0.95
+    MAX_TREND_WINDOWS = 168
+
+    # Ingest limits
+    INGEST_BATCH_MAX_EVENTS = int(os.getenv("RALPH_INGEST_BATCH_MAX_EVENTS", "10000"))
+    INGEST_STREAM_CHUNK_SIZE = int(os.getenv("RALPH_INGEST_STREAM_CHUNK_SIZE", "5000"))
+    INGEST_STREAM_MAX_ERRORS = 100
+
+    # In-memory filter in front of the idempotency-key index
+    IDEMPOTENCY_FILTER_CAPACITY = int(os.getenv("RALPH_IDEMPOTENCY_FILTER_CAPACITY", "1000000"))
+    IDEMPOTENCY_FILTER_ERROR_RATE = float(os.getenv("RALPH_IDEMPOTENCY_FILTER_ERROR_RATE", "0.001"))
+
+    # Space-Saving counters kept per day in the intent sketches
+    SKETCH_TOPK = int(os.getenv("RALPH_SKETCH_TOPK", "256"))
+
+    # Intent anomaly detection (see ralph/analytics/anomalies.py)
+    ANOMALY_HALFLIFE_DAYS = float(os.getenv("RALPH_ANOMALY_HALFLIFE_DAYS", "7"))
+    ANOMALY_Z_THRESHOLD = float(os.getenv("RALPH_ANOMALY_Z_THRESHOLD", "3.0"))
+    ANOMALY_MIN_HISTORY_DAYS = int(os.getenv("RALPH_ANOMALY_MIN_HISTORY_DAYS", "3"))
+    ANOMALY_BOOTSTRAP_DAYS = int(os.getenv("RALPH_ANOMALY_BOOTSTRAP_DAYS", "14"))
+
+    # Write-behind buffer for single-event ingest (see ralph/events/buffer.py)
+    INGEST_BUFFER_ENABLED = os.getenv("RALPH_INGEST_BUFFER_ENABLED", "0") == "1"
+    INGEST_BUFFER_MAX_EVENTS = int(os.getenv("RALPH_INGEST_BUFFER_MAX_EVENTS", "10000"))
+    INGEST_BUFFER_FLUSH_EVENTS = int(os.getenv("RALPH_INGEST_BUFFER_FLUSH_EVENTS", "1000"))
+    INGEST_BUFFER_FLUSH_MS = int(os.getenv("RALPH_INGEST_BUFFER_FLUSH_MS", "50"))
+
+    # Keyset pagination / NDJSON streaming of intent-keyed insight lists
+    INSIGHTS_PAGE_MAX_LIMIT = 1000
+    INSIGHTS_STREAM_PAGE_SIZE = int(os.getenv("RALPH_INSIGHTS_STREAM_PAGE_SIZE", "500"))
+
+    # Background insight jobs (run in one process per database)
+    JOBS_ENABLED = os.getenv("RALPH_JOBS_ENABLED", "0") == "1"
+    JOB_WORKERS = int(os.getenv("RALPH_JOB_WORKERS", "2"))
+    JOB_INTERVALS = {
+        "calibration": int(os.getenv("RALPH_JOB_INTERVAL_CALIBRATION", "300")),
+        "governance": int(os.getenv("RALPH_JOB_INTERVAL_GOVERNANCE", "60")),
+        "trends": int(os.getenv("RALPH_JOB_INTERVAL_TRENDS", "60")),
+        "anomalies": int(os.getenv("RALPH_JOB_INTERVAL_ANOMALIES", "60")),
+    }
+
+    # Request / SQL / ingest / job instrumentation served on /metrics
+    METRICS_ENABLED = os.getenv("RALPH_METRICS_ENABLED", "1") == "1"
+
+    # Insight response cache (0 disables)
+    INSIGHTS_CACHE_MAX_ENTRIES = int(os.getenv("RALPH_INSIGHTS_CACHE_MAX_ENTRIES", "256"))
+    INSIGHTS_CACHE_TTL_SECONDS = int(os.getenv("RALPH_INSIGHTS_CACHE_TTL_SECONDS", "30"))
@@ -0,0 +1,228 @@
+import atexit
+import threading
+import time
+from collections import deque
+
+from ralph.metrics import INGEST_EVENTS
+from ralph.models import db
+from ralph.events.intake import bulk_insert_events
+
+
+class BufferFull(Exception):
+    """
+    The write-behind queue is at capacity (or shutting down).
+    """
+
+
+class PendingWrite:
+    """
+    Completion handle for a synchronous-durability event, resolved once
+    the flush holding it has committed or failed.
+    """
+
+    __slots__ = ("done", "event_id", "duplicate", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.event_id = None
+        self.duplicate = False
+        self.error = None
+
+    def wait(self) -> int:
+        """
+        Block until the event's flush finishes and return its event id
+        (the stored event's id when it was a duplicate).
+        """
+        self.done.wait()
+        if self.error is not None:
+            raise RuntimeError(self.error)
+        return self.event_id
+
+
+class IngestBuffer:
+    """
+    Write-behind queue for single-event ingest.
+
+    Requests append validated rows and return without touching the
+    database. One writer thread drains the queue in a single transaction
+    when `flush_events` rows are waiting or `flush_interval` seconds
+    after the oldest queued row arrived. Rows that arrive while a flush
+    is committing go out together in the next one (group commit), so
+    concurrent producers share one commit instead of paying one each.
+
+    A synchronous caller's row is flushed without waiting out the
+    interval. stop() flushes everything still queued before returning.
+    Rows are validated before they are queued. If a flush still fails,
+    its rows are retried one per transaction, so only the rows that fail
+    on their own are dropped: they are logged and counted, and
+    synchronous callers get an error.
+    """
+
+    def __init__(self, app, max_events=10000, flush_events=1000, flush_interval=0.05):
+        self.app = app
+        self.max_events = max_events
+        self.flush_events = flush_events
+        self.flush_interval = flush_interval
+
+        # (row, PendingWrite or None, monotonic arrival time)
+        self._rows = deque()
+        self._sync_waiting = 0
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+
+        self._thread = threading.Thread(
+            target=self._loop,
+            name="ralph-ingest-writer",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def put(self, row, sync=False):
+        """
+        Queue a validated event row.
+
+        Returns a PendingWrite when `sync` is set, else None.
+        Raises BufferFull when the queue is at max_events.
+        """
+
+        pending = PendingWrite() if sync else None
+
+        with self._cond:
+            if self._stopping:
+                raise BufferFull("Ingest buffer is shutting down")
+            if len(self._rows) >= self.max_events:
+                raise BufferFull(f"Ingest buffer is full ({self.max_events} events)")
+
+            self._rows.append((row, pending, time.monotonic()))
+            if sync:
+                self._sync_waiting += 1
+
+            # The writer only needs waking to start a deadline or cut it short
+            if sync or len(self._rows) == 1 or len(self._rows) >= self.flush_events:
+                self._cond.notify()
+
+        return pending
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._rows and not self._stopping:
+                self._cond.wait()
+            if not self._rows:
+                return None
+
+            deadline = self._rows[0][2] + self.flush_interval
+            while (
+                len(self._rows) < self.flush_events
+                and not self._sync_waiting
+                and not self._stopping
+            ):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            size = min(len(self._rows), self.flush_events)
+            batch = [self._rows.popleft() for _ in range(size)]
+            self._sync_waiting -= sum(1 for _, pending, _ in batch if pending)
+            return batch
+
+    def _loop(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            self._flush(batch)
+
+    def _commit(self, rows):
+        try:
+            inserted = bulk_insert_events(rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return inserted
+
+    def _commit_each(self, rows):
+        # One transaction per row, so a bad row only loses itself
+        inserted = []
+        for row in rows:
+            try:
+                inserted.extend(self._commit([row]))
+            except Exception:
+                self.app.logger.exception(
+                    "ingest buffer: dropped event (intent %r, source_system %r)",
+                    row["intent"],
+                    row["source_system"],
+                )
+                inserted.append(None)
+        return inserted
+
+    def _flush(self, batch):
+        rows = [row for row, _, _ in batch]
+        inserted = [None] * len(rows)
+
+        try:
+            with self.app.app_context():
+                try:
+                    inserted = self._commit(rows)
+                except Exception:
+                    self.app.logger.exception(
+                        "ingest buffer: flush of %d events failed; "
+                        "retrying them one by one",
+                        len(rows),
+                    )
+                else:
+                    return
+                inserted = self._commit_each(rows)
+        except Exception:
+            self.app.logger.exception(
+                "ingest buffer: flush of %d events failed", len(rows)
+            )
+        finally:
+            failed = sum(1 for result in inserted if result is None)
+            duplicates = sum(1 for result in inserted if result and result[1])
+            INGEST_EVENTS.inc("buffer", "failed", amount=failed)
+            INGEST_EVENTS.inc("buffer", "duplicate", amount=duplicates)
+            INGEST_EVENTS.inc(
+                "buffer", "committed", amount=len(rows) - failed - duplicates
+            )
+
+            for (_, pending, _), result in zip(batch, inserted):
+                if pending is None:
+                    continue
+                if result is None:
+                    pending.error = "Event could not be stored"
+                else:
+                    pending.event_id, pending.duplicate = result
+                pending.done.set()
+
+
+def start_ingest_buffer(app):
+    """
+    Build the buffer from app config, start its writer and register it
+    on the app. Queued events are flushed at interpreter exit.
+    """
+
+    buffer = IngestBuffer(
+        app,
+        max_events=app.config["INGEST_BUFFER_MAX_EVENTS"],
+        flush_events=app.config["INGEST_BUFFER_FLUSH_EVENTS"],
+        flush_interval=app.config["INGEST_BUFFER_FLUSH_MS"] / 1000,
+    )
+    buffer.start()
+    atexit.register(buffer.stop)
+
+    app.extensions["ralph_ingest_buffer"] = buffer
+    return buffer
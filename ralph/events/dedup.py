@@ -0,0 +1,205 @@
+import hashlib
+import math
+import struct
+import threading
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from ralph.metrics import IDEMPOTENCY_CHECKS
+from ralph.models import db, Event, IdempotencyKey
+from ralph.storage import read_session
+
+
+LOAD_BATCH_SIZE = 50000
+MAX_HASHES = 16  # 4 bytes per hash out of one <= 64-byte BLAKE2b digest
+
+_filter_lock = threading.Lock()
+
+
+class BloomFilter:
+    """
+    Bit-array Bloom filter over string keys.
+
+    `key in filter` is False only for keys never added; True can be a
+    false positive at about `error_rate` once `capacity` keys are in.
+    The k bit positions are 32-bit slices of one BLAKE2b digest.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        if self.size >= 2 ** 32:
+            raise ValueError("Bloom filter would exceed 2^32 bits")
+        self.hashes = min(MAX_HASHES, max(1, round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+        self._unpack = struct.Struct(f"<{self.hashes}I").unpack
+        self._lock = threading.Lock()
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(
+            key.encode("utf-8"), digest_size=4 * self.hashes
+        ).digest()
+        size = self.size
+        return [value % size for value in self._unpack(digest)]
+
+    def update(self, keys):
+        bits = self.bits
+        with self._lock:
+            for key in keys:
+                for position in self._positions(key):
+                    bits[position >> 3] |= 1 << (position & 7)
+                self.count += 1
+
+    def add(self, key):
+        self.update((key,))
+
+    def __contains__(self, key):
+        bits = self.bits
+        for position in self._positions(key):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+def _load_filter(app):
+    extensions = app.extensions
+
+    try:
+        with app.app_context():
+            keyed = Event.idempotency_key.isnot(None)
+            stored = read_session().scalar(
+                select(func.count()).select_from(Event).where(keyed)
+            ) + read_session().scalar(
+                select(func.count()).select_from(IdempotencyKey)
+            )
+            bloom = BloomFilter(
+                max(app.config["IDEMPOTENCY_FILTER_CAPACITY"], 2 * stored),
+                app.config["IDEMPOTENCY_FILTER_ERROR_RATE"],
+            )
+
+            # Keys in the events table, then those of detached months
+            for stmt in (
+                select(Event.idempotency_key).where(keyed),
+                select(IdempotencyKey.key),
+            ):
+                batches = read_session().execute(
+                    stmt.execution_options(yield_per=LOAD_BATCH_SIZE)
+                ).partitions()
+                for batch in batches:
+                    bloom.update(key for (key,) in batch)
+
+        with _filter_lock:
+            # Keys stored while loading; the snapshot above may have missed them
+            bloom.update(extensions["ralph_idempotency_filter"])
+            extensions["ralph_idempotency_filter"] = bloom
+    except Exception:
+        # Dropping the pending list lets the next lookup start a new load
+        app.logger.exception("idempotency filter: load failed")
+        with _filter_lock:
+            extensions.pop("ralph_idempotency_filter", None)
+        return
+
+    app.logger.info("idempotency filter: loaded %d keys", bloom.count)
+
+
+def idempotency_filter():
+    """
+    The app's filter of stored idempotency keys, or None while it is
+    still loading.
+
+    The first call starts loading it from the unique index and the keys
+    of detached months (see IdempotencyKey) in a background thread, so
+    neither startup nor the first keyed request waits on a full key
+    scan. It is sized for
+    max(IDEMPOTENCY_FILTER_CAPACITY, twice the stored keys); past that
+    it answers "maybe" more often, which costs index lookups, never
+    correctness.
+    """
+
+    extensions = current_app.extensions
+    state = extensions.get("ralph_idempotency_filter")
+    if isinstance(state, BloomFilter):
+        return state
+
+    if state is None:
+        with _filter_lock:
+            if "ralph_idempotency_filter" not in extensions:
+                # Keys remembered until the loader publishes the filter
+                extensions["ralph_idempotency_filter"] = []
+                threading.Thread(
+                    target=_load_filter,
+                    args=(current_app._get_current_object(),),
+                    name="ralph-idempotency-filter",
+                    daemon=True,
+                ).start()
+    return None
+
+
+def stored_event_ids(keys, session=None) -> dict:
+    """
+    Map each of `keys` that is already stored to its event id, straight
+    from the unique index, including keys of events since moved to a
+    partition.
+    """
+
+    session = session if session is not None else db.session
+    return dict(
+        session.execute(
+            select(Event.idempotency_key, Event.id)
+            .where(Event.idempotency_key.in_(keys))
+            .union_all(
+                select(IdempotencyKey.key, IdempotencyKey.event_id).where(
+                    IdempotencyKey.key.in_(keys)
+                )
+            )
+        ).all()
+    )
+
+
+def find_stored_keys(keys, session=None) -> dict:
+    """
+    stored_event_ids() behind the filter: most new keys are ruled out in
+    memory and only the filter's "maybe" answers reach the index. While
+    the filter is loading every key goes to the index.
+
+    Keys stored by another process are not in this process's filter;
+    inserts catch those on the unique index (see bulk_insert_events).
+    """
+
+    bloom = idempotency_filter()
+    if bloom is None:
+        IDEMPOTENCY_CHECKS.inc("unfiltered", amount=len(keys))
+        return stored_event_ids(keys, session)
+
+    maybe = [key for key in keys if key in bloom]
+    IDEMPOTENCY_CHECKS.inc("negative", amount=len(keys) - len(maybe))
+    if not maybe:
+        return {}
+
+    stored = stored_event_ids(maybe, session)
+    IDEMPOTENCY_CHECKS.inc("duplicate", amount=len(stored))
+    IDEMPOTENCY_CHECKS.inc("false_positive", amount=len(maybe) - len(stored))
+    return stored
+
+
+def remember_keys(keys):
+    keys = [key for key in keys if key is not None]
+    if not keys:
+        return
+
+    bloom = idempotency_filter()
+    if bloom is not None:
+        bloom.update(keys)
+        return
+
+    with _filter_lock:
+        state = current_app.extensions.get("ralph_idempotency_filter")
+        if isinstance(state, BloomFilter):
+            state.update(keys)
+        elif state is not None:
+            state.extend(keys)
@@ -1,33 +1,331 @@
+import json
+import math
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+
 from ralph.models import db, Event
+from ralph.analytics.rollups import apply_to_rollups
+from ralph.analytics.intent_registry import apply_to_registry
+from ralph.analytics.sketches import apply_to_sketches
+from ralph.analytics.confidence_histograms import apply_to_histograms
+from ralph.events.dedup import find_stored_keys, remember_keys, stored_event_ids
+
+
+REQUIRED_FIELDS = [
+    "event_type",
+    "source_system",
+    "intent",
+    "outcome",
+]
+
+IDEMPOTENCY_KEY_MAX_LENGTH = 128
+
+
+class DuplicateEvent(Exception):
+    """
+    An event with the same idempotency key is already stored.
+    """
 
+    def __init__(self, event_id):
+        super().__init__(f"Duplicate of event {event_id}")
+        self.event_id = event_id
 
-def ingest_event(payload: dict) -> Event:
+
+def validate_event(payload) -> dict:
     """
-    Validate and persist an incoming event.
+    Validate an incoming event payload.
 
-    Events are append-only and immutable.
+    Returns the column values to persist.
+    Raises ValueError if the payload is not acceptable.
     """
 
-    required_fields = [
-        "event_type",
-        "source_system",
-        "intent",
-        "outcome",
-    ]
+    if not isinstance(payload, dict):
+        raise ValueError("Event payload must be a JSON object")
 
-    for field in required_fields:
+    for field in REQUIRED_FIELDS:
         if field not in payload:
             raise ValueError(f"Missing required field: {field}")
 
-    event = Event(
-        event_type=payload["event_type"],
-        source_system=payload["source_system"],
-        intent=payload["intent"],
-        confidence_score=payload.get("confidence_score"),
-        outcome=payload["outcome"],
-    )
+        value = payload[field]
+        max_length = Event.__table__.c[field].type.length
+        if not isinstance(value, str) or not 0 < len(value) <= max_length:
+            raise ValueError(
+                f"{field} must be a string of 1 to {max_length} characters"
+            )
+
+    confidence_score = payload.get("confidence_score")
+    if confidence_score is not None and (
+        isinstance(confidence_score, bool)
+        or not isinstance(confidence_score, (int, float))
+        or not math.isfinite(confidence_score)
+    ):
+        raise ValueError("confidence_score must be a finite number")
+
+    idempotency_key = payload.get("idempotency_key")
+    if idempotency_key is not None and (
+        not isinstance(idempotency_key, str)
+        or not 0 < len(idempotency_key) <= IDEMPOTENCY_KEY_MAX_LENGTH
+    ):
+        raise ValueError(
+            "idempotency_key must be a string of 1 to "
+            f"{IDEMPOTENCY_KEY_MAX_LENGTH} characters"
+        )
+
+    return {
+        "event_type": payload["event_type"],
+        "source_system": payload["source_system"],
+        "intent": payload["intent"],
+        "confidence_score": confidence_score,
+        "outcome": payload["outcome"],
+        "idempotency_key": idempotency_key,
+        # Stamped here (not by the column default) so derived aggregates
+        # bucket the event exactly as it is stored.
+        "created_at": datetime.utcnow(),
+    }
+
+
+def apply_to_aggregates(rows):
+    """
+    Fold validated event rows into every structure maintained at ingest.
+
+    Runs in the ingest transaction, so aggregates commit with the events.
+    """
+
+    apply_to_rollups(rows)
+    apply_to_registry(rows)
+    apply_to_sketches(rows)
+    apply_to_histograms(rows)
+
+
+def ingest_event(payload: dict) -> int:
+    """
+    Validate and persist an incoming event; returns its id.
+
+    Events are append-only and immutable. Goes through the same insert
+    as batches (bulk_insert_events), so keys stored by another process
+    or moved to a partition are caught the same way. Raises
+    DuplicateEvent when the event's idempotency key is already stored.
+    """
+
+    [(event_id, duplicate)] = bulk_insert_events([validate_event(payload)])
+    if duplicate:
+        db.session.rollback()
+        raise DuplicateEvent(event_id)
+
+    db.session.commit()
+    return event_id
+
+
+def ingest_events(payloads: list) -> list:
+    """
+    Validate and persist a batch of incoming events.
 
-    db.session.add(event)
+    Every payload is validated up front. Accepted events are written
+    with a single bulk INSERT in one transaction, so the whole batch
+    costs one commit instead of one per event. Events whose idempotency
+    key is already stored (or repeated earlier in the batch) are
+    reported as "duplicate" with the stored event's id.
+
+    Returns one result per payload, in request order.
+    """
+
+    results = []
+    rows = []
+
+    for index, payload in enumerate(payloads):
+        try:
+            rows.append(validate_event(payload))
+        except ValueError as exc:
+            results.append(
+                {
+                    "index": index,
+                    "status": "rejected",
+                    "error": str(exc),
+                }
+            )
+        else:
+            results.append(
+                {
+                    "index": index,
+                    "status": "accepted",
+                }
+            )
+
+    inserted = bulk_insert_events(rows)
     db.session.commit()
 
-    return event
+    accepted = [r for r in results if r["status"] == "accepted"]
+    for result, (event_id, duplicate) in zip(accepted, inserted):
+        result["event_id"] = event_id
+        if duplicate:
+            result["status"] = "duplicate"
+
+    return results
+
+
+def bulk_insert_events(rows: list) -> list:
+    """
+    Insert already-validated event rows with one executemany INSERT
+    and fold them into the derived aggregates.
+
+    Rows with an idempotency key are checked against the stored keys
+    first and inserted with ON CONFLICT DO NOTHING, so a key stored
+    concurrently by another process is caught by the unique index (or,
+    for keys of detached months, skipped by the idempotency_keys
+    trigger) instead of failing the transaction. Duplicates are not inserted and
+    do not reach the aggregates.
+
+    Does not commit; the caller owns the transaction.
+    Returns one (event_id, duplicate) pair per row, in the same order as
+    `rows`; a duplicate carries the id of the event already stored.
+    """
+
+    if not rows:
+        return []
+
+    results = [None] * len(rows)
+    plain = []
+    # key -> index of its first row; later rows with the key are repeats
+    keyed = {}
+    repeats = []
+
+    for index, row in enumerate(rows):
+        key = row["idempotency_key"]
+        if key is None:
+            plain.append(index)
+        elif key in keyed:
+            repeats.append((index, key))
+        else:
+            keyed[key] = index
+
+    inserted = []
+
+    if plain:
+        stmt = insert(Event).returning(Event.id, sort_by_parameter_order=True)
+        event_ids = db.session.scalars(stmt, [rows[i] for i in plain]).all()
+        for index, event_id in zip(plain, event_ids):
+            results[index] = (event_id, False)
+        inserted.extend(rows[i] for i in plain)
+
+    if keyed:
+        stored = find_stored_keys(list(keyed))
+        fresh = [key for key in keyed if key not in stored]
+
+        if fresh:
+            stmt = (
+                sqlite_insert(Event)
+                .on_conflict_do_nothing(
+                    index_elements=["idempotency_key"],
+                    index_where=Event.idempotency_key.isnot(None),
+                )
+                .returning(Event.id, Event.idempotency_key)
+            )
+            for event_id, key in db.session.execute(stmt, [rows[keyed[k]] for k in fresh]):
+                results[keyed[key]] = (event_id, False)
+                inserted.append(rows[keyed[key]])
+
+            # Stored by another process, so not in this process's filter
+            raced = [key for key in fresh if results[keyed[key]] is None]
+            if raced:
+                stored.update(stored_event_ids(raced))
+            remember_keys(fresh)
+
+        for key, index in keyed.items():
+            if results[index] is None:
+                results[index] = (stored[key], True)
+
+    for index, key in repeats:
+        results[index] = (results[keyed[key]][0], True)
+
+    apply_to_aggregates(inserted)
+
+    return results
+
+
+def ingest_event_stream(lines, chunk_size: int, max_errors: int) -> dict:
+    """
+    Validate and persist an NDJSON stream of events, one event per line.
+
+    Lines are consumed lazily and accepted events are committed every
+    `chunk_size` rows, so memory stays flat regardless of upload size.
+    Each line goes through the same validation as single-event ingest.
+
+    Committed chunks are durable even if a later chunk fails. Returns a
+    summary with progress counts and (up to `max_errors`) line errors.
+    """
+
+    summary = {
+        "lines_read": 0,
+        "accepted": 0,
+        "duplicates": 0,
+        "rejected": 0,
+        "chunks_committed": 0,
+        "first_event_id": None,
+        "last_event_id": None,
+        "errors": [],
+        "aborted": None,
+    }
+
+    rows = []
+
+    def commit_chunk():
+        inserted = bulk_insert_events(rows)
+        db.session.commit()
+
+        event_ids = [event_id for event_id, duplicate in inserted if not duplicate]
+        summary["accepted"] += len(event_ids)
+        summary["duplicates"] += len(inserted) - len(event_ids)
+        summary["chunks_committed"] += 1
+        if event_ids:
+            if summary["first_event_id"] is None:
+                summary["first_event_id"] = min(event_ids)
+            summary["last_event_id"] = max(event_ids)
+
+        current_app.logger.info(
+            "stream ingest: chunk %d committed (%d accepted so far)",
+            summary["chunks_committed"],
+            summary["accepted"],
+        )
+        rows.clear()
+
+    try:
+        for line_number, line in enumerate(lines, start=1):
+            line = line.strip()
+            if not line:
+                continue
+
+            summary["lines_read"] += 1
+
+            try:
+                rows.append(validate_event(json.loads(line)))
+            except ValueError as exc:
+                summary["rejected"] += 1
+                if len(summary["errors"]) < max_errors:
+                    summary["errors"].append(
+                        {
+                            "line": line_number,
+                            "error": str(exc),
+                        }
+                    )
+                continue
+
+            if len(rows) >= chunk_size:
+                commit_chunk()
+
+        if rows:
+            commit_chunk()
+
+    except SQLAlchemyError:
+        db.session.rollback()
+        # Logged rather than returned: the message carries SQL and event values
+        current_app.logger.exception("stream ingest: chunk failed")
+        summary["aborted"] = {
+            "error": "Events could not be stored",
+            "uncommitted_events": len(rows),
+        }
+
+    return summary
@@ -1,27 +1,224 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 
-from ralph.events.intake import ingest_event
+from ralph.config import Config
+from ralph.metrics import INGEST_EVENTS
+from ralph.models import db
+from ralph.storage import read_session
+from ralph.events.buffer import BufferFull
+from ralph.events.dedup import find_stored_keys
+from ralph.events.intake import (
+    DuplicateEvent,
+    ingest_event,
+    ingest_events,
+    ingest_event_stream,
+    validate_event,
+)
 
 events_bp = Blueprint("events", __name__, url_prefix="/events")
 
+NDJSON_MIMETYPES = {"application/x-ndjson", "application/jsonl"}
+
 
 @events_bp.route("/ingest", methods=["POST"])
 def ingest():
+    buffer = current_app.extensions.get("ralph_ingest_buffer")
+    if buffer is not None:
+        return buffered_ingest(buffer)
+
     try:
-        payload = request.get_json(force=True)
-        event = ingest_event(payload)
+        payload = request.get_json(force=True, silent=True)
+        event_id = ingest_event(payload)
+        INGEST_EVENTS.inc("single", "accepted")
 
         return (
             jsonify(
                 {
                     "status": "accepted",
-                    "event_id": event.id,
+                    "event_id": event_id,
                 }
             ),
             201,
         )
 
-    except Exception as exc:
+    except DuplicateEvent as exc:
+        INGEST_EVENTS.inc("single", "duplicate")
+        return duplicate_response(exc.event_id)
+
+    except ValueError as exc:
+        INGEST_EVENTS.inc("single", "rejected")
+        return (
+            jsonify(
+                {
+                    "status": "error",
+                    "error": str(exc),
+                }
+            ),
+            400,
+        )
+
+    except Exception:
+        db.session.rollback()
+        INGEST_EVENTS.inc("single", "failed")
+        return storage_error("ingest")
+
+
+def storage_error(route):
+    """
+    An unexpected failure while storing events. Details are logged, not
+    returned: they can include SQL and bound event values.
+    """
+    current_app.logger.exception("%s: storing events failed", route)
+    return (
+        jsonify(
+            {
+                "status": "error",
+                "error": "Events could not be stored",
+            }
+        ),
+        500,
+    )
+
+
+def duplicate_response(event_id):
+    """
+    An event whose idempotency key is already stored: 200 rather than
+    201, with the stored event's id, so retrying producers can tell.
+    """
+    return (
+        jsonify(
+            {
+                "status": "duplicate",
+                "event_id": event_id,
+            }
+        ),
+        200,
+    )
+
+
+def buffered_ingest(buffer):
+    """
+    Write-behind /ingest (INGEST_BUFFER_ENABLED).
+
+    Validates the event, queues it and returns 202 without waiting for
+    the database. ?durability=sync waits for the flush holding the event
+    to commit and returns 201 with its id, like unbuffered ingest.
+    A full queue returns 503 with Retry-After so producers back off.
+    Keys already stored are reported as duplicates before queueing;
+    with ?durability=sync, so are keys queued twice.
+    """
+    durability = request.args.get("durability", "buffered")
+    if durability not in ("buffered", "sync"):
+        return (
+            jsonify(
+                {
+                    "status": "error",
+                    "error": "durability must be 'buffered' or 'sync'",
+                }
+            ),
+            400,
+        )
+
+    try:
+        row = validate_event(request.get_json(force=True, silent=True))
+    except ValueError as exc:
+        INGEST_EVENTS.inc("single", "rejected")
+        return (
+            jsonify(
+                {
+                    "status": "error",
+                    "error": str(exc),
+                }
+            ),
+            400,
+        )
+
+    key = row["idempotency_key"]
+    if key is not None:
+        stored = find_stored_keys([key], session=read_session())
+        if stored:
+            INGEST_EVENTS.inc("single", "duplicate")
+            return duplicate_response(stored[key])
+
+    try:
+        pending = buffer.put(row, sync=durability == "sync")
+    except BufferFull as exc:
+        INGEST_EVENTS.inc("single", "throttled")
+        return (
+            jsonify(
+                {
+                    "status": "error",
+                    "error": str(exc),
+                }
+            ),
+            503,
+            {"Retry-After": "1"},
+        )
+
+    if pending is None:
+        INGEST_EVENTS.inc("single", "queued")
+        return jsonify({"status": "queued"}), 202
+
+    try:
+        event_id = pending.wait()
+    except RuntimeError as exc:
+        return (
+            jsonify(
+                {
+                    "status": "error",
+                    "error": str(exc),
+                }
+            ),
+            500,
+        )
+
+    if pending.duplicate:
+        INGEST_EVENTS.inc("single", "duplicate")
+        return duplicate_response(event_id)
+
+    INGEST_EVENTS.inc("single", "accepted")
+    return (
+        jsonify(
+            {
+                "status": "accepted",
+                "event_id": event_id,
+            }
+        ),
+        201,
+    )
+
+
+@events_bp.route("/ingest/batch", methods=["POST"])
+def ingest_batch():
+    """
+    Ingest many events in one request and one transaction.
+
+    Accepts a JSON array of event payloads (or {"events": [...]}).
+    Returns per-item accepted/rejected results.
+    """
+    try:
+        payloads = request.get_json(force=True, silent=True)
+        if isinstance(payloads, dict):
+            payloads = payloads.get("events")
+
+        if not isinstance(payloads, list):
+            raise ValueError("Batch payload must be a JSON array of events")
+
+        if len(payloads) > Config.INGEST_BATCH_MAX_EVENTS:
+            return (
+                jsonify(
+                    {
+                        "status": "error",
+                        "error": (
+                            f"Batch exceeds {Config.INGEST_BATCH_MAX_EVENTS} events"
+                        ),
+                    }
+                ),
+                413,
+            )
+
+        results = ingest_events(payloads)
+
+    except ValueError as exc:
         return (
             jsonify(
                 {
@@ -31,3 +228,91 @@ def ingest():
             ),
             400,
         )
+
+    except Exception:
+        db.session.rollback()
+        return storage_error("ingest/batch")
+
+    accepted = sum(1 for r in results if r["status"] == "accepted")
+    duplicates = sum(1 for r in results if r["status"] == "duplicate")
+    rejected = len(results) - accepted - duplicates
+    INGEST_EVENTS.inc("batch", "accepted", amount=accepted)
+    INGEST_EVENTS.inc("batch", "duplicate", amount=duplicates)
+    INGEST_EVENTS.inc("batch", "rejected", amount=rejected)
+
+    if not rejected:
+        status = "accepted"
+    elif accepted:
+        status = "partial"
+    else:
+        status = "rejected"
+
+    return (
+        jsonify(
+            {
+                "status": status,
+                "accepted": accepted,
+                "duplicates": duplicates,
+                "rejected": rejected,
+                "results": results,
+            }
+        ),
+        201 if accepted or not rejected else 400,
+    )
+
+
+@events_bp.route("/ingest/stream", methods=["POST"])
+def ingest_stream():
+    """
+    Streaming ingest for backfills and connector replays.
+
+    Reads an application/x-ndjson body line by line and commits in
+    chunks (?chunk_size=N, default INGEST_STREAM_CHUNK_SIZE). Returns
+    progress and partial failures once the stream is exhausted.
+    """
+    if request.mimetype not in NDJSON_MIMETYPES:
+        return (
+            jsonify(
+                {
+                    "status": "error",
+                    "error": "Streaming ingest requires Content-Type: application/x-ndjson",
+                }
+            ),
+            415,
+        )
+
+    chunk_size = request.args.get(
+        "chunk_size", Config.INGEST_STREAM_CHUNK_SIZE, type=int
+    )
+    if not chunk_size or not 1 <= chunk_size <= Config.INGEST_BATCH_MAX_EVENTS:
+        return (
+            jsonify(
+                {
+                    "status": "error",
+                    "error": (
+                        "chunk_size must be between 1 and "
+                        f"{Config.INGEST_BATCH_MAX_EVENTS}"
+                    ),
+                }
+            ),
+            400,
+        )
+
+    summary = ingest_event_stream(
+        request.stream,
+        chunk_size=chunk_size,
+        max_errors=Config.INGEST_STREAM_MAX_ERRORS,
+    )
+
+    INGEST_EVENTS.inc("stream", "accepted", amount=summary["accepted"])
+    INGEST_EVENTS.inc("stream", "duplicate", amount=summary["duplicates"])
+    INGEST_EVENTS.inc("stream", "rejected", amount=summary["rejected"])
+
+    if summary["aborted"]:
+        status, code = "aborted", 500
+    elif summary["rejected"]:
+        status, code = "partial", 201 if summary["accepted"] else 400
+    else:
+        status, code = "accepted", 201
+
+    return jsonify({"status": status, **summary}), code
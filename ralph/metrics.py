@@ -0,0 +1,277 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from flask import Response, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# Seconds; shared by request, per-request SQL and job histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250, 1000)
+
+PROMETHEUS_MIMETYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Monotonic counter, one series per label-value tuple.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram, one series per label-value tuple.
+
+    observe() is a bisect and three additions under a lock.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            items = sorted(
+                (labels, (list(counts), total, count))
+                for labels, (counts, total, count) in self._values.items()
+            )
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                label_text = _format_labels(
+                    self.labelnames, labels, [("le", _format_value(bound))]
+                )
+                yield f"{self.name}_bucket{label_text} {cumulative}"
+            label_text = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_text} {_format_value(total)}"
+            yield f"{self.name}_count{label_text} {count}"
+
+
+REQUEST_DURATION = Histogram(
+    "ralph_http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ("method", "route", "status"),
+)
+REQUEST_SQL_STATEMENTS = Histogram(
+    "ralph_http_request_sql_statements",
+    "SQL statements executed per HTTP request.",
+    ("route",),
+    buckets=STATEMENT_BUCKETS,
+)
+REQUEST_SQL_DURATION = Histogram(
+    "ralph_http_request_sql_duration_seconds",
+    "Total SQL execution time per HTTP request.",
+    ("route",),
+)
+SQL_STATEMENTS = Counter(
+    "ralph_sql_statements_total",
+    "SQL statements executed by any engine (requests, jobs, CLI).",
+)
+SQL_DURATION = Counter(
+    "ralph_sql_duration_seconds_total",
+    "Time spent executing SQL statements.",
+)
+INGEST_EVENTS = Counter(
+    "ralph_ingest_events_total",
+    "Events received by the ingest endpoints.",
+    ("path", "result"),
+)
+IDEMPOTENCY_CHECKS = Counter(
+    "ralph_idempotency_checks_total",
+    "Idempotency-key lookups by outcome (negative: ruled out in memory).",
+    ("result",),
+)
+JOB_DURATION = Histogram(
+    "ralph_job_duration_seconds",
+    "Background insight job run time.",
+    ("job", "status"),
+)
+
+REGISTRY = (
+    REQUEST_DURATION,
+    REQUEST_SQL_STATEMENTS,
+    REQUEST_SQL_DURATION,
+    SQL_STATEMENTS,
+    SQL_DURATION,
+    INGEST_EVENTS,
+    IDEMPOTENCY_CHECKS,
+    JOB_DURATION,
+)
+
+
+def render_metrics() -> str:
+    """
+    Every registered metric in the Prometheus text exposition format.
+    """
+
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help_text}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+# [statement count, seconds] for the request running in this context.
+# Worker threads the request fans out to (via contextvars.copy_context)
+# share the list, so updates take the lock.
+_request_sql = ContextVar("ralph_request_sql", default=None)
+_request_sql_lock = threading.Lock()
+_sql_listeners_installed = False
+
+
+def _before_execute(conn, clauseelement, multiparams, params, execution_options):
+    conn.info["ralph_query_started"] = time.perf_counter()
+
+
+def _after_execute(conn, clauseelement, multiparams, params, execution_options, result):
+    elapsed = time.perf_counter() - conn.info["ralph_query_started"]
+
+    # Inside a request only the request's own totals are touched; they
+    # are folded into the global counters once, in after_request
+    stats = _request_sql.get()
+    if stats is not None:
+        with _request_sql_lock:
+            stats[0] += 1
+            stats[1] += elapsed
+    else:
+        SQL_STATEMENTS.inc()
+        SQL_DURATION.inc(amount=elapsed)
+
+
+def _route_label():
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+def _record_request(started, stats, method, route, status):
+    REQUEST_DURATION.observe(time.perf_counter() - started, method, route, status)
+
+    statements, seconds = stats
+    REQUEST_SQL_STATEMENTS.observe(statements, route)
+    REQUEST_SQL_DURATION.observe(seconds, route)
+    SQL_STATEMENTS.inc(amount=statements)
+    SQL_DURATION.inc(amount=seconds)
+
+
+def _measure_stream(body, started, stats, labels):
+    # Streamed bodies run their queries after after_request, possibly
+    # outside the request's context: count them against the request's
+    # totals and record once the stream is exhausted or closed
+    token = _request_sql.set(stats)
+    try:
+        yield from body
+    finally:
+        _request_sql.reset(token)
+        _record_request(started, stats, *labels)
+
+
+def init_metrics(app):
+    """
+    Record request latency and per-request SQL cost, and serve /metrics.
+
+    SQL is timed with engine-wide execute events, so statements from
+    the writer, read-only and partition engines all count, including
+    those run by worker threads the request fans out to and by streamed
+    response bodies (recorded when the stream ends, so their latency
+    covers the whole body). An executemany
+    (bulk insert) counts as one statement, however many cursor calls the
+    driver needs for it. Routes are
+    labelled by URL rule, never by raw path, to keep cardinality fixed.
+    Disabled entirely when METRICS_ENABLED is off.
+    """
+
+    global _sql_listeners_installed
+
+    if not app.config["METRICS_ENABLED"]:
+        return
+
+    if not _sql_listeners_installed:
+        event.listen(Engine, "before_execute", _before_execute)
+        event.listen(Engine, "after_execute", _after_execute)
+        _sql_listeners_installed = True
+
+    @app.before_request
+    def start_request_metrics():
+        g.ralph_request_started = time.perf_counter()
+        g.ralph_request_sql = [0, 0.0]
+        g.ralph_request_sql_token = _request_sql.set(g.ralph_request_sql)
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.pop("ralph_request_started", None)
+        if started is None:
+            return response
+
+        labels = (request.method, _route_label(), str(response.status_code))
+        if response.is_streamed:
+            response.response = _measure_stream(
+                response.response, started, g.ralph_request_sql, labels
+            )
+        else:
+            _record_request(started, g.ralph_request_sql, *labels)
+        return response
+
+    @app.teardown_request
+    def stop_request_metrics(exc):
+        token = g.pop("ralph_request_sql_token", None)
+        if token is not None:
+            _request_sql.reset(token)
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        return Response(render_metrics(), mimetype=PROMETHEUS_MIMETYPE)
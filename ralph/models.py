@@ -10,6 +10,22 @@ class Event(db.Model):
     """
 
     __tablename__ = "events"
+    __table_args__ = (
+        # Window filters + per-intent grouping (trends, repetition, summaries)
+        db.Index("ix_events_created_at_intent", "created_at", "intent"),
+        # Per-intent outcome rollups and DISTINCT intent lookups
+        db.Index("ix_events_intent_outcome", "intent", "outcome"),
+        # Ingest deduplication; events without a key are not indexed
+        db.Index(
+            "ux_events_idempotency_key",
+            "idempotency_key",
+            unique=True,
+            sqlite_where=db.text("idempotency_key IS NOT NULL"),
+        ),
+        # Ids are never reused, even once partitioning empties the table:
+        # watermarks, partitions and archives all key on them
+        {"sqlite_autoincrement": True},
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -23,6 +39,10 @@ class Event(db.Model):
 
     follow_up_count = db.Column(db.Integer, nullable=False, default=0)
 
+    # Optional producer-supplied key; retries with the same key are
+    # reported as duplicates instead of being stored twice
+    idempotency_key = db.Column(db.String(128), nullable=True)
+
     created_at = db.Column(
         db.DateTime,
         default=datetime.utcnow,
@@ -50,3 +70,277 @@ class ConfidenceCalibration(db.Model):
         default=datetime.utcnow,
         nullable=False
     )
+
+
+class EventRollup(db.Model):
+    """
+    Hourly pre-aggregated event counts.
+
+    Maintained at ingest in the same transaction as the raw events;
+    rebuildable from the events table.
+    """
+
+    __tablename__ = "event_rollups_hourly"
+    __table_args__ = (
+        db.Index(
+            "ux_event_rollups_hourly_key",
+            "bucket_start",
+            "intent",
+            "source_system",
+            "event_type",
+            "outcome",
+            unique=True,
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    bucket_start = db.Column(db.DateTime, nullable=False)
+
+    intent = db.Column(db.String(128), nullable=False)
+    source_system = db.Column(db.String(64), nullable=False)
+    # "" for months compacted before event types were rolled up
+    event_type = db.Column(db.String(64), nullable=False, default="")
+    outcome = db.Column(db.String(64), nullable=False)
+
+    event_count = db.Column(db.Integer, nullable=False, default=0)
+    follow_up_sum = db.Column(db.Integer, nullable=False, default=0)
+    confidence_sum = db.Column(db.Float, nullable=False, default=0.0)
+    confidence_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class IntentSketch(db.Model):
+    """
+    Per-day intent frequency sketches, maintained at ingest.
+
+    `distinct_registers` is a HyperLogLog over intent names and
+    `top_intents` a Space-Saving summary (JSON {intent: [count, error]});
+    both merge across days (see ralph.analytics.sketches). Rebuildable
+    from the hourly rollups.
+    """
+
+    __tablename__ = "intent_sketches"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    bucket_start = db.Column(db.DateTime, nullable=False, unique=True)
+
+    event_count = db.Column(db.Integer, nullable=False, default=0)
+    distinct_registers = db.Column(db.LargeBinary, nullable=False)
+    top_intents = db.Column(db.Text, nullable=False)
+
+
+class ConfidenceHistogram(db.Model):
+    """
+    Per-day, per-intent confidence score histograms, maintained at ingest.
+
+    Fixed 0.01-wide buckets; `counts` packs the buckets from
+    `first_bucket` to the last non-empty one as little-endian uint32
+    (see ralph.analytics.confidence_histograms). Rebuildable from the
+    events table.
+    """
+
+    __tablename__ = "confidence_histograms"
+    __table_args__ = (
+        db.Index(
+            "ux_confidence_histograms_key",
+            "bucket_start",
+            "intent",
+            unique=True,
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    intent = db.Column(db.String(128), nullable=False)
+
+    observation_count = db.Column(db.Integer, nullable=False, default=0)
+    first_bucket = db.Column(db.Integer, nullable=False)
+    counts = db.Column(db.LargeBinary, nullable=False)
+
+
+class IntentAnomalyState(db.Model):
+    """
+    Per-intent seasonal EWMA baseline behind the anomaly insight.
+
+    `baseline` packs a (mean, variance) pair of hourly event counts for
+    each UTC hour of day as little-endian doubles. Advanced as hourly
+    rollup buckets close (see ralph.analytics.anomalies); never
+    recomputed from history.
+    """
+
+    __tablename__ = "intent_anomaly_states"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    intent = db.Column(db.String(128), nullable=False, unique=True)
+
+    baseline = db.Column(db.LargeBinary, nullable=False)
+    observed_hours = db.Column(db.Integer, nullable=False, default=0)
+
+    # Latest folded hour, scored against the baseline as it stood before
+    last_bucket = db.Column(db.DateTime, nullable=False)
+    last_count = db.Column(db.Integer, nullable=False, default=0)
+    expected_count = db.Column(db.Float, nullable=True)
+    z_score = db.Column(db.Float, nullable=True)
+
+
+class CalibrationTally(db.Model):
+    """
+    Running per-intent counts behind the confidence calibrations.
+
+    Lets calibration fold in only new events instead of rescanning history.
+    """
+
+    __tablename__ = "calibration_tallies"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    intent = db.Column(db.String(128), nullable=False, unique=True)
+
+    observation_count = db.Column(db.Integer, nullable=False, default=0)
+    resolved_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class AnalyticsWatermark(db.Model):
+    """
+    High-water marks for incremental analytics (last event id folded in).
+    """
+
+    __tablename__ = "analytics_watermarks"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    name = db.Column(db.String(64), nullable=False, unique=True)
+
+    last_event_id = db.Column(db.Integer, nullable=False, default=0)
+
+    updated_at = db.Column(
+        db.DateTime,
+        default=datetime.utcnow,
+        nullable=False
+    )
+
+
+class InsightSnapshot(db.Model):
+    """
+    Latest materialized result of a background insight job.
+
+    `payload` holds the serialized JSON response body so endpoints can
+    return it without recomputing or re-serializing.
+    """
+
+    __tablename__ = "insight_snapshots"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    name = db.Column(db.String(64), nullable=False, unique=True)
+    version = db.Column(db.Integer, nullable=False, default=1)
+
+    payload = db.Column(db.Text, nullable=False)
+    duration_ms = db.Column(db.Float, nullable=False, default=0.0)
+
+    generated_at = db.Column(
+        db.DateTime,
+        default=datetime.utcnow,
+        nullable=False
+    )
+
+
+class IntentRegistry(db.Model):
+    """
+    One row per intent ever observed, maintained at ingest.
+
+    Governance checks read this instead of SELECT DISTINCT over events.
+    """
+
+    __tablename__ = "intent_registry"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    intent = db.Column(db.String(128), nullable=False, unique=True)
+
+    first_seen_at = db.Column(db.DateTime, nullable=False)
+    last_seen_at = db.Column(db.DateTime, nullable=False)
+
+    event_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class IntentSlice(db.Model):
+    """
+    One row per (intent, source_system, event_type) ever observed,
+    maintained at ingest next to the intent registry.
+
+    Lets governance checks restrict the registry to one source system or
+    event type in O(#intents) instead of scanning the rollups.
+    """
+
+    __tablename__ = "intent_slices"
+    __table_args__ = (
+        db.Index(
+            "ux_intent_slices_key",
+            "intent",
+            "source_system",
+            "event_type",
+            unique=True,
+        ),
+        db.Index("ix_intent_slices_source_system", "source_system", "intent"),
+        db.Index("ix_intent_slices_event_type", "event_type", "intent"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    intent = db.Column(db.String(128), nullable=False)
+    source_system = db.Column(db.String(64), nullable=False)
+    event_type = db.Column(db.String(64), nullable=False)
+
+    event_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class IdempotencyKey(db.Model):
+    """
+    Idempotency keys of events moved out of the events table.
+
+    Filled when a month is detached into a partition file and kept after
+    compaction, so retries keep being recognized whatever the events'
+    age. A trigger (see ralph.schema) skips event inserts whose key is
+    listed here.
+    """
+
+    __tablename__ = "idempotency_keys"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    key = db.Column(db.String(128), nullable=False, unique=True)
+    event_id = db.Column(db.Integer, nullable=False)
+
+
+class EventPartition(db.Model):
+    """
+    Catalog of monthly event partitions moved out of the events table.
+
+    "detached" partitions keep their raw rows in a separate SQLite file
+    (`filename` under EVENT_PARTITION_DIR); "compacted" ones only survive
+    as hourly rollups. Events before the newest range_end never live in
+    the main events table.
+    """
+
+    __tablename__ = "event_partitions"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    name = db.Column(db.String(16), nullable=False, unique=True)
+    filename = db.Column(db.String(255), nullable=False)
+
+    range_start = db.Column(db.DateTime, nullable=False)
+    range_end = db.Column(db.DateTime, nullable=False)
+
+    first_event_id = db.Column(db.Integer, nullable=True)
+    last_event_id = db.Column(db.Integer, nullable=True)
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+
+    state = db.Column(db.String(16), nullable=False, default="detached")
+
+    detached_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    compacted_at = db.Column(db.DateTime, nullable=True)
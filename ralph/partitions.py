@@ -0,0 +1,320 @@
+import os
+import threading
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import create_engine, delete, func, insert, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from ralph.models import db, Event, EventPartition, EventRollup, IdempotencyKey
+from ralph.storage import read_session
+
+
+COPY_BATCH_SIZE = 50000
+
+_engines_lock = threading.Lock()
+
+
+def month_floor(ts):
+    return ts.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_month(month_start):
+    return (month_start + timedelta(days=32)).replace(day=1)
+
+
+def _partition_path(filename):
+    return os.path.join(current_app.config["EVENT_PARTITION_DIR"], filename)
+
+
+def partition_catalog(connection=None) -> list:
+    """
+    Every catalogued partition, oldest first.
+    """
+
+    executor = connection if connection is not None else read_session()
+    return executor.execute(
+        select(EventPartition.__table__).order_by(EventPartition.range_start)
+    ).all()
+
+
+def hot_boundary(connection=None):
+    """
+    Start of the range held by the main events table: the end of the
+    newest partition, or None when nothing has been partitioned.
+    """
+
+    executor = connection if connection is not None else read_session()
+    return executor.scalar(select(func.max(EventPartition.range_end)))
+
+
+def partition_engine(partition):
+    """
+    Read-only engine for a detached partition file, opened on first use.
+    """
+
+    path = _partition_path(partition.filename)
+    engines = current_app.extensions.setdefault("ralph_partition_engines", {})
+
+    with _engines_lock:
+        engine = engines.get(path)
+        if engine is None:
+            engine = engines[path] = create_engine(
+                f"sqlite:///file:{path}?mode=ro&uri=true"
+            )
+    return engine
+
+
+def _close_partition_engine(path):
+    engines = current_app.extensions.get("ralph_partition_engines", {})
+    with _engines_lock:
+        engine = engines.pop(path, None)
+    if engine is not None:
+        engine.dispose()
+
+
+def detached_partitions() -> list:
+    return [p for p in partition_catalog() if p.state == "detached"]
+
+
+def raw_event_sources(ranges):
+    """
+    Where the raw events for a set of [start, end) ranges live.
+
+    Returns (hot, partitions): whether the main events table can hold
+    any of them, and the detached partitions that overlap them.
+    Everything else is pruned, so a recent window never opens old
+    partition files. Compacted partitions have no raw rows left.
+    """
+
+    catalog = partition_catalog()
+    if not catalog:
+        return True, []
+
+    boundary = catalog[-1].range_end
+    hot = any(hi > boundary for lo, hi in ranges)
+    partitions = [
+        p
+        for p in catalog
+        if p.state == "detached"
+        and any(lo < p.range_end and hi > p.range_start for lo, hi in ranges)
+    ]
+    return hot, partitions
+
+
+def execute_on_partitions(stmt, partitions):
+    """
+    Run a read-only statement against the events table of each partition
+    and yield the rows of all of them.
+    """
+
+    for partition in partitions:
+        with partition_engine(partition).connect() as connection:
+            yield from connection.execute(stmt)
+
+
+def _detach_month(start, end):
+    name = start.strftime("%Y-%m")
+    filename = f"events_{start:%Y_%m}.db"
+    path = _partition_path(filename)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    in_range = (Event.created_at >= start) & (Event.created_at < end)
+
+    # 1. Copy the month into its own file (overwriting a leftover copy)
+    target = create_engine(f"sqlite:///{path}")
+    try:
+        Event.__table__.create(target, checkfirst=True)
+
+        copied, first_id, last_id = 0, None, None
+        with target.begin() as connection:
+            connection.execute(delete(Event))
+            batches = read_session().execute(
+                select(Event.__table__)
+                .where(in_range)
+                .order_by(Event.id)
+                .execution_options(yield_per=COPY_BATCH_SIZE)
+            ).partitions()
+            for batch in batches:
+                connection.execute(insert(Event), [row._asdict() for row in batch])
+                copied += len(batch)
+                first_id = batch[0].id if first_id is None else first_id
+                last_id = batch[-1].id
+    finally:
+        target.dispose()
+
+    # 2. Drop the rows from the main table, keeping their idempotency
+    # keys, and catalog the partition
+    with db.engine.begin() as connection:
+        remaining = connection.scalar(
+            select(func.count()).select_from(Event).where(in_range)
+        )
+        if remaining != copied:
+            raise RuntimeError(
+                f"events in {name} changed while copying "
+                f"({copied} copied, {remaining} present)"
+            )
+
+        connection.execute(
+            insert(IdempotencyKey).from_select(
+                ["key", "event_id"],
+                select(Event.idempotency_key, Event.id).where(
+                    in_range, Event.idempotency_key.isnot(None)
+                ),
+            )
+        )
+        connection.execute(delete(Event).where(in_range))
+
+        stmt = sqlite_insert(EventPartition).values(
+            name=name,
+            filename=filename,
+            range_start=start,
+            range_end=end,
+            first_event_id=first_id,
+            last_event_id=last_id,
+            row_count=copied,
+            state="detached",
+            detached_at=datetime.utcnow(),
+        )
+        connection.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["name"],
+                set_={
+                    column: stmt.excluded[column]
+                    for column in (
+                        "filename",
+                        "range_start",
+                        "range_end",
+                        "first_event_id",
+                        "last_event_id",
+                        "row_count",
+                        "state",
+                        "detached_at",
+                    )
+                },
+            )
+        )
+
+    return name
+
+
+def detach_partitions(keep_months=None, before=None) -> list:
+    """
+    Move whole calendar months out of the events table into monthly
+    partition files.
+
+    Moves every month before `before` (a month start), by default
+    keeping the newest EVENT_PARTITION_HOT_MONTHS months, counting the
+    current one, in the main table. Each month is copied into its own
+    SQLite file first and only deleted from events, together with its
+    catalog entry, once the copy is committed; a crash in between leaves
+    a copy the next run overwrites. Rollups and the intent registry are
+    unaffected; idempotency keys of the moved rows are kept in
+    idempotency_keys so retries are still recognized.
+
+    Returns the names of the partitions created.
+    """
+
+    if before is None:
+        keep = keep_months or current_app.config["EVENT_PARTITION_HOT_MONTHS"]
+        before = month_floor(datetime.utcnow())
+        for _ in range(keep - 1):
+            before = month_floor(before - timedelta(days=1))
+
+    oldest = read_session().scalar(select(func.min(Event.created_at)))
+
+    created = []
+    start = month_floor(oldest) if oldest is not None else before
+    while start < before:
+        end = next_month(start)
+        has_rows = read_session().scalar(
+            select(Event.id)
+            .where(Event.created_at >= start, Event.created_at < end)
+            .limit(1)
+        )
+        if has_rows is not None:
+            created.append(_detach_month(start, end))
+        start = end
+
+    return created
+
+
+def partition_rollups(partition) -> list:
+    """
+    Hourly rollup rows (dicts) computed from a detached partition's raw
+    events.
+    """
+
+    from ralph.analytics.rollups import ROLLUP_COLUMNS, rollup_select
+
+    with partition_engine(partition).connect() as connection:
+        return [
+            dict(zip(ROLLUP_COLUMNS, row))
+            for row in connection.execute(rollup_select())
+        ]
+
+
+def replace_partition_rollups(partition, rows, connection):
+    """
+    Swap the hourly rollups of a partition's range for `rows`. Runs on
+    the given connection/transaction.
+    """
+
+    connection.execute(
+        delete(EventRollup).where(
+            EventRollup.bucket_start >= partition.range_start,
+            EventRollup.bucket_start < partition.range_end,
+        )
+    )
+    if rows:
+        connection.execute(insert(EventRollup), rows)
+
+
+def compact_partitions(retention_days=None) -> list:
+    """
+    Apply the raw-event retention policy.
+
+    Months that ended more than `retention_days` ago (default
+    EVENT_RETENTION_DAYS; 0 keeps raw events forever) are detached if
+    they are still in the events table. Their hourly rollups are then
+    recomputed from the raw rows, and the partition is marked
+    "compacted" and its file deleted. Whole-hour aggregates for those
+    months stay exact; raw-row readers (window edge hours, calibration
+    curves, archive exports) no longer see them.
+
+    Returns the names of the partitions compacted.
+    """
+
+    if retention_days is None:
+        retention_days = current_app.config["EVENT_RETENTION_DAYS"]
+    if not retention_days:
+        return []
+
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    detach_partitions(before=month_floor(cutoff))
+
+    compacted = []
+    for partition in partition_catalog():
+        path = _partition_path(partition.filename)
+
+        if partition.state == "detached" and partition.range_end <= cutoff:
+            rows = partition_rollups(partition)
+
+            with db.engine.begin() as connection:
+                replace_partition_rollups(partition, rows, connection)
+                connection.execute(
+                    update(EventPartition)
+                    .where(EventPartition.name == partition.name)
+                    .values(state="compacted", compacted_at=datetime.utcnow())
+                )
+            compacted.append(partition.name)
+
+        elif partition.state != "compacted":
+            continue
+
+        # Also clears files left behind by an interrupted compaction
+        _close_partition_engine(path)
+        if os.path.exists(path):
+            os.remove(path)
+
+    return compacted
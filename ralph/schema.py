@@ -0,0 +1,330 @@
+from sqlalchemy import event, func, insert, select, text
+
+from ralph.models import (
+    db,
+    AnalyticsWatermark,
+    Event,
+    EventPartition,
+    IdempotencyKey,
+)
+from ralph.storage import read_engine
+from ralph.partitions import (
+    partition_catalog,
+    partition_engine,
+    partition_rollups,
+    replace_partition_rollups,
+)
+from ralph.analytics.rollups import rebuild_rollups
+from ralph.analytics.intent_registry import rebuild_intent_registry
+from ralph.analytics.sketches import rebuild_sketches
+from ralph.analytics.confidence_histograms import rebuild_confidence_histograms
+
+
+# Bump when a release adds tables, columns, indexes or data backfills.
+# The applied version is stored in SQLite's PRAGMA user_version.
+SCHEMA_VERSION = 11
+
+
+def read_schema_version(connection) -> int:
+    return connection.execute(text("PRAGMA user_version")).scalar() or 0
+
+
+def applied_schema_version() -> int:
+    # Raw DBAPI connection: no BEGIN IMMEDIATE, so booting never waits
+    # on a writer just to find out there is nothing to do
+    connection = db.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        version = cursor.execute("PRAGMA user_version").fetchone()[0]
+        cursor.close()
+    finally:
+        connection.close()
+    return version
+
+
+def write_schema_version(connection, version: int):
+    # PRAGMA does not accept bound parameters
+    connection.execute(text(f"PRAGMA user_version = {int(version)}"))
+
+
+def create_missing_indexes(connection):
+    """
+    Create every model index that does not exist yet.
+
+    db.create_all() only emits CREATE INDEX for tables it creates, so
+    tables from older databases never pick up new indexes on their own.
+    Indexes over columns a later step adds are skipped; that step calls
+    this again once the column exists.
+    """
+    for table in db.metadata.sorted_tables:
+        columns = {
+            row[1]
+            for row in connection.execute(text(f"PRAGMA table_info({table.name})"))
+        }
+        for index in table.indexes:
+            if all(column.name in columns for column in index.columns):
+                index.create(connection, checkfirst=True)
+
+
+def add_event_idempotency_key(connection):
+    """
+    Add events.idempotency_key and its unique index to older databases.
+    """
+    columns = {
+        row[1] for row in connection.execute(text("PRAGMA table_info(events)"))
+    }
+    if "idempotency_key" not in columns:
+        connection.execute(
+            text("ALTER TABLE events ADD COLUMN idempotency_key VARCHAR(128)")
+        )
+    create_missing_indexes(connection)
+
+
+def add_rollup_event_type(connection):
+    """
+    Add event_type to the hourly rollup key of older databases.
+
+    Existing rows get "" and the unique index is rebuilt with the new
+    column, then every rollup that still has raw events behind it (the
+    events table and detached partitions) is recomputed. Compacted
+    months keep event_type "".
+    """
+    columns = {
+        row[1]
+        for row in connection.execute(text("PRAGMA table_info(event_rollups_hourly)"))
+    }
+    if "event_type" not in columns:
+        connection.execute(text("DROP INDEX IF EXISTS ux_event_rollups_hourly_key"))
+        connection.execute(
+            text(
+                "ALTER TABLE event_rollups_hourly "
+                "ADD COLUMN event_type VARCHAR(64) NOT NULL DEFAULT ''"
+            )
+        )
+        create_missing_indexes(connection)
+
+    rebuild_rollups(connection)
+    for partition in partition_catalog(connection):
+        if partition.state == "detached":
+            replace_partition_rollups(partition, partition_rollups(partition), connection)
+
+
+def create_archived_key_trigger(connection):
+    # Skips inserting an event whose key is in idempotency_keys
+    connection.execute(
+        text(
+            "CREATE TRIGGER IF NOT EXISTS tr_events_archived_idempotency_key "
+            "BEFORE INSERT ON events "
+            "WHEN NEW.idempotency_key IS NOT NULL AND EXISTS ("
+            "SELECT 1 FROM idempotency_keys WHERE key = NEW.idempotency_key) "
+            "BEGIN SELECT RAISE(IGNORE); END"
+        )
+    )
+
+
+def add_idempotency_key_archive(connection):
+    """
+    Keep idempotency keys unique across the events table and partitions.
+
+    Creates the trigger that skips inserting an event whose key is in
+    idempotency_keys (ON CONFLICT DO NOTHING then reports it like any
+    other duplicate), and backfills the table from partitions detached
+    before it existed. Keys of months already compacted are gone.
+    """
+    create_archived_key_trigger(connection)
+
+    for partition in partition_catalog(connection):
+        if partition.state != "detached":
+            continue
+        with partition_engine(partition).connect() as source:
+            columns = {
+                row[1] for row in source.execute(text("PRAGMA table_info(events)"))
+            }
+            if "idempotency_key" not in columns:
+                continue
+            keys = [
+                {"key": key, "event_id": event_id}
+                for key, event_id in source.execute(
+                    select(Event.idempotency_key, Event.id).where(
+                        Event.idempotency_key.isnot(None)
+                    )
+                )
+            ]
+        if keys:
+            connection.execute(insert(IdempotencyKey).prefix_with("OR IGNORE"), keys)
+
+
+def add_event_autoincrement(connection):
+    """
+    Rebuild the events table of older databases with AUTOINCREMENT.
+
+    Without it SQLite reuses the ids of deleted rows, and partitioning
+    can delete every row. The table is copied under its model
+    definition (indexes and the archived-key trigger are recreated),
+    then the id sequence is moved past every id handed out so far,
+    including those now held by partitions, idempotency_keys and the
+    incremental watermarks.
+    """
+    table_sql = connection.scalar(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'events'")
+    )
+    if "AUTOINCREMENT" not in table_sql.upper():
+        columns = ", ".join(column.name for column in Event.__table__.columns)
+        connection.execute(text("ALTER TABLE events RENAME TO events_rebuild"))
+        for index in Event.__table__.indexes:
+            connection.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+        connection.execute(
+            text("DROP TRIGGER IF EXISTS tr_events_archived_idempotency_key")
+        )
+
+        Event.__table__.create(connection)
+        connection.execute(
+            text(
+                f"INSERT INTO events ({columns}) "
+                f"SELECT {columns} FROM events_rebuild ORDER BY id"
+            )
+        )
+        connection.execute(text("DROP TABLE events_rebuild"))
+        create_archived_key_trigger(connection)
+
+    issued = max(
+        connection.scalar(select(func.max(Event.id))) or 0,
+        connection.scalar(select(func.max(EventPartition.last_event_id))) or 0,
+        connection.scalar(select(func.max(IdempotencyKey.event_id))) or 0,
+        connection.scalar(select(func.max(AnalyticsWatermark.last_event_id))) or 0,
+    )
+    sequence = connection.scalar(
+        text("SELECT seq FROM sqlite_sequence WHERE name = 'events'")
+    )
+    if sequence is None:
+        connection.execute(
+            text("INSERT INTO sqlite_sequence (name, seq) VALUES ('events', :seq)"),
+            {"seq": issued},
+        )
+    elif sequence < issued:
+        connection.execute(
+            text("UPDATE sqlite_sequence SET seq = :seq WHERE name = 'events'"),
+            {"seq": issued},
+        )
+
+
+# (version, step) pairs applied in order to databases below `version`.
+# Steps must be idempotent: a crash mid-upgrade re-runs them.
+MIGRATIONS = [
+    (1, create_missing_indexes),
+    (2, rebuild_rollups),
+    (3, rebuild_intent_registry),
+    # event_partitions; its indexes come with create_all
+    (4, create_missing_indexes),
+    (5, add_event_idempotency_key),
+    # intent_sketches, seeded from the hourly rollups
+    (6, rebuild_sketches),
+    # confidence_histograms, seeded from raw events
+    (7, rebuild_confidence_histograms),
+    # intent_anomaly_states; starts empty, filled by the anomalies job
+    (8, create_missing_indexes),
+    # event_type in the rollup key, then intent_slices built from it
+    (9, add_rollup_event_type),
+    (9, rebuild_intent_registry),
+    # idempotency_keys and the trigger that consults it
+    (10, add_idempotency_key_archive),
+    # events.id AUTOINCREMENT, so emptied tables never reuse ids
+    (11, add_event_autoincrement),
+]
+
+
+def upgrade_schema() -> int:
+    """
+    Bring the bound database up to SCHEMA_VERSION in place.
+
+    Creates missing tables, then runs every pending migration step in
+    one transaction. Safe to call on every boot: a database already at
+    SCHEMA_VERSION costs one PRAGMA read and nothing else, so new tables
+    and indexes only reach existing databases with a version bump.
+    """
+    if applied_schema_version() >= SCHEMA_VERSION:
+        return SCHEMA_VERSION
+
+    with db.engine.begin() as connection:
+        db.metadata.create_all(connection)
+
+        current = read_schema_version(connection)
+        for version, step in MIGRATIONS:
+            if current < version <= SCHEMA_VERSION:
+                step(connection)
+
+        if current < SCHEMA_VERSION:
+            write_schema_version(connection, SCHEMA_VERSION)
+
+    return SCHEMA_VERSION
+
+
+def insight_query_checks() -> dict:
+    """
+    The window-based insights whose queries must never full-scan events.
+    """
+    from ralph.analytics.trend_deltas import compute_intent_trend_deltas
+    from ralph.analytics.repetition_analysis import analyze_intent_frequency
+    from ralph.analytics.draft_outcome_trends import analyze_draft_outcome_trends
+    from ralph.analytics.weekly_executive_summary import (
+        generate_weekly_executive_summary,
+    )
+
+    return {
+        "trends": compute_intent_trend_deltas,
+        "repetition": analyze_intent_frequency,
+        "draft_outcomes": analyze_draft_outcome_trends,
+        "weekly_summary": generate_weekly_executive_summary,
+        "trends_by_source_system": lambda: compute_intent_trend_deltas(
+            filters={"event_type": "draft_sent"}, group_by="source_system"
+        ),
+    }
+
+
+def explain_insight_queries(checks) -> list:
+    """
+    Run each insight function and EXPLAIN QUERY PLAN every SELECT it issues.
+
+    `checks` maps a name to a zero-argument callable. Returns one report
+    per statement; `full_scan` is True when SQLite walks the whole events
+    table (or a whole index of it) instead of searching a range.
+    """
+    engines = {db.engine, read_engine()}
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    reports = []
+    for name, check in checks.items():
+        captured.clear()
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", capture)
+        try:
+            check()
+        finally:
+            for engine in engines:
+                event.remove(engine, "before_cursor_execute", capture)
+            db.session.rollback()
+
+        with read_engine().connect() as connection:
+            for statement, parameters in captured:
+                plan = [
+                    row[-1]
+                    for row in connection.exec_driver_sql(
+                        "EXPLAIN QUERY PLAN " + statement, parameters
+                    )
+                ]
+                reports.append(
+                    {
+                        "check": name,
+                        "statement": " ".join(statement.split()),
+                        "plan": plan,
+                        "full_scan": any(
+                            step.startswith("SCAN events") for step in plan
+                        ),
+                    }
+                )
+
+    return reports
@@ -0,0 +1,116 @@
+from flask.globals import app_ctx
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
+
+from ralph.models import db
+
+
+def _app_ctx_id():
+    return id(app_ctx._get_current_object())
+
+
+_read_sessions = scoped_session(sessionmaker(class_=Session), scopefunc=_app_ctx_id)
+
+
+def _pragmas(config):
+    return [
+        f"PRAGMA synchronous = {config['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA cache_size = -{int(config['SQLITE_CACHE_SIZE_KIB'])}",
+        f"PRAGMA mmap_size = {int(config['SQLITE_MMAP_SIZE'])}",
+        f"PRAGMA busy_timeout = {int(config['SQLITE_BUSY_TIMEOUT_MS'])}",
+        "PRAGMA temp_store = MEMORY",
+    ]
+
+
+def _configure_writer(engine, config):
+    pragmas = ["PRAGMA journal_mode = WAL"] + _pragmas(config)
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        # Let SQLAlchemy, not pysqlite, emit BEGIN (see on_begin)
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def on_begin(connection):
+        # Take the write lock up front so a transaction that reads before
+        # writing waits on busy_timeout instead of failing to upgrade.
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def _make_read_engine(path, config):
+    engine = create_engine(
+        f"sqlite:///file:{path}?mode=ro&uri=true",
+        pool_size=config["SQLITE_READ_POOL_SIZE"],
+        max_overflow=config["SQLITE_READ_POOL_SIZE"],
+    )
+    pragmas = _pragmas(config) + ["PRAGMA query_only = ON"]
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    return engine
+
+
+def init_storage(app):
+    """
+    Tune the SQLite writer engine and open a pooled read-only engine.
+
+    With SQLITE_WAL enabled the database runs in WAL mode, so readers
+    never block the writer and the writer never blocks readers. The
+    writer keeps Flask-SQLAlchemy's engine (db.session); analytics read
+    through read_session(). Non-file databases keep a single engine.
+    """
+
+    app.teardown_appcontext(lambda exc: _read_sessions.remove())
+
+    with app.app_context():
+        writer = db.engine
+
+    path = writer.url.database
+    if (
+        not app.config["SQLITE_WAL"]
+        or writer.dialect.name != "sqlite"
+        or not path
+        or path == ":memory:"
+    ):
+        app.extensions["ralph_read_engine"] = None
+        return
+
+    _configure_writer(writer, app.config)
+
+    # Switch the file to WAL before any read-only connection opens it
+    with writer.connect():
+        pass
+
+    app.extensions["ralph_read_engine"] = _make_read_engine(path, app.config)
+
+
+def read_engine():
+    """
+    The pooled read-only engine, or the writer engine if none is configured.
+    """
+
+    from flask import current_app
+
+    return current_app.extensions.get("ralph_read_engine") or db.engine
+
+
+def read_session():
+    """
+    Session bound to the read-only engine, scoped to the app context.
+
+    Use it for analytics queries. Writes (and reads that must see the
+    current transaction's uncommitted writes) stay on db.session.
+    """
+
+    if _read_sessions.registry.has():
+        return _read_sessions()
+    return _read_sessions(bind=read_engine())
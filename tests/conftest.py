@@ -0,0 +1,23 @@
+import os
+import tempfile
+
+import pytest
+
+# Config reads the environment at import time, so point it at a scratch
+# directory before anything under ralph is imported
+_instance_dir = tempfile.mkdtemp(prefix="ralph-tests-")
+os.environ["RALPH_DATABASE_URL"] = "sqlite:///" + os.path.join(
+    _instance_dir, "ralph.db"
+)
+os.environ["RALPH_EVENT_PARTITION_DIR"] = os.path.join(_instance_dir, "partitions")
+os.environ["RALPH_EVENT_ARCHIVE_DIR"] = os.path.join(_instance_dir, "archive")
+os.environ["RALPH_METRICS_ENABLED"] = "0"
+os.environ["RALPH_JOBS_ENABLED"] = "0"
+os.environ["RALPH_INGEST_BUFFER_ENABLED"] = "0"
+
+
+@pytest.fixture(scope="session")
+def app():
+    from ralph.app import create_app
+
+    return create_app()
@@ -0,0 +1,30 @@
+from ralph.schema import explain_insight_queries, insight_query_checks
+
+
+def test_insight_queries_never_full_scan_events(app):
+    client = app.test_client()
+    response = client.post(
+        "/events/ingest/batch",
+        json=[
+            {
+                "event_type": event_type,
+                "source_system": "helpdesk",
+                "intent": f"intent_{index % 5}",
+                "confidence_score": 0.5,
+                "outcome": "resolved",
+            }
+            for index, event_type in enumerate(["draft_sent", "reply"] * 10)
+        ],
+    )
+    assert response.status_code == 201
+
+    with app.app_context():
+        reports = explain_insight_queries(insight_query_checks())
+
+    assert reports
+    scans = [
+        f"{report['check']}: {report['plan']}"
+        for report in reports
+        if report["full_scan"]
+    ]
+    assert not scans, scans